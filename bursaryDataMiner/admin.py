@@ -1,6 +1,6 @@
 # bursaryDataMiner/admin.py
 from django.contrib import admin
-from .models import Bursary, BursaryEmbedding, UserBursaryMatch
+from .models import BackgroundJob, Bursary, BursaryEmbedding, UserBursaryMatch, UserProfileEmbedding
 
 @admin.register(Bursary)
 class BursaryAdmin(admin.ModelAdmin):
@@ -8,5 +8,18 @@ class BursaryAdmin(admin.ModelAdmin):
     
 @admin.register(BursaryEmbedding)
 class BursaryEmbeddingAdmin(admin.ModelAdmin):
-    list_display = ('bursary', 'updated_at')
-    readonly_fields = ('vector',)  # optional, prevents accidental edits
+    list_display = ('bursary', 'template', 'model_name', 'updated_at')
+    list_filter = ('template',)
+    exclude = ('vector_data',)
+    readonly_fields = ('vector_format', 'vector_scale')  # optional, prevents accidental edits
+
+@admin.register(UserProfileEmbedding)
+class UserProfileEmbeddingAdmin(admin.ModelAdmin):
+    list_display = ('user', 'model_name', 'updated_at')
+    exclude = ('vector_data',)
+    readonly_fields = ('fingerprint', 'vector_format', 'vector_scale')
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'user', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
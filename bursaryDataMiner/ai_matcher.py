@@ -1,23 +1,31 @@
-from sentence_transformers import SentenceTransformer
 import numpy as np 
 
+from bursaryDataMiner.encoders import get_encoder
+
 _MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
-_model = None
 
 def get_model():
-    global _model
-    if _model is None: 
-        _model = SentenceTransformer(_MODEL_NAME)
-    return _model
+    """Encoder for the configured EMBEDDING_BACKEND, loaded on first use"""
+    return get_encoder(_MODEL_NAME)
+
+def get_model_name() -> str:
+    return _MODEL_NAME
 
 def embed_text(text:str) -> list[float]:
     text = (text or "").strip()
     if not text:
         return []
     model = get_model()
-    vec = model.encode(text, normalize_embedding=True)
+    vec = model.encode([text])[0]
     return vec.astype(float).tolist()
 
+def embed_texts(texts, batch_size=64) -> np.ndarray:
+    """Encode many texts with one batched model call; rows are L2-normalised"""
+    texts = list(texts)
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    return get_model().encode(texts, batch_size=batch_size)
+
 def cosine(a: np.ndarray, b: np.ndarray) -> float:
     return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
 
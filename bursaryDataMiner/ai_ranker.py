@@ -1,12 +1,17 @@
 # bursaryDataMiner/ai_ranker.py
-import numpy as np
 from django.utils.timezone import now
-from bursaryDataMiner.models import Bursary, BursaryEmbedding, UserBursaryMatch
-from bursaryDataMiner.ai_matcher import embed_text, cosine
-from bursaryDataMiner.profile_text import user_to_profile_text
+from bursaryDataMiner.models import Bursary
+from bursaryDataMiner.ann_index import get_ann_retriever
+from bursaryDataMiner.embedding_pipeline import DEFAULT_TEMPLATE
+from bursaryDataMiner.embedding_store import get_embedding_matrix
+from bursaryDataMiner.persistence import upsert_matches
+from bursaryDataMiner.profile_cache import get_profile_vector
 
 QUALITY_SIM_THRESHOLD = 0.35  # drop obvious mismatches
 EXCELLENT_SIM_THRESHOLD = 0.60
+INDUSTRY_BOOST = 5  # score points for an industry word in the title
+# Retrieval keeps rows this close to the cut-off so the boost can still reorder them
+CANDIDATE_MARGIN = (INDUSTRY_BOOST + 1) / 100
 
 def hard_filters(bursary: Bursary, user) -> bool:
     """
@@ -22,58 +27,66 @@ def hard_filters(bursary: Bursary, user) -> bool:
             return False
     return True
 
-def ai_match_user_to_bursaries(user, limit=30):
-    profile_text = user_to_profile_text(user)
-    profile_vec = np.array(embed_text(profile_text), dtype=float)
-    if profile_vec.size == 0:
-        return []
+def user_industries(user):
+    if not hasattr(user, "qualifications"):
+        return set()
+    return { (q.industry or "").lower() for q in user.qualifications.all() }
 
-    # Pull all with embeddings
-    qs = BursaryEmbedding.objects.select_related("bursary")
-    scored = []
+def match_score(sim, title, inds):
+    """(relevance score, match quality) for one bursary similarity"""
+    score = int(sim * 100)
 
-    for be in qs.iterator():
-        if not be.vector:
-            continue
-        b = be.bursary
-        if not hard_filters(b, user):
-            continue
-        bursary_vec = np.array(be.vector, dtype=float)
-        sim = cosine(profile_vec, bursary_vec)  # 0..1
-        if sim < QUALITY_SIM_THRESHOLD:
-            continue  # low quality / irrelevant
-        score = int(sim * 100)
+    # Optional: small bonus if title contains user’s industry words
+    title = (title or "").lower()
+    industry_boost = 0
+    if any(i and i in title for i in inds):
+        industry_boost = INDUSTRY_BOOST
+    final_score = min(100, score + industry_boost)
+
+    return final_score, ("Excellent Match" if sim >= EXCELLENT_SIM_THRESHOLD else "Good Match")
 
-        # Optional: small bonus if title contains user’s industry words
-        title = (b.title or "").lower()
-        industry_boost = 0
-        if hasattr(user, "qualifications"):
-            inds = { (q.industry or "").lower() for q in user.qualifications.all() }
-            if any(i and i in title for i in inds):
-                industry_boost = 5
-        final_score = min(100, score + industry_boost)
+def rank_candidates(user, ids, sims, bursaries, limit, inds=None):
+    """
+    Final ranking of retrieved candidates: hard filters, the industry
+    boost, then the best `limit` as [{"bursary", "score", "quality"}].
 
-        scored.append({
-            "bursary": b,
-            "score": final_score,
-            "quality": ("Excellent Match" if sim >= EXCELLENT_SIM_THRESHOLD else "Good Match"),
-        })
+    bursaries: {bursary_id: Bursary} covering ids.
+    """
+    if inds is None:
+        inds = user_industries(user)
+
+    scored = []
+    for bursary_id, sim in zip(ids.tolist(), sims.tolist()):
+        b = bursaries.get(bursary_id)
+        if b is None or not hard_filters(b, user):
+            continue
+        final_score, quality = match_score(sim, b.title, inds)
+        scored.append({"bursary": b, "score": final_score, "quality": quality})
 
     scored.sort(key=lambda x: x["score"], reverse=True)
-    top = scored[:limit]
+    return scored[:limit]
+
+def ai_match_user_to_bursaries(user, limit=30, on_event=None):
+    profile_vec = get_profile_vector(user)
+    if profile_vec.size == 0:
+        return []
+
+    # Retrieval: the IVF index when one is built and the corpus is large,
+    # otherwise one matrix-vector product over every stored embedding. Rows
+    # within the industry boost of the cut-off are kept so the boost can
+    # still reorder them.
+    matrix = get_embedding_matrix(DEFAULT_TEMPLATE)
+    retriever = get_ann_retriever(matrix) or matrix
+    ids, sims = retriever.search(profile_vec, limit, min_score=QUALITY_SIM_THRESHOLD,
+                                 margin=CANDIDATE_MARGIN)
+    bursaries = Bursary.objects.in_bulk(ids.tolist())
+    top = rank_candidates(user, ids, sims, bursaries, limit)
 
-    # Persist to UserBursaryMatch (idempotent-ish)
-    for item in top:
-        UserBursaryMatch.objects.update_or_create(
-            user=user, bursary=item["bursary"],
-            defaults={
-                "relevance_score": item["score"],
-                "match_quality": item["quality"],
-            }
-        )
+    # Persist to UserBursaryMatch in bulk
+    upsert_matches(user, [(item["bursary"], item["score"], item["quality"]) for item in top])
 
     # Return a clean payload for APIs
-    return [
+    results = [
         {
             "title": s["bursary"].title,
             "url": s["bursary"].url,
@@ -83,3 +96,7 @@ def ai_match_user_to_bursaries(user, limit=30):
         }
         for s in top
     ]
+    if on_event is not None:
+        for result in results:
+            on_event("match", result)
+    return results
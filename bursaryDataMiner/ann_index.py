@@ -0,0 +1,265 @@
+# bursaryDataMiner/ann_index.py
+import logging
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from bursaryDataMiner.embedding_pipeline import DEFAULT_TEMPLATE
+from bursaryDataMiner.embedding_store import normalize_rows, select_top
+
+logger = logging.getLogger(__name__)
+
+ASSIGN_BATCH_SIZE = 65_536
+
+
+class IVFIndex:
+    """
+    Inverted-file (IVF-flat) index over the rows of an external vector array.
+
+    Rows are L2-normalised embeddings. Training runs spherical k-means to
+    get nlist centroids; every row is filed under its nearest centroid. A
+    query scores the centroids, then scores exactly only the rows filed
+    under the nprobe best ones, so the work per query is about
+    nprobe / nlist of a brute-force scan.
+
+    The index stores row positions, not vectors, so it adds no copy of the
+    embedding matrix it points into.
+    """
+
+    def __init__(self, centroids):
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.reset()
+
+    @property
+    def nlist(self):
+        return len(self.centroids)
+
+    def __len__(self):
+        return self.size
+
+    def reset(self):
+        self.lists = [np.empty(0, dtype=np.int64) for _ in range(self.nlist)]
+        self.size = 0
+
+    @classmethod
+    def train(cls, vectors, nlist, iterations=10, sample_size=None, seed=0):
+        """Spherical k-means on a sample of the rows"""
+        rng = np.random.default_rng(seed)
+        n = len(vectors)
+        nlist = max(1, min(nlist, n))
+        sample_size = min(n, sample_size or nlist * 64)
+        sample = vectors[np.sort(rng.choice(n, sample_size, replace=False))]
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignments = cls(centroids).assign(sample)
+            order = np.argsort(assignments, kind="stable")
+            lists, starts = np.unique(assignments[order], return_index=True)
+            sums = np.zeros_like(centroids)
+            sums[lists] = np.add.reduceat(sample[order], starts, axis=0)
+            empty = np.ones(nlist, dtype=bool)
+            empty[lists] = False
+            if empty.any():
+                # Re-seed empty lists with random sample rows
+                sums[empty] = sample[rng.choice(sample_size, int(empty.sum()), replace=False)]
+            centroids = normalize_rows(sums)
+        return cls(centroids)
+
+    def assign(self, vectors):
+        """Nearest centroid for each row"""
+        out = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), ASSIGN_BATCH_SIZE):
+            batch = vectors[start:start + ASSIGN_BATCH_SIZE]
+            out[start:start + len(batch)] = np.argmax(batch @ self.centroids.T, axis=1)
+        return out
+
+    def add(self, rows, vectors=None, assignments=None):
+        """File row positions under their nearest centroid (or the given assignments)"""
+        rows = np.asarray(rows, dtype=np.int64)
+        if not len(rows):
+            return
+        if assignments is None:
+            assignments = self.assign(vectors)
+        order = np.argsort(assignments, kind="stable")
+        lists, starts = np.unique(assignments[order], return_index=True)
+        for list_no, group in zip(lists.tolist(), np.split(rows[order], starts[1:])):
+            self.lists[list_no] = np.concatenate([self.lists[list_no], group])
+        self.size += len(rows)
+
+    def assignments(self, count):
+        """List number of rows 0..count-1, or -1 for rows not in the index"""
+        out = np.full(count, -1, dtype=np.int64)
+        for list_no, rows in enumerate(self.lists):
+            out[rows[rows < count]] = list_no
+        return out
+
+    def search(self, vectors, query, k, nprobe=8, min_score=None, margin=0.0, dead=None):
+        """
+        Approximate best rows for a unit query: (row positions, scores), best first.
+
+        Rows flagged in the optional `dead` mask are skipped.
+        """
+        probes = np.argsort(-(self.centroids @ query))[:max(1, nprobe)]
+        rows = np.concatenate([self.lists[p] for p in probes.tolist()])
+        if not len(rows):
+            return rows, np.empty(0, dtype=np.float32)
+        scores = vectors[rows] @ query
+        if dead is not None:
+            scores[dead[rows]] = -np.inf
+        order = select_top(scores, k, min_score, margin)
+        return rows[order], scores[order]
+
+
+class AnnRetriever:
+    """
+    Retrieval stage over an EmbeddingMatrix, backed by a persisted IVFIndex.
+
+    Rows the matrix appends after the index was built are filed under their
+    nearest centroid on the next search (incremental insertion). When the
+    matrix reloads and row positions change, the lists are rebuilt from the
+    stored bursary id -> list map, assigning only unknown ids. A changed
+    vector becomes a new matrix row and is filed like any other; the row it
+    replaces is masked as dead and skipped at search time.
+    """
+
+    def __init__(self, matrix, index, nprobe=8, known_ids=None, known_lists=None, model_name=""):
+        self.matrix = matrix
+        self.index = index
+        self.nprobe = nprobe
+        self.model_name = model_name
+        self._known_ids = known_ids if known_ids is not None else np.empty(0, dtype=np.int64)
+        self._known_lists = known_lists if known_lists is not None else np.empty(0, dtype=np.int64)
+        self._generation = None
+        self._indexed = 0
+        self.mtime = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, matrix, nlist=None, iterations=10, nprobe=8):
+        view = matrix.view()
+        nlist = nlist or max(1, int(4 * np.sqrt(len(view))))
+        index = IVFIndex.train(view, nlist, iterations=iterations)
+        retriever = cls(matrix, index, nprobe=nprobe, model_name=matrix.model_name or "")
+        retriever.sync()
+        return retriever
+
+    def _lookup_known(self, ids):
+        lists = np.full(len(ids), -1, dtype=np.int64)
+        if len(self._known_ids):
+            pos = np.searchsorted(self._known_ids, ids)
+            pos[pos >= len(self._known_ids)] = 0
+            hit = self._known_ids[pos] == ids
+            lists[hit] = self._known_lists[pos[hit]]
+        return lists
+
+    def _sync(self, view):
+        ids = view.ids
+        if self._generation != self.matrix.generation:
+            lists = self._lookup_known(ids)
+            unknown = np.flatnonzero(lists < 0)
+            if len(unknown):
+                lists[unknown] = self.index.assign(view[unknown])
+            self.index.reset()
+            self.index.add(np.arange(len(ids)), assignments=lists)
+            order = np.argsort(ids)
+            self._known_ids, self._known_lists = ids[order], lists[order]
+            self._generation = self.matrix.generation
+            self._indexed = len(ids)
+            return len(unknown)
+
+        if len(ids) > self._indexed:
+            rows = np.arange(self._indexed, len(ids))
+            self.index.add(rows, view[rows])
+            self._indexed = len(ids)
+            return len(rows)
+        return 0
+
+    def sync(self):
+        """Bring the index in line with the matrix; returns the number of rows assigned"""
+        with self._lock:
+            return self._sync(self.matrix.view())
+
+    def search(self, query, k, min_score=None, margin=0.0, nprobe=None):
+        """Same contract as EmbeddingMatrix.search, over the probed lists only"""
+        query = np.asarray(query, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        # Under the lock so a matrix reload cannot swap row positions mid-search
+        with self._lock:
+            view = self.matrix.view()
+            if not view.live:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            self._sync(view)
+            rows, scores = self.index.search(view, query, k, nprobe or self.nprobe, min_score, margin,
+                                             dead=view.dead if view.live < len(view) else None)
+        return view.ids[rows], scores
+
+    def save(self, path):
+        """Write centroids and the bursary id -> list map; atomic via os.replace"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            view = self.matrix.view()
+            self._sync(view)
+            live = ~view.dead[:self._indexed]
+            ids = view.ids[:self._indexed][live]
+            lists = self.index.assignments(self._indexed)[live]
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, centroids=self.index.centroids, ids=ids, lists=lists,
+                     meta=np.array([self.matrix.template, self.model_name]))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, matrix, path, nprobe=8):
+        with np.load(path, allow_pickle=False) as data:
+            template, model_name = data["meta"].tolist()
+            if template != matrix.template or model_name != (matrix.model_name or ""):
+                raise ValueError(f"index was built for {template}/{model_name}")
+            ids, lists = data["ids"], data["lists"]
+            order = np.argsort(ids)
+            return cls(matrix, IVFIndex(data["centroids"]), nprobe=nprobe,
+                       known_ids=ids[order], known_lists=lists[order], model_name=model_name)
+
+
+def index_path(template=DEFAULT_TEMPLATE):
+    if not settings.ANN_INDEX_DIR:
+        return None
+    return Path(settings.ANN_INDEX_DIR) / f"ivf_{template}.npz"
+
+
+_retrievers = {}
+_retrievers_lock = threading.Lock()
+
+
+def get_ann_retriever(matrix):
+    """
+    Retriever for a loaded matrix, or None when exact search should be used:
+    ANN is disabled, no index has been built yet, or the corpus is small
+    enough (ANN_MIN_ROWS) that a brute-force scan is just as fast.
+
+    A rebuilt index file (newer mtime) is picked up on the next call.
+    """
+    path = index_path(matrix.template)
+    if path is None or len(matrix) < settings.ANN_MIN_ROWS:
+        return None
+    try:
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        return None
+
+    with _retrievers_lock:
+        retriever = _retrievers.get(matrix.template)
+        if (retriever is not None and retriever.matrix is matrix and retriever.mtime == mtime
+                and retriever.model_name == matrix.model_name):
+            return retriever
+        try:
+            retriever = AnnRetriever.load(matrix, path, nprobe=settings.ANN_NPROBE)
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"Ignoring ANN index {path}: {e}")
+            return None
+        retriever.mtime = mtime
+        _retrievers[matrix.template] = retriever
+    return retriever
@@ -0,0 +1,149 @@
+# bursaryDataMiner/bulk_ranking.py
+"""
+Rank every user against the corpus in one pass.
+
+Profile vectors for a batch of users are stacked into a (users, dim)
+matrix and multiplied against the embedding matrix one block of bursary
+rows at a time, so peak memory is block_rows * users scores however large
+the corpus is. A running per-user threshold keeps only rows that can still
+make a user's top k, and the survivors go through the same final ranking
+as ai_ranker.ai_match_user_to_bursaries. Matches for the whole batch are
+written with bulk upserts.
+"""
+import logging
+import time
+
+import numpy as np
+from django.contrib.auth import get_user_model
+
+from bursaryDataMiner.ai_ranker import CANDIDATE_MARGIN, QUALITY_SIM_THRESHOLD, rank_candidates, user_industries
+from bursaryDataMiner.embedding_pipeline import DEFAULT_TEMPLATE
+from bursaryDataMiner.embedding_store import get_embedding_matrix, select_top
+from bursaryDataMiner.models import Bursary
+from bursaryDataMiner.persistence import bulk_upsert_matches
+from bursaryDataMiner.profile_cache import get_profile_vectors
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_USER_BATCH = 256
+DEFAULT_BLOCK_ROWS = 16_384
+
+
+def _kth_per_user(users, scores, k, n_users):
+    """k-th best candidate score per user, -inf for users with fewer than k candidates"""
+    kth = np.full(n_users, -np.inf, dtype=np.float32)
+    if not len(users):
+        return kth
+    order = np.lexsort((-scores, users))
+    users, scores = users[order], scores[order]
+    starts = np.searchsorted(users, users, side="left")
+    at_k = (np.arange(len(users)) - starts) == k - 1
+    kth[users[at_k]] = scores[at_k]
+    return kth
+
+
+def top_candidates(view, profiles, k, min_score=None, margin=0.0, block_rows=DEFAULT_BLOCK_ROWS):
+    """
+    Best rows of a MatrixView for each row of `profiles` (unit vectors).
+
+    Returns one (row positions, scores) pair per profile, equal to
+    select_top(view.scores(profile), k, min_score, margin) but computed
+    block by block with one matrix product per block.
+    """
+    n_users = len(profiles)
+    profiles_t = np.ascontiguousarray(profiles.T, dtype=np.float32)
+    threshold = np.full(n_users, -np.inf, dtype=np.float32)
+    cand_users = np.empty(0, dtype=np.int64)
+    cand_rows = np.empty(0, dtype=np.int64)
+    cand_scores = np.empty(0, dtype=np.float32)
+
+    for first, vectors in view.blocks(block_rows):
+        scores = np.asarray(vectors @ profiles_t)
+        dead = view.dead[first:first + len(scores)]
+        if dead.any():
+            scores[dead] = -np.inf
+        if len(scores) >= k:
+            # The block's own k-th best is a lower bound on the final k-th best
+            threshold = np.maximum(threshold, np.partition(scores, len(scores) - k, axis=0)[len(scores) - k])
+        cut = threshold - margin
+        if min_score is not None:
+            cut = np.maximum(cut, min_score)
+        rows, users = np.nonzero((scores >= cut) & np.isfinite(scores))
+
+        cand_users = np.concatenate([cand_users, users])
+        cand_rows = np.concatenate([cand_rows, rows + first])
+        cand_scores = np.concatenate([cand_scores, scores[rows, users]])
+        threshold = np.maximum(threshold, _kth_per_user(cand_users, cand_scores, k, n_users))
+        keep = cand_scores >= threshold[cand_users] - margin
+        cand_users, cand_rows, cand_scores = cand_users[keep], cand_rows[keep], cand_scores[keep]
+
+    # Row order within each user, so ties resolve as in select_top
+    order = np.lexsort((cand_rows, cand_users))
+    cand_users, cand_rows, cand_scores = cand_users[order], cand_rows[order], cand_scores[order]
+    bounds = np.searchsorted(cand_users, np.arange(n_users + 1))
+    results = []
+    for user in range(n_users):
+        rows = cand_rows[bounds[user]:bounds[user + 1]]
+        scores = cand_scores[bounds[user]:bounds[user + 1]]
+        picked = select_top(scores, k, min_score, margin)
+        results.append((rows[picked], scores[picked]))
+    return results
+
+
+def rank_users(users, view, limit=30, block_rows=DEFAULT_BLOCK_ROWS):
+    """Rank one batch of users; returns (users ranked, match rows written)"""
+    vectors = get_profile_vectors(users)
+    users = [user for user in users if user.pk in vectors]
+    if not users or not view.live:
+        return 0, 0
+
+    profiles = np.stack([vectors[user.pk] for user in users])
+    candidates = top_candidates(view, profiles, limit, QUALITY_SIM_THRESHOLD, CANDIDATE_MARGIN, block_rows)
+    all_rows = np.unique(np.concatenate([rows for rows, _ in candidates]))
+    bursaries = Bursary.objects.only("id", "title", "url").in_bulk(view.ids[all_rows].tolist())
+
+    rows = []
+    for user, (cand_rows, scores) in zip(users, candidates):
+        top = rank_candidates(user, view.ids[cand_rows], scores, bursaries, limit, inds=user_industries(user))
+        rows.extend((user.pk, item["bursary"].pk, item["score"], item["quality"]) for item in top)
+    return len(users), bulk_upsert_matches(rows)
+
+
+def rank_all_users(users=None, limit=30, user_batch=DEFAULT_USER_BATCH, block_rows=DEFAULT_BLOCK_ROWS,
+                   progress=None):
+    """
+    Refresh UserBursaryMatch rows for every user (or the given queryset).
+
+    progress, if given, is called as progress(users_done, users_total).
+    Returns {"users", "ranked", "matches", "seconds", "users_per_second"}.
+    """
+    if users is None:
+        users = get_user_model().objects.all()
+    users = users.order_by("pk").prefetch_related("qualifications__courses")
+    total = users.count()
+    start = time.perf_counter()
+
+    # One consistent view for the whole run, even if embeddings change meanwhile
+    view = get_embedding_matrix(DEFAULT_TEMPLATE).view()
+    done = ranked = matches = 0
+    batch = []
+    for user in users.iterator(chunk_size=user_batch):
+        batch.append(user)
+        if len(batch) == user_batch:
+            batch_ranked, batch_matches = rank_users(batch, view, limit, block_rows)
+            ranked, matches, done = ranked + batch_ranked, matches + batch_matches, done + len(batch)
+            batch = []
+            if progress:
+                progress(done, total)
+    if batch:
+        batch_ranked, batch_matches = rank_users(batch, view, limit, block_rows)
+        ranked, matches, done = ranked + batch_ranked, matches + batch_matches, done + len(batch)
+        if progress:
+            progress(done, total)
+
+    seconds = time.perf_counter() - start
+    rate = done / max(seconds, 1e-9)
+    logger.info(f"Ranked {ranked}/{done} users against {view.live} bursaries, "
+                f"{matches} matches written ({seconds:.1f}s, {rate:.1f} users/s)")
+    return {"users": done, "ranked": ranked, "matches": matches,
+            "seconds": round(seconds, 2), "users_per_second": round(rate, 1)}
@@ -0,0 +1,175 @@
+# bursaryDataMiner/crawler.py
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import urlparse
+
+from django.db import connections
+
+from bursaryDataMiner.scraper import extract_all_links, fetch_page_content
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 16
+DEFAULT_PER_HOST_LIMIT = 2
+LINKS_PER_SITE = 40
+
+
+class AsyncCrawler:
+    """
+    Concurrent version of the scrape_site_improved loop.
+
+    Seed pages and the links found on them are fetched at the same time,
+    bounded by a global limit and a per-host limit, and paced per host by a
+    HostScheduler. A request waiting on its host's delay does not hold a
+    global slot, so other hosts keep going in parallel. The blocking requests
+    calls run on a dedicated thread pool sized to the global limit, so the
+    crawl does not depend on the default executor (which is tiny on
+    single-CPU dynos).
+
+    If on_event is given it is called as on_event(kind, data) for
+    "site_started" and "site_finished" progress events. Calls happen in
+    order on a single background thread, so the callback may use the ORM.
+
+    existing_urls may be a plain set or anything with a filter_unseen(urls)
+    method, such as seen_urls.SeenUrlIndex; the latter is called once per
+    site on the same background thread, since it may query the database.
+    """
+
+    def __init__(self, session, matcher, scheduler=None, cache=None, on_event=None,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY, per_host_limit=DEFAULT_PER_HOST_LIMIT,
+                 links_per_site=LINKS_PER_SITE):
+        self.session = session
+        self.matcher = matcher
+        self.scheduler = scheduler
+        self.cache = cache
+        self.on_event = on_event
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_host_limit = max(1, per_host_limit)
+        self.links_per_site = links_per_site
+        self._executor = None
+        self._global_limit = None
+        self._host_limits = {}
+        self._db_executor = None
+        self._found = 0
+
+    def _emit(self, kind, data):
+        if self.on_event is not None:
+            self._db_executor.submit(self.on_event, kind, data)
+
+    async def _filter_unseen(self, links, existing_urls):
+        filter_unseen = getattr(existing_urls, "filter_unseen", None)
+        if filter_unseen is None:
+            return [(url, title) for url, title in links if url not in existing_urls]
+
+        loop = asyncio.get_running_loop()
+        unseen = set(await loop.run_in_executor(
+            self._db_executor, filter_unseen, [url for url, _ in links]
+        ))
+        return [(url, title) for url, title in links if url in unseen]
+
+    def _host_limit(self, url):
+        host = urlparse(url).netloc.lower()
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = self._host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return limit
+
+    async def _fetch(self, func, url):
+        """Run a blocking fetch helper under the per-host and global limits"""
+        async with self._host_limit(url):
+            if self.scheduler is not None:
+                await self.scheduler.wait_async(url)
+            async with self._global_limit:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(
+                    self._executor, partial(func, url, self.session, cache=self.cache)
+                )
+
+    async def scrape_site(self, site_url, user_industries, user_courses, existing_urls):
+        """Async equivalent of scraper.scrape_site_improved"""
+        scraped_bursaries = []
+
+        try:
+            links = await self._fetch(extract_all_links, site_url)
+
+            if not links:
+                logger.info(f"No links found on {site_url}")
+                return scraped_bursaries
+
+            candidates = await self._filter_unseen(links[:self.links_per_site], existing_urls)
+            logger.info(f"Processing {len(candidates)} links from {site_url}")
+
+            descriptions = await asyncio.gather(
+                *(self._fetch(fetch_page_content, url) for url, _ in candidates)
+            )
+
+            for (url, title), description in zip(candidates, descriptions):
+                if not description:
+                    continue
+
+                if not self.matcher.is_likely_bursary_page(title, description):
+                    continue
+
+                score = self.matcher.calculate_basic_score(title, description, user_industries, user_courses)
+
+                if score > 0:
+                    scraped_bursaries.append({
+                        "url": url,
+                        "title": title,
+                        "description": description,
+                        "relevance_score": score
+                    })
+                    logger.info(f"Found: [{score}] {title[:50]}")
+
+            return scraped_bursaries
+
+        except Exception as e:
+            logger.error(f"Error scraping {site_url}: {e}")
+            return scraped_bursaries
+
+    async def _scrape_site_with_events(self, site_url, user_industries, user_courses, existing_urls):
+        self._emit("site_started", {"site": site_url})
+        bursaries = await self.scrape_site(site_url, user_industries, user_courses, existing_urls)
+        self._found += len(bursaries)
+        self._emit("site_finished", {
+            "site": site_url,
+            "found": len(bursaries),
+            "total_found": self._found,
+            "bursaries": [{"title": b["title"], "url": b["url"]} for b in bursaries],
+        })
+        return bursaries
+
+    async def crawl(self, sites, user_industries, user_courses, existing_urls):
+        """
+        Scrape every site concurrently.
+
+        Returns a list of (site_url, bursaries) pairs in the same order as
+        `sites`, so callers can persist results site by site.
+        """
+        self._global_limit = asyncio.Semaphore(self.max_concurrency)
+        self._host_limits = {}
+        self._found = 0
+        self._db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="crawler-db")
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                thread_name_prefix="crawler") as executor:
+            self._executor = executor
+            try:
+                results = await asyncio.gather(
+                    *(self._scrape_site_with_events(site, user_industries, user_courses, existing_urls)
+                      for site in sites)
+                )
+            finally:
+                self._executor = None
+                # The DB thread may have opened its own connection
+                self._db_executor.submit(connections.close_all)
+                self._db_executor.shutdown(wait=True)
+                self._db_executor = None
+
+        return list(zip(sites, results))
+
+    def run(self, sites, user_industries, user_courses, existing_urls):
+        """Blocking entry point for sync callers (views, management commands)"""
+        return asyncio.run(self.crawl(sites, user_industries, user_courses, existing_urls))
@@ -0,0 +1,100 @@
+# bursaryDataMiner/embedding_client.py
+"""
+Thin client for the local embedding server (see embedding_server.py).
+
+Wire format, over a Unix stream socket:
+
+  request   !I length, then a JSON body: {"op": "encode", "texts": [...]},
+            {"op": "ping"} or {"op": "stats"}
+  response  !II header length and payload length, a JSON header, then the
+            payload: rows * dim float32 values for "encode"
+
+A header with an "error" key reports a failed request. Requests on one
+connection are answered in order; each thread keeps its own connection.
+"""
+import json
+import socket
+import struct
+import threading
+
+import numpy as np
+
+REQUEST_HEADER = struct.Struct("!I")
+RESPONSE_HEADER = struct.Struct("!II")
+
+
+class EmbeddingServerError(RuntimeError):
+    pass
+
+
+def recv_exactly(sock, size):
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:], size - received)
+        if not n:
+            raise ConnectionError("embedding server closed the connection")
+        received += n
+    return buffer
+
+
+class EmbeddingClient:
+    """
+    Drop-in for an in-process encoder: encode(texts, batch_size) returns
+    L2-normalised float32 rows. batch_size is ignored, since the server
+    batches across all clients.
+    """
+
+    def __init__(self, socket_path, timeout=60.0):
+        self.socket_path = str(socket_path)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, "sock", None)
+        self._local.sock = None
+        if sock is not None:
+            sock.close()
+
+    def call(self, request):
+        """Send one request; returns (header dict, payload bytearray)"""
+        body = json.dumps(request).encode("utf-8")
+        # One retry on a fresh connection covers a restarted server; requests are idempotent
+        for attempt in range(2):
+            try:
+                sock = self._connection()
+                sock.sendall(REQUEST_HEADER.pack(len(body)) + body)
+                header_size, payload_size = RESPONSE_HEADER.unpack(recv_exactly(sock, RESPONSE_HEADER.size))
+                header = json.loads(recv_exactly(sock, header_size))
+                payload = recv_exactly(sock, payload_size)
+                break
+            except OSError as e:
+                self._close()
+                if attempt:
+                    raise EmbeddingServerError(f"embedding server at {self.socket_path} unavailable: {e}")
+        if "error" in header:
+            raise EmbeddingServerError(header["error"])
+        return header, payload
+
+    def ping(self):
+        return self.call({"op": "ping"})[0]
+
+    def stats(self):
+        return self.call({"op": "stats"})[0]
+
+    def encode(self, texts, batch_size=None):
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        header, payload = self.call({"op": "encode", "texts": texts})
+        return np.frombuffer(payload, dtype=np.float32).reshape(header["rows"], header["dim"])
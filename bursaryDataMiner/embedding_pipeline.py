@@ -0,0 +1,223 @@
+# bursaryDataMiner/embedding_pipeline.py
+import hashlib
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.db import connections, transaction
+
+from bursaryDataMiner.ai_matcher import build_bursary_corpus, embed_texts, get_model_name
+from bursaryDataMiner.embedding_worker import embed_chunk_in_worker, init_worker
+from bursaryDataMiner.models import Bursary, BursaryEmbedding
+from bursaryDataMiner.vector_codec import decode_vector
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 512
+DEFAULT_BATCH_SIZE = 64
+
+DEFAULT_TEMPLATE = "corpus"
+
+
+def _matcher_text(bursary):
+    from bursaryDataMiner.enhanced_ai_matcher import build_bursary_text
+    return build_bursary_text(bursary)
+
+
+# Each matcher embeds bursaries from its own text; vectors are stored per template
+TEXT_TEMPLATES = {
+    DEFAULT_TEMPLATE: build_bursary_corpus,  # ai_ranker
+    "matcher": _matcher_text,  # enhanced_ai_matcher
+}
+
+BURSARY_TEXT_FIELDS = ("id", "title", "description", "url")
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def bursary_text(bursary, template=DEFAULT_TEMPLATE):
+    return TEXT_TEMPLATES[template](bursary).strip()
+
+
+def _stored_state(ids, template):
+    """{bursary_id: (text_hash, model_name)} for one batch of ids"""
+    rows = BursaryEmbedding.objects.filter(bursary_id__in=ids, template=template).values_list(
+        "bursary_id", "text_hash", "model_name",
+    )
+    return {bursary_id: (digest, model_name) for bursary_id, digest, model_name in rows}
+
+
+def iter_changed_ids(queryset, model_name, template=DEFAULT_TEMPLATE, batch_size=2_000):
+    """
+    Ids of bursaries whose embedding for this template is missing, was made
+    by another model, or was made from different text.
+
+    Hashing the text is far cheaper than encoding it, so a refresh only
+    spends model time on what actually changed.
+    """
+    def changed(batch):
+        stored = _stored_state([b.id for b in batch], template)
+        for bursary in batch:
+            state = stored.get(bursary.id)
+            if state is None or state[1] != model_name or state[0] != text_hash(bursary_text(bursary, template)):
+                yield bursary.id
+
+    batch = []
+    for bursary in queryset.order_by("id").only(*BURSARY_TEXT_FIELDS).iterator(chunk_size=batch_size):
+        batch.append(bursary)
+        if len(batch) == batch_size:
+            yield from changed(batch)
+            batch = []
+    yield from changed(batch)
+
+
+def id_chunks(ids, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Split ids into lists of at most chunk_size.
+
+    Only ids are read up front, so workers can each load their own chunk.
+    """
+    chunks = []
+    chunk = []
+    for pk in ids:
+        chunk.append(pk)
+        if len(chunk) == chunk_size:
+            chunks.append(chunk)
+            chunk = []
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def write_embeddings(bursaries, vectors, hashes, model_name, template=DEFAULT_TEMPLATE):
+    """Upsert one embedding per bursary with INSERT ... ON CONFLICT (bursary, template)"""
+    objs = [
+        BursaryEmbedding(bursary=bursary, template=template, vector=vector,
+                         text_hash=digest, model_name=model_name)
+        for bursary, vector, digest in zip(bursaries, vectors, hashes)
+    ]
+    if not objs:
+        return 0
+    with transaction.atomic():
+        BursaryEmbedding.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=["bursary", "template"],
+            update_fields=["vector_data", "vector_scale", "vector_format",
+                           "text_hash", "model_name", "updated_at"],
+        )
+    return len(objs)
+
+
+def embed_bursaries(bursaries, template=DEFAULT_TEMPLATE, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Encode and store embeddings for already loaded bursaries.
+
+    Returns {bursary_id: float32 vector} for the bursaries that had text.
+    """
+    pairs = [(b, bursary_text(b, template)) for b in bursaries]
+    pairs = [(b, text) for b, text in pairs if text]
+    if not pairs:
+        return {}
+    bursaries = [b for b, _ in pairs]
+    texts = [text for _, text in pairs]
+
+    vectors = embed_texts(texts, batch_size=batch_size)
+    write_embeddings(bursaries, vectors, [text_hash(text) for text in texts], get_model_name(), template)
+    return {b.id: vector for b, vector in zip(bursaries, vectors)}
+
+
+def embed_chunk(ids, batch_size=DEFAULT_BATCH_SIZE, template=DEFAULT_TEMPLATE):
+    """Load, encode and store one chunk of bursaries"""
+    bursaries = Bursary.objects.filter(id__in=ids).only(*BURSARY_TEXT_FIELDS)
+    return len(embed_bursaries(bursaries, template, batch_size))
+
+
+def get_vectors(bursaries, template=DEFAULT_TEMPLATE, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Stored vectors for the given bursaries, embedding missing or stale ones on the spot.
+
+    One read for the stored rows and one batched encode for whatever is
+    missing, so callers only pay model time for bursaries the pipeline has
+    not reached yet. Returns {bursary_id: float32 vector}.
+    """
+    bursaries = list(bursaries)
+    if not bursaries:
+        return {}
+    rows = BursaryEmbedding.objects.filter(
+        bursary_id__in=[b.id for b in bursaries], template=template, model_name=get_model_name(),
+    ).exclude(vector_data__isnull=True).values_list(
+        "bursary_id", "text_hash", "vector_data", "vector_scale", "vector_format",
+    )
+    stored = {bursary_id: (digest, data, scale, fmt) for bursary_id, digest, data, scale, fmt in rows}
+
+    vectors = {}
+    missing = []
+    for bursary in bursaries:
+        digest, data, scale, fmt = stored.get(bursary.id, (None, None, None, None))
+        if data is not None and digest == text_hash(bursary_text(bursary, template)):
+            vectors[bursary.id] = decode_vector(data, scale, fmt)
+        else:
+            missing.append(bursary)
+
+    if missing:
+        logger.info(f"Embedding {len(missing)} bursaries without a stored '{template}' vector")
+        vectors.update(embed_bursaries(missing, template, batch_size))
+    return vectors
+
+
+def run_embedding_pipeline(queryset=None, template=DEFAULT_TEMPLATE, changed_only=True,
+                           chunk_size=DEFAULT_CHUNK_SIZE, batch_size=DEFAULT_BATCH_SIZE,
+                           workers=1, progress=None):
+    """
+    Embed bursaries chunk by chunk.
+
+    With changed_only (the default) bursaries whose stored text hash and
+    model name still match are skipped; otherwise everything is re-encoded.
+    Each chunk is one batched model.encode call and one bulk upsert. With
+    workers > 1 the chunks are spread over that many spawned processes,
+    each loading the model once and using its share of the CPU threads.
+    progress, if given, is called as progress(done_rows, total_rows).
+    Returns {"chunks", "embedded", "skipped", "seconds"}.
+    """
+    if queryset is None:
+        queryset = Bursary.objects.all()
+    start = time.perf_counter()
+    if changed_only:
+        ids = iter_changed_ids(queryset, get_model_name(), template)
+    else:
+        ids = queryset.order_by("id").values_list("id", flat=True).iterator(chunk_size=10_000)
+    chunks = id_chunks(ids, chunk_size)
+    total = sum(len(chunk) for chunk in chunks)
+    skipped = queryset.count() - total
+    embedded = 0
+
+    if workers <= 1 or len(chunks) <= 1:
+        for ids in chunks:
+            embedded += embed_chunk(ids, batch_size, template)
+            if progress:
+                progress(embedded, total)
+    else:
+        workers = min(workers, len(chunks))
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        # Spawn rather than fork: torch and open DB connections are not fork-safe
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=init_worker, initargs=(threads,)) as pool:
+            futures = [
+                pool.submit(embed_chunk_in_worker, ids, batch_size, template)
+                for ids in chunks
+            ]
+            for future in as_completed(futures):
+                embedded += future.result()
+                if progress:
+                    progress(embedded, total)
+
+    seconds = time.perf_counter() - start
+    logger.info(f"Embedded {embedded} '{template}' vectors in {len(chunks)} chunks, "
+                f"{skipped} unchanged ({seconds:.1f}s)")
+    return {"chunks": len(chunks), "embedded": embedded, "skipped": skipped, "seconds": round(seconds, 2)}
@@ -0,0 +1,141 @@
+# bursaryDataMiner/embedding_server.py
+"""
+Long-lived local embedding service on a Unix socket.
+
+One process loads the encoder once; gunicorn workers, the job worker and
+management commands on the same host reach it through EmbeddingClient
+when EMBEDDING_SERVER_SOCKET is set, so model memory is paid once.
+
+Dynamic micro-batching: encode requests from all connections go into one
+queue. The batcher takes the first waiting request, keeps collecting
+until max_batch texts are queued or max_wait_ms has passed, and runs one
+encoder call for all of them on a worker thread. Requests that arrive
+while a batch is encoding form the next batch, so under load batches grow
+on their own and an idle server answers after at most max_wait_ms.
+"""
+import asyncio
+import json
+import logging
+import os
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from bursaryDataMiner.embedding_client import REQUEST_HEADER, RESPONSE_HEADER
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingServer:
+    def __init__(self, encoder, model_name, socket_path, max_batch=64, max_wait_ms=5.0):
+        self.encoder = encoder
+        self.model_name = model_name
+        self.socket_path = Path(socket_path)
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.stats = {"requests": 0, "texts": 0, "batches": 0, "encode_seconds": 0.0}
+        self._queue = None
+        # One thread: encoder calls run one at a time and use the library's own intra-op threads
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="encode")
+
+    async def serve(self):
+        self._queue = asyncio.Queue()
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.socket_path.exists():
+            self.socket_path.unlink()  # left behind by a killed server
+        server = await asyncio.start_unix_server(self._handle, path=str(self.socket_path))
+        os.chmod(self.socket_path, 0o660)
+
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+        batcher = asyncio.create_task(self._batcher())
+        logger.info(f"Embedding server for {self.model_name} listening on {self.socket_path}")
+        async with server:
+            await stop.wait()
+        batcher.cancel()
+        self._executor.shutdown(wait=True)
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+        logger.info(f"Embedding server stopped: {self.stats}")
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    (size,) = REQUEST_HEADER.unpack(await reader.readexactly(REQUEST_HEADER.size))
+                    request = json.loads(await reader.readexactly(size))
+                except asyncio.IncompleteReadError:
+                    return
+                header, payload = await self._dispatch(request)
+                body = json.dumps(header).encode("utf-8")
+                writer.write(RESPONSE_HEADER.pack(len(body), len(payload)) + body)
+                writer.write(payload)
+                await writer.drain()
+        except (ConnectionError, ValueError) as e:
+            logger.warning(f"Dropping embedding client: {e}")
+        finally:
+            writer.close()
+
+    async def _dispatch(self, request):
+        op = request.get("op")
+        if op == "ping":
+            return {"model_name": self.model_name}, b""
+        if op == "stats":
+            return dict(self.stats, pending=self._queue.qsize()), b""
+        if op != "encode":
+            return {"error": f"unknown op {op!r}"}, b""
+
+        texts = request.get("texts") or []
+        if not texts:
+            return {"rows": 0, "dim": 0}, b""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((texts, future))
+        try:
+            vectors = await future
+        except Exception as e:
+            return {"error": f"encode failed: {e}"}, b""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        return {"rows": vectors.shape[0], "dim": vectors.shape[1]}, vectors.tobytes()
+
+    async def _batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            count = len(batch[0][0])
+            deadline = loop.time() + self.max_wait
+            while count < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                count += len(item[0])
+
+            texts = [text for item_texts, _ in batch for text in item_texts]
+            start = time.perf_counter()
+            try:
+                vectors = await loop.run_in_executor(self._executor, self.encoder.encode, texts, self.max_batch)
+            except Exception as e:
+                logger.error(f"Encoding a batch of {len(texts)} texts failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.stats["encode_seconds"] += time.perf_counter() - start
+            self.stats["requests"] += len(batch)
+            self.stats["texts"] += len(texts)
+            self.stats["batches"] += 1
+
+            offset = 0
+            for item_texts, future in batch:
+                if not future.done():
+                    future.set_result(vectors[offset:offset + len(item_texts)])
+                offset += len(item_texts)
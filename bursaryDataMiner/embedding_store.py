@@ -0,0 +1,457 @@
+# bursaryDataMiner/embedding_store.py
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from bursaryDataMiner.ai_matcher import get_model_name
+from bursaryDataMiner.embedding_pipeline import DEFAULT_TEMPLATE
+from bursaryDataMiner.models import BursaryEmbedding
+from bursaryDataMiner.vector_codec import decode_many, decode_vector
+
+logger = logging.getLogger(__name__)
+
+LOAD_CHUNK_SIZE = 5_000
+SNAPSHOT_POINTER = "CURRENT"
+# refresh() re-reads rows this far behind the newest loaded updated_at, so a row
+# committed late with an older timestamp is still picked up
+REFRESH_OVERLAP = timedelta(seconds=60)
+# Seconds between full id scans that mask deleted rows and load any row the overlap missed
+RECONCILE_INTERVAL = 300
+
+
+def normalize_rows(vectors):
+    """L2-normalise float32 rows in place, leaving all-zero rows as they are"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    vectors /= norms
+    return vectors
+
+
+def top_k(scores, k):
+    """Indices of the k highest scores, best first, via argpartition instead of a full sort"""
+    if k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    part = np.argpartition(-scores, k)[:k]
+    return part[np.argsort(-scores[part], kind="stable")]
+
+
+def select_top(scores, k, min_score=None, margin=0.0):
+    """
+    Indices of the top k scores, best first, plus any further ones within
+    `margin` of the k-th score (for callers that re-rank with small boosts).
+    Scores under min_score, and masked rows (-inf), are dropped.
+    """
+    if not len(scores) or k <= 0:
+        return np.empty(0, dtype=np.int64)
+    order = top_k(scores, k)
+    if margin and len(order) < len(scores):
+        extra = np.flatnonzero(scores >= scores[order[-1]] - margin)
+        order = extra[np.argsort(-scores[extra], kind="stable")]
+    if min_score is not None:
+        order = order[scores[order] >= min_score]
+    return order[np.isfinite(scores[order])]
+
+
+class MatrixView:
+    """
+    Consistent, read-only view of an EmbeddingMatrix.
+
+    Row positions cover the base rows first, then the tail. Base rows that
+    were later updated or deleted are flagged in `dead` and score -inf.
+    """
+
+    def __init__(self, base_ids, base_vectors, tail_ids, tail_vectors, dead):
+        self.base_vectors = base_vectors
+        self.tail_vectors = tail_vectors
+        self.split = len(base_ids)
+        self.ids = np.concatenate([base_ids, tail_ids]) if len(tail_ids) else base_ids
+        self.dead = dead
+        self.live = len(self.ids) - int(np.count_nonzero(dead))
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def dim(self):
+        return max(self.base_vectors.shape[1], self.tail_vectors.shape[1])
+
+    def __getitem__(self, rows):
+        """Vectors at an array of row positions"""
+        rows = np.asarray(rows, dtype=np.int64)
+        if len(self.ids) == self.split:
+            return np.asarray(self.base_vectors[rows])
+        out = np.empty((len(rows), self.dim), dtype=np.float32)
+        in_base = rows < self.split
+        out[in_base] = self.base_vectors[rows[in_base]]
+        out[~in_base] = self.tail_vectors[rows[~in_base] - self.split]
+        return out
+
+    def scores(self, query):
+        """Cosine score of every row against a unit query"""
+        scores = np.asarray(self.base_vectors @ query)
+        if len(self.ids) > self.split:
+            scores = np.concatenate([scores, self.tail_vectors @ query])
+        if self.live < len(self.ids):
+            scores[self.dead] = -np.inf
+        return scores
+
+    def live_ids(self):
+        return self.ids[~self.dead] if self.live < len(self.ids) else self.ids
+
+    def blocks(self, size):
+        """Yield (first row, vectors) for consecutive blocks of at most `size` rows"""
+        for offset, vectors in ((0, self.base_vectors), (self.split, self.tail_vectors)):
+            for start in range(0, len(vectors), size):
+                yield offset + start, vectors[start:start + size]
+
+
+def snapshot_root(template=DEFAULT_TEMPLATE):
+    """Directory holding a template's snapshot versions, or None when snapshots are disabled"""
+    if not settings.EMBEDDING_SNAPSHOT_DIR:
+        return None
+    return Path(settings.EMBEDDING_SNAPSHOT_DIR) / template
+
+
+def current_snapshot(template=DEFAULT_TEMPLATE):
+    """Directory of the published snapshot version, or None"""
+    root = snapshot_root(template)
+    if root is None:
+        return None
+    try:
+        version = (root / SNAPSHOT_POINTER).read_text().strip()
+    except FileNotFoundError:
+        return None
+    return root / version if version else None
+
+
+class EmbeddingMatrix:
+    """
+    Process-wide copy of one template's bursary embeddings.
+
+    Vectors are float32, L2-normalised rows with a parallel int64 array of
+    bursary ids, so scoring a profile against every bursary is a single
+    matrix-vector product.
+
+    The base rows come from the published .npy snapshot (see
+    export_embedding_snapshot), opened with np.load(mmap_mode="r") so every
+    worker on the host shares the same page-cache pages instead of holding
+    its own copy; without a snapshot they are read from the database. The
+    base is never written to.
+
+    refresh() only reads rows whose updated_at is at or after the newest one
+    already loaded, less REFRESH_OVERLAP for rows committed late. New rows,
+    and new versions of base rows, go into a small private tail (which
+    doubles when full); superseded or deleted base rows are masked as dead.
+    Every RECONCILE_INTERVAL seconds one scan of the stored ids masks
+    deleted rows and loads anything still missing. A newly published
+    snapshot version is swapped in on the next refresh.
+
+    Readers take a MatrixView, so a refresh in another thread never exposes
+    half-updated arrays.
+    """
+
+    def __init__(self, template=DEFAULT_TEMPLATE, use_snapshot=True):
+        self.template = template
+        self.use_snapshot = use_snapshot
+        self.model_name = None
+        self.snapshot_version = None
+        self._reset(np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32))
+        self._loaded_until = None
+        self._reconciled_at = 0.0
+        # Bumped on every full reload, when row positions may change
+        self.generation = 0
+        self._lock = threading.Lock()
+
+    def _reset(self, base_ids, base_vectors):
+        self._base_ids, self._base_vectors = base_ids, base_vectors
+        self._tail_ids = np.empty(0, dtype=np.int64)
+        self._tail_vectors = np.empty((0, base_vectors.shape[1]), dtype=np.float32)
+        self._tail_size = 0
+        self._tail_positions = {}
+        self._dead = np.zeros(len(base_ids), dtype=bool)
+        self._view = MatrixView(base_ids, base_vectors, self._tail_ids, self._tail_vectors, self._dead)
+
+    def __len__(self):
+        return self._view.live
+
+    def view(self):
+        return self._view
+
+    @property
+    def ids(self):
+        """Bursary ids of the live rows"""
+        return self._view.live_ids()
+
+    @property
+    def nbytes(self):
+        """Memory private to this process; a memory-mapped base is shared and not counted"""
+        private = self._tail_ids.nbytes + self._tail_vectors.nbytes + self._dead.nbytes
+        if not isinstance(self._base_vectors, np.memmap):
+            private += self._base_ids.nbytes + self._base_vectors.nbytes
+        return private
+
+    def _queryset(self):
+        return BursaryEmbedding.objects.filter(
+            template=self.template, model_name=self.model_name, vector_data__isnull=False,
+        )
+
+    def _read(self, queryset):
+        """Yield (ids, float32 vectors, newest updated_at) per chunk of rows"""
+        rows = queryset.order_by("updated_at", "id").values_list(
+            "bursary_id", "vector_data", "vector_scale", "vector_format", "updated_at",
+        )
+        chunk = []
+        for row in rows.iterator(chunk_size=LOAD_CHUNK_SIZE):
+            chunk.append(row)
+            if len(chunk) == LOAD_CHUNK_SIZE:
+                yield self._decode(chunk)
+                chunk = []
+        if chunk:
+            yield self._decode(chunk)
+
+    @staticmethod
+    def _decode(chunk):
+        ids = np.array([row[0] for row in chunk], dtype=np.int64)
+        formats = {row[3] for row in chunk}
+        if len(formats) == 1:
+            vectors = decode_many([row[1] for row in chunk], [row[2] for row in chunk], formats.pop())
+        else:
+            # Only while a format change is being rolled out
+            vectors = np.stack([decode_vector(data, scale, fmt) for _, data, scale, fmt, _ in chunk])
+        return ids, normalize_rows(vectors), chunk[-1][4]
+
+    def _load_snapshot(self):
+        """(ids, vectors, updated_until, version) of the published snapshot, or None"""
+        path = current_snapshot(self.template) if self.use_snapshot else None
+        if path is None:
+            return None
+        try:
+            meta = json.loads((path / "meta.json").read_text())
+            if meta["model_name"] != self.model_name:
+                logger.warning(f"Ignoring embedding snapshot {path}: built with {meta['model_name']}")
+                return None
+            ids = np.load(path / "ids.npy", mmap_mode="r")
+            vectors = np.load(path / "vectors.npy", mmap_mode="r")
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"Ignoring embedding snapshot {path}: {e}")
+            return None
+        updated_until = meta["updated_until"] and datetime.fromisoformat(meta["updated_until"])
+        return ids, vectors, updated_until, path.name
+
+    def _load_database(self):
+        """(ids, vectors, newest updated_at) for every stored row, sorted by bursary id"""
+        id_parts, vector_parts, newest = [], [], None
+        for ids, vectors, chunk_newest in self._read(self._queryset()):
+            id_parts.append(ids)
+            vector_parts.append(vectors)
+            newest = chunk_newest
+        if not id_parts:
+            return np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32), None
+        ids = np.concatenate(id_parts)
+        order = np.argsort(ids, kind="stable")
+        return ids[order], np.ascontiguousarray(np.concatenate(vector_parts)[order]), newest
+
+    def reload(self):
+        """Load the base from the published snapshot, or the database, and catch up"""
+        with self._lock:
+            self.model_name = get_model_name()
+            snapshot = self._load_snapshot()
+            if snapshot is not None:
+                base_ids, base_vectors, self._loaded_until, self.snapshot_version = snapshot
+            else:
+                base_ids, base_vectors, self._loaded_until = self._load_database()
+                self.snapshot_version = None
+            self._reset(base_ids, base_vectors)
+            self.generation += 1
+            if snapshot is not None:
+                if self._loaded_until is not None:
+                    self._apply_changes()
+                self._reconcile()
+            self._reconciled_at = time.monotonic()
+
+        source = f"snapshot {self.snapshot_version}" if self.snapshot_version else "the database"
+        logger.info(f"Loaded {len(self)} '{self.template}' embeddings from {source} "
+                    f"({self.nbytes / 2**20:.1f}MB private)")
+        return len(self)
+
+    def refresh(self):
+        """Pick up rows written since the last load; returns the number of rows read"""
+        if self._loaded_until is None or self.model_name != get_model_name():
+            return self.reload()
+        if self.use_snapshot:
+            current = current_snapshot(self.template)
+            if (current.name if current else None) != self.snapshot_version:
+                return self.reload()
+
+        with self._lock:
+            read = self._apply_changes()
+            if time.monotonic() - self._reconciled_at >= RECONCILE_INTERVAL:
+                self._reconcile()
+                self._reconciled_at = time.monotonic()
+        return read
+
+    def _base_row(self, bursary_id):
+        row = int(np.searchsorted(self._base_ids, bursary_id))
+        if row < len(self._base_ids) and self._base_ids[row] == bursary_id:
+            return row
+        return None
+
+    def _apply_changes(self):
+        return self._apply(self._queryset().filter(updated_at__gte=self._loaded_until - REFRESH_OVERLAP))
+
+    def _apply(self, queryset):
+        """Merge the queryset's rows into the tail; returns the number of rows read"""
+        read = changed = 0
+        for chunk_ids, chunk_vectors, newest in self._read(queryset):
+            read += len(chunk_ids)
+            for bursary_id, vector in zip(chunk_ids.tolist(), chunk_vectors):
+                row = self._tail_positions.get(bursary_id)
+                if row is not None:
+                    dead_row = len(self._base_ids) + row
+                    if not self._dead[dead_row] and np.array_equal(self._tail_vectors[row], vector):
+                        continue  # re-read inside the overlap window
+                    self._tail_vectors[row] = vector
+                    self._dead[dead_row] = False
+                    changed += 1
+                    continue
+                row = self._base_row(bursary_id)
+                if row is not None and not self._dead[row]:
+                    if np.array_equal(self._base_vectors[row], vector):
+                        continue
+                    self._dead[row] = True
+                self._append(bursary_id, vector)
+                changed += 1
+            if self._loaded_until is None or newest > self._loaded_until:
+                self._loaded_until = newest
+        if changed:
+            self._publish()
+        return read
+
+    def _append(self, bursary_id, vector):
+        size = self._tail_size
+        if size == len(self._tail_ids) or self._tail_vectors.shape[1] != len(vector):
+            capacity = max(1024, 2 * len(self._tail_ids))
+            tail_ids = np.empty(capacity, dtype=np.int64)
+            tail_vectors = np.empty((capacity, len(vector)), dtype=np.float32)
+            dead = np.zeros(len(self._base_ids) + capacity, dtype=bool)
+            tail_ids[:size] = self._tail_ids[:size]
+            tail_vectors[:size] = self._tail_vectors[:size]
+            dead[:len(self._base_ids) + size] = self._dead[:len(self._base_ids) + size]
+            self._tail_ids, self._tail_vectors, self._dead = tail_ids, tail_vectors, dead
+        self._tail_ids[size] = bursary_id
+        self._tail_vectors[size] = vector
+        self._tail_positions[bursary_id] = size
+        self._tail_size += 1
+
+    def _reconcile(self):
+        """
+        Mask rows whose embedding is no longer stored and load stored rows
+        that are not live yet; returns (masked, loaded)
+        """
+        stored = np.fromiter(self._queryset().values_list("bursary_id", flat=True).iterator(),
+                             dtype=np.int64)
+        rows = len(self._base_ids) + self._tail_size
+        ids = np.concatenate([self._base_ids, self._tail_ids[:self._tail_size]])
+        gone = ~self._dead[:rows] & ~np.isin(ids, stored)
+        if gone.any():
+            self._dead[:rows] |= gone
+            self._publish()
+
+        missing = np.setdiff1d(stored, self._view.live_ids())
+        for start in range(0, len(missing), LOAD_CHUNK_SIZE):
+            self._apply(self._queryset().filter(bursary_id__in=missing[start:start + LOAD_CHUNK_SIZE].tolist()))
+        if len(missing):
+            logger.info(f"Loaded {len(missing)} '{self.template}' embeddings that incremental refreshes missed")
+        return int(gone.sum()), len(missing)
+
+    def _publish(self):
+        size = self._tail_size
+        self._view = MatrixView(self._base_ids, self._base_vectors, self._tail_ids[:size],
+                                self._tail_vectors[:size], self._dead[:len(self._base_ids) + size].copy())
+
+    def search(self, query, k, min_score=None, margin=0.0):
+        """
+        Exact best matches for a query vector: (bursary_ids, cosine scores), best first.
+
+        See select_top for k, min_score and margin.
+        """
+        view = self._view
+        if not view.live:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        query = np.asarray(query, dtype=np.float32)
+        scores = view.scores(query / (np.linalg.norm(query) or 1.0))
+        order = select_top(scores, k, min_score, margin)
+        return view.ids[order], scores[order]
+
+    def export_snapshot(self, keep=2):
+        """
+        Write the live rows as a new snapshot version and publish it.
+
+        The version directory is written under a temporary name and renamed
+        into place, then the CURRENT pointer is replaced with os.replace, so
+        a reader sees either the previous version or the complete new one.
+        Workers that still map an older version keep reading it until their
+        next refresh; all but the `keep` newest versions are removed.
+        Returns the path of the new version.
+        """
+        root = snapshot_root(self.template)
+        if root is None:
+            raise ValueError("EMBEDDING_SNAPSHOT_DIR is empty, snapshots are disabled")
+        with self._lock:
+            view = self._view
+            updated_until = self._loaded_until
+        ids = view.live_ids()
+        vectors = view[np.flatnonzero(~view.dead)] if len(ids) else np.empty((0, view.dim), dtype=np.float32)
+        order = np.argsort(ids, kind="stable")
+        ids, vectors = ids[order], np.ascontiguousarray(vectors[order], dtype=np.float32)
+
+        version = timezone.now().strftime("%Y%m%dT%H%M%S%f")
+        root.mkdir(parents=True, exist_ok=True)
+        tmp_dir = root / f".{version}.tmp"
+        tmp_dir.mkdir()
+        np.save(tmp_dir / "ids.npy", ids)
+        np.save(tmp_dir / "vectors.npy", vectors)
+        (tmp_dir / "meta.json").write_text(json.dumps({
+            "version": version,
+            "template": self.template,
+            "model_name": self.model_name,
+            "rows": len(ids),
+            "dim": vectors.shape[1],
+            "updated_until": updated_until.isoformat() if updated_until else None,
+            "created_at": timezone.now().isoformat(),
+        }))
+        os.rename(tmp_dir, root / version)
+
+        pointer = root / f".{SNAPSHOT_POINTER}.tmp"
+        pointer.write_text(version)
+        os.replace(pointer, root / SNAPSHOT_POINTER)
+
+        versions = sorted(p for p in root.iterdir() if p.is_dir() and not p.name.startswith("."))
+        for old in versions[:-max(1, keep)]:
+            # Unlinking is safe on POSIX: processes mapping the files keep their pages
+            shutil.rmtree(old, ignore_errors=True)
+        return root / version
+
+
+_matrices = {}
+_matrices_lock = threading.Lock()
+
+
+def get_embedding_matrix(template=DEFAULT_TEMPLATE):
+    """Process-wide matrix for a template, loaded on first use and refreshed on every call"""
+    with _matrices_lock:
+        matrix = _matrices.get(template)
+        if matrix is None:
+            matrix = _matrices[template] = EmbeddingMatrix(template)
+    matrix.refresh()
+    return matrix
@@ -0,0 +1,26 @@
+# bursaryDataMiner/embedding_worker.py
+"""
+Entry points for embedding worker processes.
+
+Spawned workers unpickle these functions before Django is set up, so this
+module must not import models at import time.
+"""
+import django
+
+
+def init_worker(threads):
+    django.setup()
+    from bursaryDataMiner.encoders import set_num_threads
+
+    set_num_threads(threads)
+
+
+def embed_chunk_in_worker(ids, batch_size, template):
+    from django.db import connections
+
+    from bursaryDataMiner.embedding_pipeline import embed_chunk
+
+    try:
+        return embed_chunk(ids, batch_size, template)
+    finally:
+        connections.close_all()
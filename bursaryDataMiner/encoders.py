@@ -0,0 +1,238 @@
+# bursaryDataMiner/encoders.py
+"""
+Text encoder backends behind ai_matcher.embed_text / embed_texts.
+
+EMBEDDING_BACKEND selects one:
+
+  "sentence-transformers"  the PyTorch model (default)
+  "onnx"                   the same network exported to ONNX and run with
+                           ONNX Runtime, optionally int8 dynamic-quantized
+                           (EMBEDDING_ONNX_QUANTIZED); see export_onnx_encoder
+
+Both return L2-normalised float32 rows from mean-pooled token embeddings,
+so their vectors are interchangeable with the stored ones within the
+tolerance checked by benchmark_encoders. torch, sentence_transformers and
+onnxruntime are only imported by the backend that needs them.
+"""
+import json
+import logging
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+logger = logging.getLogger(__name__)
+
+BACKEND_SENTENCE_TRANSFORMERS = "sentence-transformers"
+BACKEND_ONNX = "onnx"
+BACKENDS = (BACKEND_SENTENCE_TRANSFORMERS, BACKEND_ONNX)
+
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_QUANTIZED_FILE = "model.int8.onnx"
+ONNX_META_FILE = "encoder.json"
+
+_num_threads = 0
+
+
+def set_num_threads(threads):
+    """Limit intra-op threads for encoders created from now on, and torch; 0 keeps library defaults"""
+    global _num_threads
+    _num_threads = threads
+    # torch is only configured once something has loaded it; SentenceTransformerEncoder applies the limit itself
+    if threads > 0 and "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(threads)
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32, copy=False)
+
+
+class SentenceTransformerEncoder:
+    name = BACKEND_SENTENCE_TRANSFORMERS
+
+    def __init__(self, model_name):
+        from sentence_transformers import SentenceTransformer
+
+        set_num_threads(_num_threads)
+        self.model = SentenceTransformer(model_name, device="cpu")
+
+    def encode(self, texts, batch_size=64):
+        vectors = self.model.encode(list(texts), batch_size=batch_size, normalize_embeddings=True,
+                                    convert_to_numpy=True, show_progress_bar=False)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+class OnnxEncoder:
+    """
+    ONNX Runtime session over an exported transformer, with the fast
+    tokenizer saved next to it. Pooling and normalisation match the
+    sentence-transformers pipeline (mean over non-padding tokens, then L2).
+    """
+    name = BACKEND_ONNX
+
+    def __init__(self, model_dir, quantized=False):
+        try:
+            import onnxruntime
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImproperlyConfigured(f"EMBEDDING_BACKEND=onnx needs onnxruntime and tokenizers: {e}")
+
+        model_dir = Path(model_dir)
+        path = model_dir / (ONNX_QUANTIZED_FILE if quantized else ONNX_MODEL_FILE)
+        if not path.exists():
+            raise ImproperlyConfigured(f"No ONNX encoder at {path}, run `manage.py export_onnx_encoder`")
+        self.meta = json.loads((model_dir / ONNX_META_FILE).read_text())
+        self.quantized = quantized
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.meta["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.meta["pad_token_id"], pad_token=self.meta["pad_token"])
+
+        options = onnxruntime.SessionOptions()
+        if _num_threads:
+            options.intra_op_num_threads = _num_threads
+        self.session = onnxruntime.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feed = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": mask,
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(None, {k: v for k, v in feed.items() if k in self.input_names})[0]
+        weights = mask[:, :, None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        return _normalize(pooled)
+
+    def encode(self, texts, batch_size=64):
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        # Similar lengths per batch keep padding small, as sentence-transformers does
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        out = None
+        for start in range(0, len(texts), batch_size):
+            rows = order[start:start + batch_size]
+            vectors = self._encode_batch([texts[i] for i in rows])
+            if out is None:
+                out = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            out[rows] = vectors
+        return out
+
+
+def _pooling_mode(module):
+    mode = getattr(module, "pooling_mode", None)  # sentence-transformers >= 5
+    return mode if isinstance(mode, str) else module.get_pooling_mode_str()
+
+
+def export_onnx_encoder(model_name, output_dir, quantize=True, opset=17):
+    """
+    Export a sentence-transformers model's transformer to ONNX (dynamic
+    batch and sequence axes), save its fast tokenizer alongside, and
+    optionally write an int8 dynamic-quantized copy. Returns the files written.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    model = SentenceTransformer(model_name, device="cpu")
+    pooling = _pooling_mode(model[1]) if len(model) > 1 else "mean"
+    if pooling != "mean":
+        raise ValueError(f"{model_name} uses {pooling} pooling; the ONNX encoder only implements mean")
+    transformer = model[0].auto_model.eval()
+    tokenizer = model.tokenizer
+
+    class LastHiddenState(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.inner(input_ids=input_ids, attention_mask=attention_mask,
+                              token_type_ids=token_type_ids).last_hidden_state
+
+    sample = tokenizer(["Bursary for engineering students", "Funding"], padding=True, return_tensors="pt")
+    axes = {0: "batch", 1: "sequence"}
+    path = output_dir / ONNX_MODEL_FILE
+    with torch.no_grad():
+        torch.onnx.export(
+            LastHiddenState(transformer),
+            (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+            str(path),
+            input_names=["input_ids", "attention_mask", "token_type_ids"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={"input_ids": axes, "attention_mask": axes, "token_type_ids": axes,
+                          "last_hidden_state": axes},
+            opset_version=opset,
+            dynamo=False,
+        )
+    tokenizer.save_pretrained(str(output_dir))
+    (output_dir / ONNX_META_FILE).write_text(json.dumps({
+        "model_name": model_name,
+        "max_seq_length": model.max_seq_length,
+        "pad_token": tokenizer.pad_token,
+        "pad_token_id": tokenizer.pad_token_id,
+    }))
+    written = [path]
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(str(path), str(output_dir / ONNX_QUANTIZED_FILE), weight_type=QuantType.QInt8)
+        written.append(output_dir / ONNX_QUANTIZED_FILE)
+    return written
+
+
+def create_encoder(backend, model_name):
+    if backend == BACKEND_SENTENCE_TRANSFORMERS:
+        return SentenceTransformerEncoder(model_name)
+    if backend == BACKEND_ONNX:
+        encoder = OnnxEncoder(settings.EMBEDDING_ONNX_DIR, quantized=settings.EMBEDDING_ONNX_QUANTIZED)
+        if encoder.meta["model_name"] != model_name:
+            raise ImproperlyConfigured(f"ONNX encoder in {settings.EMBEDDING_ONNX_DIR} was exported from "
+                                       f"{encoder.meta['model_name']}, not {model_name}")
+        return encoder
+    raise ImproperlyConfigured(f"Unknown EMBEDDING_BACKEND {backend!r}, expected one of {BACKENDS}")
+
+
+_encoder = None
+_encoder_lock = threading.Lock()
+
+
+def connect_encoder(socket_path, model_name):
+    """EmbeddingClient for a running embedding server, checked to serve model_name"""
+    from bursaryDataMiner.embedding_client import EmbeddingClient
+
+    client = EmbeddingClient(socket_path)
+    served = client.ping()["model_name"]
+    if served != model_name:
+        raise ImproperlyConfigured(f"Embedding server at {socket_path} serves {served}, not {model_name}")
+    return client
+
+
+def get_encoder(model_name):
+    """
+    Process-wide encoder, created on first use: a client of the local
+    embedding server when EMBEDDING_SERVER_SOCKET is set, otherwise the
+    configured backend loaded in this process
+    """
+    global _encoder
+    with _encoder_lock:
+        if _encoder is None:
+            if settings.EMBEDDING_SERVER_SOCKET:
+                _encoder = connect_encoder(settings.EMBEDDING_SERVER_SOCKET, model_name)
+                logger.info(f"Encoding {model_name} through {settings.EMBEDDING_SERVER_SOCKET}")
+            else:
+                _encoder = create_encoder(settings.EMBEDDING_BACKEND, model_name)
+                logger.info(f"Loaded {settings.EMBEDDING_BACKEND} encoder for {model_name}")
+        return _encoder
+
@@ -2,12 +2,19 @@
 import numpy as np
 from django.utils.timezone import now
 from django.db import transaction
+from django.db.models import Exists, OuterRef
 from bursaryDataMiner.models import Bursary, BursaryEmbedding, UserBursaryMatch
-from bursaryDataMiner.ai_matcher import embed_text, cosine, build_bursary_corpus
+from bursaryDataMiner.embedding_pipeline import BURSARY_TEXT_FIELDS, get_vectors
+from bursaryDataMiner.embedding_store import get_embedding_matrix
+from bursaryDataMiner.persistence import upsert_matches
+from bursaryDataMiner.profile_cache import get_profile_vector
 import logging
 
 logger = logging.getLogger(__name__)
 
+MATCHER_TEMPLATE = "matcher"  # key of build_bursary_text in embedding_pipeline.TEXT_TEMPLATES
+SCORING_CHUNK_SIZE = 1000
+
 # Adjusted thresholds based on typical embedding similarity ranges
 MINIMUM_SIM_THRESHOLD = 0.15   # Very permissive minimum
 GOOD_SIM_THRESHOLD = 0.25      # Good match
@@ -56,36 +63,57 @@ def build_bursary_text(bursary):
     return " | ".join(parts)
 
 
+def _score_chunk(bursaries, profile_vec):
+    """Cosine similarity of the profile against one chunk of bursaries (vectors are unit length)"""
+    vectors = get_vectors(bursaries, MATCHER_TEMPLATE)
+    bursaries = [b for b in bursaries if b.id in vectors]
+    if not bursaries:
+        return []
+    matrix = np.stack([vectors[b.id] for b in bursaries])
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True).clip(min=1e-12)
+    return zip(bursaries, (matrix @ profile_vec).tolist())
+
+
+def _score_unembedded(matrix, profile_vec):
+    """Embed (and store) bursaries with no stored vector for the matrix's template and model, and score them"""
+    stored = BursaryEmbedding.objects.filter(
+        bursary=OuterRef("pk"), template=matrix.template, model_name=matrix.model_name, vector_data__isnull=False,
+    )
+    missing = list(Bursary.objects.filter(~Exists(stored)).values_list("id", flat=True))
+    scored = []
+    for start in range(0, len(missing), SCORING_CHUNK_SIZE):
+        chunk = Bursary.objects.filter(id__in=missing[start:start + SCORING_CHUNK_SIZE]).only(*BURSARY_TEXT_FIELDS)
+        scored.extend(_score_chunk(list(chunk), profile_vec))
+    return scored
+
+
 @transaction.atomic
 def ai_match_user_to_bursaries(user, limit=50):
     """Simplified AI matching with realistic thresholds"""
     try:
         logger.info(f"AI matching for {getattr(user, 'email', 'Unknown')}")
         
-        # Build embeddings
-        profile_text = build_user_profile(user)
-        profile_vec = np.array(embed_text(profile_text), dtype=float)
+        # Build embeddings (cached until the user's qualifications change)
+        profile_vec = get_profile_vector(user)
         
         if profile_vec.size == 0:
             logger.error("Failed to embed user profile")
             return []
         
-        # Get all bursaries
-        bursary_qs = Bursary.objects.all()
-        logger.info(f"Processing {bursary_qs.count()} bursaries")
-        
         matches = []
         
-        for bursary in bursary_qs.iterator():
-            bursary_text = build_bursary_text(bursary)
-            bursary_vec = np.array(embed_text(bursary_text), dtype=float)
-            
-            if bursary_vec.size == 0:
-                continue
-            
-            # Calculate similarity
-            similarity = cosine(profile_vec, bursary_vec)
-            
+        # Shared embedding matrix (memory-mapped snapshot plus recent rows);
+        # rows within one score point of the cut-off are kept so ties on the
+        # integer score resolve by id as before. Bursaries without a stored
+        # vector yet are embedded here.
+        matrix = get_embedding_matrix(MATCHER_TEMPLATE)
+        ids, sims = matrix.search(profile_vec, limit, min_score=MINIMUM_SIM_THRESHOLD, margin=0.01)
+        bursaries = Bursary.objects.only(*BURSARY_TEXT_FIELDS).in_bulk(ids.tolist())
+        scored = [(bursaries[i], s) for i, s in zip(ids.tolist(), sims.tolist()) if i in bursaries]
+        scored.extend(_score_unembedded(matrix, profile_vec))
+        scored.sort(key=lambda item: item[0].id)
+        
+        for bursary, similarity in scored:
             if similarity < MINIMUM_SIM_THRESHOLD:
                 continue
             
@@ -111,15 +139,7 @@ def ai_match_user_to_bursaries(user, limit=50):
         top_matches = matches[:limit]
         
         # Save to DB
-        for match in top_matches:
-            UserBursaryMatch.objects.update_or_create(
-                user=user,
-                bursary=match["bursary"],
-                defaults={
-                    "relevance_score": match["score"],
-                    "match_quality": match["quality"]
-                }
-            )
+        upsert_matches(user, [(m["bursary"], m["score"], m["quality"]) for m in top_matches])
         
         # Return response
         response = []
@@ -1,10 +1,16 @@
 import re
+import threading
 from difflib import SequenceMatcher
 from collections import defaultdict
 
+from bursaryDataMiner.keyword_automaton import PatternSet, build_keyword_automaton, keyword_hits
+
 class BursaryMatcher:
     """
     Advanced bursary filtering system that matches bursaries to user's specific study choices
+    
+    Keywords and patterns are compiled at construction and never modified, so
+    one instance (get_bursary_matcher) serves every caller and thread
     """
     
     def __init__(self):
@@ -116,6 +122,18 @@ class BursaryMatcher:
             r"career.{0,10}fair", r"recruitment", r"hiring",
             r"workshop", r"seminar", r"conference", r"event"
         ]
+        
+        # One automaton over every field's keywords: each bursary text is scanned once for all industries
+        self.keyword_automaton = build_keyword_automaton(
+            keyword
+            for field_data in self.field_mappings.values()
+            for keyword in field_data["primary_keywords"] + field_data["secondary_keywords"]
+        )
+        self.compiled_exclusions = PatternSet(self.exclusion_patterns)
+        self.compiled_course_patterns = PatternSet(
+            (pattern for field_data in self.field_mappings.values() for pattern in field_data["course_patterns"]),
+            re.IGNORECASE,
+        )
     
     def calculate_relevance_score(self, bursary_title, bursary_description, user_industries, user_courses):
         """
@@ -130,20 +148,23 @@ class BursaryMatcher:
         combined_text = f"{title_lower} {description_lower}"
         
         # Check for exclusion patterns first
-        for pattern in self.exclusion_patterns:
-            if re.search(pattern, combined_text):
-                return 0  # Exclude non-bursary content
+        if self.compiled_exclusions.search(combined_text):
+            return 0  # Exclude non-bursary content
         
         max_score = 0
         best_match_field = None
+        hits = course_matches = None
         
         # Check against each user industry
         for industry in user_industries:
             if not industry or industry not in self.field_mappings:
                 continue
-                
+            
+            if hits is None:
+                hits = keyword_hits(self.keyword_automaton, combined_text)
+                course_matches = self.compiled_course_patterns.matching(combined_text)
             field_data = self.field_mappings[industry]
-            score = self._calculate_field_score(combined_text, title_lower, field_data)
+            score = self._calculate_field_score(hits, len(title_lower), course_matches, field_data)
             
             if score > max_score:
                 max_score = score
@@ -156,15 +177,22 @@ class BursaryMatcher:
         # Cap at 100
         return min(max_score, 100)
     
-    def _calculate_field_score(self, combined_text, title_lower, field_data):
-        """Calculate score for a specific field"""
+    def _calculate_field_score(self, hits, title_length, course_matches, field_data):
+        """
+        Calculate score for a specific field
+        
+        hits is keyword_hits() over the combined text; a keyword is in the title
+        when its first occurrence ends within the title's title_length characters.
+        course_matches is the set of course patterns matching the combined text
+        """
         score = 0
         
         # Primary keyword matches (high weight)
         primary_matches = 0
         for keyword in field_data["primary_keywords"]:
-            if keyword.lower() in combined_text:
-                if keyword.lower() in title_lower:
+            end = hits.get(keyword.lower())
+            if end is not None:
+                if end <= title_length:
                     score += 20  # Higher weight for title matches
                     primary_matches += 1
                 else:
@@ -174,8 +202,9 @@ class BursaryMatcher:
         # Secondary keyword matches (medium weight)
         secondary_matches = 0
         for keyword in field_data["secondary_keywords"]:
-            if keyword.lower() in combined_text:
-                if keyword.lower() in title_lower:
+            end = hits.get(keyword.lower())
+            if end is not None:
+                if end <= title_length:
                     score += 8
                     secondary_matches += 1
                 else:
@@ -184,7 +213,7 @@ class BursaryMatcher:
         
         # Pattern matches (high weight for specific patterns)
         for pattern in field_data["course_patterns"]:
-            if re.search(pattern, combined_text, re.IGNORECASE):
+            if pattern in course_matches:
                 score += 25  # High score for specific course patterns
         
         # Bonus for multiple matches (indicates strong relevance)
@@ -288,6 +317,19 @@ class BursaryMatcher:
         return summary
 
 
+_bursary_matcher = None
+_bursary_matcher_lock = threading.Lock()
+
+
+def get_bursary_matcher():
+    """Process-wide BursaryMatcher, built on first use"""
+    global _bursary_matcher
+    with _bursary_matcher_lock:
+        if _bursary_matcher is None:
+            _bursary_matcher = BursaryMatcher()
+    return _bursary_matcher
+
+
 # Integration function for your existing scraper
 def apply_bursary_filtering(scraped_bursaries, user):
     """
@@ -321,8 +363,8 @@ def apply_bursary_filtering(scraped_bursaries, user):
     except Exception as e:
         print(f"⚠️ Warning: Could not extract user data for filtering: {e}")
     
-    # Initialize matcher and filter
-    matcher = BursaryMatcher()
+    # Shared matcher and filter
+    matcher = get_bursary_matcher()
     
     print(f"\n🔍 FILTERING STAGE")
     print(f"📊 Original bursaries: {len(scraped_bursaries)}")
@@ -0,0 +1,241 @@
+# bursaryDataMiner/jobs.py
+import logging
+import threading
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.timezone import now
+
+from bursaryDataMiner.models import BackgroundJob, JobEvent
+
+logger = logging.getLogger(__name__)
+
+JOB_HANDLERS = {}
+
+# How often a running job's heartbeat_at is touched; stale-job recovery must wait well beyond this
+HEARTBEAT_SECONDS = 30
+
+
+def job_handler(kind):
+    """Register a function(job) -> JSON-serialisable result for a job kind"""
+    def register(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return register
+
+
+def enqueue(kind, user=None, payload=None, dedupe=False):
+    """
+    Create a pending job and return it.
+
+    With dedupe=True an unfinished job of the same kind for the same user is
+    returned instead, so repeated clicks don't pile up work.
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    if dedupe:
+        existing = BackgroundJob.objects.filter(
+            kind=kind, user=user,
+            status__in=[BackgroundJob.STATUS_PENDING, BackgroundJob.STATUS_RUNNING],
+        ).order_by("-created_at").first()
+        if existing is not None:
+            return existing
+
+    return BackgroundJob.objects.create(kind=kind, user=user, payload=payload or {})
+
+
+def claim_next_job(kinds=None):
+    """
+    Atomically move the oldest pending job to running and return it.
+
+    SELECT ... FOR UPDATE SKIP LOCKED lets several workers poll the same
+    table without claiming the same row.
+    """
+    with transaction.atomic():
+        qs = BackgroundJob.objects.select_for_update(skip_locked=True).filter(
+            status=BackgroundJob.STATUS_PENDING
+        )
+        if kinds:
+            qs = qs.filter(kind__in=kinds)
+        job = qs.order_by("created_at").first()
+        if job is None:
+            return None
+
+        job.status = BackgroundJob.STATUS_RUNNING
+        job.started_at = job.heartbeat_at = now()
+        job.attempts += 1
+        job.save(update_fields=["status", "started_at", "heartbeat_at", "attempts"])
+        return job
+
+
+@contextmanager
+def heartbeat(job, interval=HEARTBEAT_SECONDS):
+    """
+    Touch the job's heartbeat_at every `interval` seconds from a background
+    thread while the block runs, so requeue_stale_jobs can tell a long job
+    from one whose worker died.
+    """
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(interval):
+            try:
+                BackgroundJob.objects.filter(pk=job.pk, status=BackgroundJob.STATUS_RUNNING).update(
+                    heartbeat_at=now()
+                )
+            except Exception as e:
+                logger.warning(f"Could not record heartbeat for job {job.pk}: {e}")
+        connection.close()  # this thread's own connection
+
+    thread = threading.Thread(target=beat, name=f"job-{job.pk}-heartbeat", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def emit_event(job, kind, data=None):
+    """Record a progress event; the SSE endpoint streams these to the client"""
+    return JobEvent.objects.create(job=job, kind=kind, data=data or {})
+
+
+def event_emitter(job):
+    """on_event(kind, data) callback bound to a job, for the crawler and rankers"""
+    def on_event(kind, data):
+        try:
+            # A savepoint when nested, so a failed insert doesn't break the caller's transaction
+            with transaction.atomic():
+                emit_event(job, kind, data)
+        except Exception as e:
+            # Progress reporting must never break the job itself
+            logger.warning(f"Could not record {kind} event for job {job.pk}: {e}")
+    return on_event
+
+
+def run_job(job):
+    """Execute a claimed job and record its result or error"""
+    handler = JOB_HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise ValueError(f"No handler registered for job kind: {job.kind}")
+        with heartbeat(job):
+            job.result = handler(job)
+        job.status = BackgroundJob.STATUS_SUCCEEDED
+        job.error = ""
+    except Exception as e:
+        logger.error(f"Job {job.pk} ({job.kind}) failed: {e}")
+        job.status = BackgroundJob.STATUS_FAILED
+        job.error = traceback.format_exc()
+
+    job.finished_at = now()
+    # One transaction: a stream that sees the job finished also sees job_finished
+    with transaction.atomic():
+        job.save(update_fields=["result", "status", "error", "finished_at"])
+        event_emitter(job)("job_finished", {"status": job.status})
+    return job
+
+
+def requeue_stale_jobs(older_than_seconds, max_attempts=3):
+    """
+    Return jobs stuck in running (worker killed mid-job) to the queue, or
+    fail them. A job is stuck when its heartbeat is older than the cutoff,
+    however long ago it started.
+    """
+    cutoff = now() - timedelta(seconds=older_than_seconds)
+    stale = BackgroundJob.objects.filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff),
+        status=BackgroundJob.STATUS_RUNNING,
+    )
+    failed = stale.filter(attempts__gte=max_attempts).update(
+        status=BackgroundJob.STATUS_FAILED, finished_at=now(), error="Worker stopped before the job finished",
+    )
+    requeued = stale.update(status=BackgroundJob.STATUS_PENDING)
+    return requeued, failed
+
+
+
+def prune_finished_jobs(older_than_days):
+    """
+    Delete succeeded and failed jobs that finished more than
+    older_than_days ago, with their events. Returns (jobs, events) deleted.
+    """
+    cutoff = now() - timedelta(days=older_than_days)
+    finished = BackgroundJob.objects.filter(
+        status__in=[BackgroundJob.STATUS_SUCCEEDED, BackgroundJob.STATUS_FAILED], finished_at__lt=cutoff,
+    )
+    with transaction.atomic():
+        # Events first, in one statement, rather than through the cascade collector
+        events, _ = JobEvent.objects.filter(job__in=finished).delete()
+        _, deleted = finished.delete()
+    return deleted.get(BackgroundJob._meta.label, 0), events
+
+def job_to_dict(job):
+    return {
+        "job_id": job.pk,
+        "kind": job.kind,
+        "status": job.status,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "result": job.result,
+        "error": job.error.strip().splitlines()[-1] if job.error else None,
+    }
+
+
+# ============================================================================
+# HANDLERS
+# ============================================================================
+
+@job_handler("search")
+def run_search_job(job):
+    from bursaryDataMiner.search import run_bursary_search
+    return run_bursary_search(job.user, limit=job.payload.get("limit", 30), on_event=event_emitter(job))
+
+
+@job_handler("rank_all")
+def run_rank_all_job(job):
+    from bursaryDataMiner.bulk_ranking import rank_all_users
+
+    on_event = event_emitter(job)
+    return rank_all_users(
+        limit=job.payload.get("limit", 30),
+        progress=lambda done, total: on_event("progress", {"users": done, "total": total}),
+    )
+
+
+def post_crawl(result, started):
+    """
+    Embed every template after a crawl, export snapshots when configured and
+    reverse-match the bursaries found since `started`. Shared by the crawl
+    job and `fetch_bursaries`, so both leave the same state behind.
+    """
+    from django.conf import settings
+    from django.core.management import call_command
+    from bursaryDataMiner.embedding_pipeline import TEXT_TEMPLATES
+    from bursaryDataMiner.models import Bursary
+    from bursaryDataMiner.reverse_matching import reverse_match_bursaries
+
+    for template in TEXT_TEMPLATES:
+        call_command("embed_bursaries", template=template)
+        if settings.EMBEDDING_SNAPSHOT_DIR:
+            call_command("export_embedding_snapshot", template=template)
+    # Push only the bursaries this crawl added to users with a stored profile
+    result["reverse_match"] = reverse_match_bursaries(Bursary.objects.filter(date_found__gte=started))
+    return result
+
+
+@job_handler("crawl")
+def run_crawl_job(job):
+    from bursaryDataMiner.scraper import crawl_all_bursaries
+
+    started = now()
+    result = crawl_all_bursaries(on_event=event_emitter(job))
+    if result["status"] == "complete" and not job.payload.get("skip_embeddings"):
+        post_crawl(result, started)
+    return result
@@ -0,0 +1,118 @@
+# bursaryDataMiner/keyword_automaton.py
+"""
+Multi-keyword and multi-pattern search with one pass over the text.
+
+An Aho-Corasick automaton (pyahocorasick) is built once per keyword set;
+scanning a text reports every keyword occurring in it, overlapping and
+nested ones included, which is exactly the set `keyword in text` finds
+one keyword at a time. Hits carry the end offset of each keyword's first
+occurrence, so callers that scan f"{title} {description}" can still tell
+a title match (end <= len(title)) from a description-only one.
+
+PatternSet applies the same scan to regexes: each pattern's leading
+literal text goes into one automaton, and every occurrence of a prefix is
+confirmed with that pattern's precompiled regex anchored there. The result
+is what re.search would say for each pattern, from a single scan. (One
+alternation regex over all patterns gives the same answer but is several
+times slower than separate searches, since it defeats re's literal-prefix
+fast path.)
+"""
+import re
+import string
+
+import ahocorasick
+
+_PREFIX_CHARS = frozenset(string.ascii_letters + string.digits + " ")
+_QUANTIFIERS = frozenset("*+?{")
+# re.IGNORECASE equates ASCII letters with their other case and with these four characters
+_ASCII_CASE_FOLD = str.maketrans({
+    **{upper: upper.lower() for upper in string.ascii_uppercase},
+    "İ": "i", "ı": "i", "ſ": "s", "K": "k",
+})
+
+
+def build_keyword_automaton(keywords):
+    """Automaton over the lowercased keywords; scan lowercased text with keyword_hits"""
+    return _automaton({keyword.lower() for keyword in keywords if keyword})
+
+
+def _automaton(words):
+    automaton = ahocorasick.Automaton()
+    for word in words:
+        automaton.add_word(word, word)
+    automaton.make_automaton()
+    return automaton
+
+
+def keyword_hits(automaton, text):
+    """{keyword: end offset of its first occurrence in text} for every keyword that occurs"""
+    hits = {}
+    if len(automaton):
+        # iter() yields (last index, keyword) in text order, so the first hit per keyword ends earliest
+        for last, keyword in automaton.iter(text):
+            if keyword not in hits:
+                hits[keyword] = last + 1
+    return hits
+
+
+def literal_prefix(pattern):
+    """Literal text every match of a regex starts with, or '' when that is not obvious from the source"""
+    if "|" in pattern:
+        return ""
+    prefix = ""
+    for char in pattern:
+        if char not in _PREFIX_CHARS:
+            if char in _QUANTIFIERS:
+                prefix = prefix[:-1]  # the quantified character is optional or repeated
+            break
+        prefix += char
+    return prefix
+
+
+class PatternSet:
+    """
+    Regex patterns compiled once, answering which of them match somewhere
+    in a text. Immutable after construction, so one instance can be shared
+    between threads.
+    """
+
+    def __init__(self, patterns, flags=0):
+        self.patterns = list(dict.fromkeys(patterns))
+        self._fold = bool(flags & re.IGNORECASE)
+        self._by_prefix = {}
+        self._unprefixed = []  # searched directly
+        for pattern in self.patterns:
+            compiled = re.compile(pattern, flags)
+            prefix = literal_prefix(pattern)
+            if self._fold:
+                prefix = prefix.lower()
+            if prefix:
+                self._by_prefix.setdefault(prefix, []).append((pattern, compiled))
+            else:
+                self._unprefixed.append((pattern, compiled))
+        self._automaton = _automaton(self._by_prefix)
+
+    def _matches(self, text):
+        """Each pattern that matches text, once, as it is confirmed"""
+        for pattern, compiled in self._unprefixed:
+            if compiled.search(text):
+                yield pattern
+        if not self._by_prefix:
+            return
+        found = set()
+        # The folded copy keeps every offset, so prefix hits line up with text
+        scanned = text.translate(_ASCII_CASE_FOLD) if self._fold else text
+        for last, prefix in self._automaton.iter(scanned):
+            start = last - len(prefix) + 1
+            for pattern, compiled in self._by_prefix[prefix]:
+                if pattern not in found and compiled.match(text, start):
+                    found.add(pattern)
+                    yield pattern
+
+    def search(self, text):
+        """The first pattern found to match text, or None"""
+        return next(self._matches(text), None)
+
+    def matching(self, text):
+        """Set of every pattern that matches somewhere in text"""
+        return set(self._matches(text))
@@ -0,0 +1,55 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from bursaryDataMiner.ann_index import IVFIndex
+from bursaryDataMiner.embedding_store import normalize_rows, top_k
+
+
+def clustered_vectors(rng, size, dim, clusters, spread=0.6):
+    """Unit vectors drawn around random topic centres, closer to real embeddings than pure noise"""
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size)
+    vectors = centres[labels] + spread * rng.standard_normal((size, dim)).astype(np.float32)
+    return normalize_rows(vectors)
+
+
+class Command(BaseCommand):
+    help = "Recall and latency of IVF retrieval against the exact matrix scan"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", type=int, default=100_000)
+        parser.add_argument("--dim", type=int, default=384)
+        parser.add_argument("--clusters", type=int, default=500, help="Topic centres in the synthetic corpus")
+        parser.add_argument("--nlist", type=int, default=None, help="Default: 4 * sqrt(size)")
+        parser.add_argument("--nprobe", default="1,2,4,8,16,32")
+        parser.add_argument("--k", type=int, default=30)
+        parser.add_argument("--queries", type=int, default=100)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        size, k = options["size"], options["k"]
+        vectors = clustered_vectors(rng, size + options["queries"], options["dim"], options["clusters"])
+        vectors, queries = vectors[:size], vectors[size:]
+
+        start = time.perf_counter()
+        nlist = options["nlist"] or max(1, int(4 * np.sqrt(size)))
+        index = IVFIndex.train(vectors, nlist)
+        index.add(np.arange(size), vectors)
+        self.stdout.write(f"{size} vectors, {index.nlist} lists, built in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        exact = [set(top_k(vectors @ q, k).tolist()) for q in queries]
+        exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+        self.stdout.write(f"{'exact':>10}{'recall@' + str(k):>12}{1.0:>8.3f}{exact_ms:>10.2f}ms")
+
+        for nprobe in (int(n) for n in options["nprobe"].split(",")):
+            start = time.perf_counter()
+            found = [index.search(vectors, q, k, nprobe=nprobe)[0] for q in queries]
+            ann_ms = (time.perf_counter() - start) * 1000 / len(queries)
+            recall = np.mean([len(truth & set(rows.tolist())) / k for truth, rows in zip(exact, found)])
+            self.stdout.write(
+                f"{'nprobe ' + str(nprobe):>10}{'':>12}{recall:>8.3f}{ann_ms:>10.2f}ms"
+                f"  ({exact_ms / max(ann_ms, 1e-9):.1f}x)"
+            )
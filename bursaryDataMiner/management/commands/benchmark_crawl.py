@@ -0,0 +1,105 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bursaryDataMiner.crawler import AsyncCrawler
+from bursaryDataMiner.politeness import HostScheduler
+from bursaryDataMiner.scraper import ImprovedBursaryMatcher, scrape_site_improved
+
+
+class FixtureResponse:
+    def __init__(self, text, status_code=200):
+        self.text = text
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+class FixtureSession:
+    """Stand-in for requests.Session that serves canned HTML with a fixed latency"""
+
+    def __init__(self, pages, latency):
+        self.pages = pages
+        self.latency = latency
+
+    def get(self, url, headers=None, timeout=None):
+        time.sleep(self.latency)
+        if url not in self.pages:
+            return FixtureResponse("", status_code=404)
+        return FixtureResponse(self.pages[url])
+
+
+def build_fixture(site_count, links_per_site):
+    pages = {}
+    sites = []
+    for s in range(site_count):
+        site = f"https://bursaries-{s}.example.com/"
+        sites.append(site)
+        anchors = "".join(
+            f'<a href="/bursary-{i}">Engineering bursary {s}-{i}</a>'
+            for i in range(links_per_site)
+        )
+        pages[site] = f"<html><body>{anchors}</body></html>"
+        for i in range(links_per_site):
+            pages[f"{site}bursary-{i}"] = (
+                "<html><body><article>"
+                f"Engineering bursary {s}-{i} for undergraduate university students. "
+                "Covers tuition, books and accommodation for the full degree."
+                "</article></body></html>"
+            )
+    return sites, pages
+
+
+class Command(BaseCommand):
+    help = "Compare the sequential scraper with the async crawl engine on fixture sites"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sites", type=int, default=4)
+        parser.add_argument("--links", type=int, default=8)
+        parser.add_argument("--latency", type=float, default=0.05,
+                            help="Simulated seconds per HTTP request")
+        parser.add_argument("--host-delay", type=float, default=0.25,
+                            help="Politeness delay between requests to one host")
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument("--per-host", type=int, default=2)
+
+    def _scheduler(self, options):
+        return HostScheduler(delay=options["host_delay"], jitter=0)
+
+    def handle(self, *args, **options):
+        sites, pages = build_fixture(options["sites"], options["links"])
+        session = FixtureSession(pages, options["latency"])
+        matcher = ImprovedBursaryMatcher()
+        industries, courses = ["Engineering"], []
+
+        self.stdout.write(f"Fixture: {len(sites)} sites x {options['links']} links, "
+                          f"{options['latency'] * 1000:.0f}ms per request, "
+                          f"{options['host_delay']:.2f}s per-host delay")
+
+        start = time.perf_counter()
+        sequential = []
+        for site in sites:
+            sequential.extend(scrape_site_improved(site, industries, courses, set(), matcher, session,
+                                                   scheduler=self._scheduler(options)))
+        sequential_time = time.perf_counter() - start
+        self.stdout.write(f"Sequential: {sequential_time:.2f}s ({len(sequential)} bursaries)")
+
+        crawler = AsyncCrawler(session, matcher, scheduler=self._scheduler(options),
+                               max_concurrency=options["concurrency"],
+                               per_host_limit=options["per_host"])
+        start = time.perf_counter()
+        concurrent = []
+        for _, site_bursaries in crawler.run(sites, industries, courses, set()):
+            concurrent.extend(site_bursaries)
+        concurrent_time = time.perf_counter() - start
+        self.stdout.write(f"Async:      {concurrent_time:.2f}s ({len(concurrent)} bursaries)")
+
+        if concurrent != sequential:
+            self.stdout.write(self.style.ERROR("Payload mismatch between sequential and async paths"))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Speedup: {sequential_time / max(concurrent_time, 1e-9):.1f}x with identical payload"
+        ))
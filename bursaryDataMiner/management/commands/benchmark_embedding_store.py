@@ -0,0 +1,50 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from bursaryDataMiner.ai_matcher import cosine
+from bursaryDataMiner.embedding_store import normalize_rows, top_k
+
+
+class Command(BaseCommand):
+    help = "Compare per-row cosine scoring with the in-memory embedding matrix at several corpus sizes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="10000,100000,1000000",
+                            help="Comma-separated bursary counts")
+        parser.add_argument("--dim", type=int, default=384)
+        parser.add_argument("--k", type=int, default=30)
+        parser.add_argument("--queries", type=int, default=20)
+        parser.add_argument("--loop-sample", type=int, default=10_000,
+                            help="Rows timed on the per-row path; larger corpora are extrapolated")
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        dim, k = options["dim"], options["k"]
+        queries = normalize_rows(rng.standard_normal((options["queries"], dim)).astype(np.float32))
+
+        self.stdout.write(f"{'bursaries':>10}{'matrix MB':>11}{'per-row ms':>12}{'matrix ms':>11}{'speedup':>9}")
+        for size in (int(s) for s in options["sizes"].split(",")):
+            vectors = normalize_rows(rng.standard_normal((size, dim)).astype(np.float32))
+
+            # Old path: one Python list per row (as decoded from JSON), rebuilt and scored row by row
+            sample = min(size, options["loop_sample"])
+            rows = vectors[:sample].tolist()
+            query = queries[0].astype(float)
+            start = time.perf_counter()
+            scores = [cosine(query, np.array(row, dtype=float)) for row in rows]
+            sorted(range(sample), key=scores.__getitem__, reverse=True)[:k]
+            loop_ms = (time.perf_counter() - start) * 1000 * size / sample
+
+            start = time.perf_counter()
+            for q in queries:
+                top_k(vectors @ q, k)
+            matrix_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+            note = "" if sample == size else " (per-row extrapolated)"
+            self.stdout.write(
+                f"{size:>10}{vectors.nbytes / 2**20:>11.1f}{loop_ms:>12.1f}{matrix_ms:>11.2f}"
+                f"{loop_ms / max(matrix_ms, 1e-9):>8.0f}x{note}"
+            )
+            del vectors, rows
@@ -0,0 +1,137 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from bursaryDataMiner.ai_matcher import get_model_name
+from bursaryDataMiner.embedding_pipeline import DEFAULT_TEMPLATE, bursary_text
+from bursaryDataMiner.embedding_store import normalize_rows
+from bursaryDataMiner.encoders import (
+    BACKEND_SENTENCE_TRANSFORMERS, OnnxEncoder, SentenceTransformerEncoder, set_num_threads,
+)
+from bursaryDataMiner.models import Bursary, BursaryEmbedding
+from bursaryDataMiner.vector_codec import decode_vector
+
+BENCHMARK_BACKENDS = (BACKEND_SENTENCE_TRANSFORMERS, "onnx", "onnx-int8")
+
+
+def _peak_rss_mb():
+    """Peak RSS of this process; VmHWM, unlike ru_maxrss, is not inherited across exec"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def benchmark_backend(backend, model_name, onnx_dir, texts, batch_size=64, latency_samples=50, threads=0):
+    """
+    Load one backend in this process and measure it; meant to run in a
+    fresh process so peak RSS belongs to that backend alone.
+
+    Returns {"load_s", "p50_ms", "p95_ms", "texts_per_s", "peak_rss_mb", "vectors"}.
+    """
+    set_num_threads(threads)
+    start = time.perf_counter()
+    if backend == BACKEND_SENTENCE_TRANSFORMERS:
+        encoder = SentenceTransformerEncoder(model_name)
+    else:
+        encoder = OnnxEncoder(onnx_dir, quantized=backend == "onnx-int8")
+    load_s = time.perf_counter() - start
+
+    encoder.encode(texts[:batch_size], batch_size)  # warm-up
+    latencies = []
+    for text in texts[:latency_samples]:
+        start = time.perf_counter()
+        encoder.encode([text])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    vectors = encoder.encode(texts, batch_size)
+    seconds = time.perf_counter() - start
+    return {
+        "load_s": load_s,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "texts_per_s": len(texts) / seconds,
+        "peak_rss_mb": _peak_rss_mb(),
+        "vectors": vectors,
+    }
+
+
+class Command(BaseCommand):
+    help = ("Compare encoder backends: load time, latency, throughput, peak RSS, and cosine "
+            "agreement with the PyTorch model and the stored vectors")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--backends", nargs="*", choices=BENCHMARK_BACKENDS, default=list(BENCHMARK_BACKENDS))
+        parser.add_argument("--texts", type=int, default=512, help="Bursary texts to encode")
+        parser.add_argument("--batch-size", type=int, default=64)
+        parser.add_argument("--latency-samples", type=int, default=50, help="Single-text encodes timed")
+        parser.add_argument("--threads", type=int, default=0, help="Intra-op threads (0: library default)")
+        parser.add_argument("--min-cosine", type=float, default=0.99,
+                            help="Fail if any vector is less similar than this to the reference")
+
+    def handle(self, *args, **options):
+        bursaries = list(Bursary.objects.order_by("id")[:options["texts"]])
+        texts = [bursary_text(b, DEFAULT_TEMPLATE) or b.url for b in bursaries]
+        if not texts:
+            raise CommandError("No bursaries to encode")
+        stored = self._stored_vectors(bursaries)
+
+        self.stdout.write(f"{len(texts)} texts, batch {options['batch_size']}, "
+                          f"{len(stored)} with stored '{DEFAULT_TEMPLATE}' vectors")
+        self.stdout.write(f"{'backend':<22}{'load s':>8}{'p50 ms':>8}{'p95 ms':>8}{'texts/s':>9}"
+                          f"{'RSS MB':>8}{'min cos ref':>12}{'min cos db':>11}")
+        reference = None
+        failures = []
+        for backend in options["backends"]:
+            # A fresh process per backend, so peak RSS is that backend's alone; it sets Django up
+            # before unpickling benchmark_backend, whose module imports the models
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=django.setup) as pool:
+                try:
+                    result = pool.submit(
+                        benchmark_backend, backend, get_model_name(), settings.EMBEDDING_ONNX_DIR, texts,
+                        options["batch_size"], options["latency_samples"], options["threads"],
+                    ).result()
+                except Exception as e:
+                    self.stdout.write(self.style.WARNING(f"{backend:<22}unavailable: {e}"))
+                    continue
+
+            vectors = result["vectors"]
+            if reference is None:
+                reference = vectors
+            cos_ref = float((vectors * reference).sum(axis=1).min())
+            cos_db = float(min(vectors[i] @ v for i, v in stored.items())) if stored else float("nan")
+            self.stdout.write(
+                f"{backend:<22}{result['load_s']:>8.2f}{result['p50_ms']:>8.1f}{result['p95_ms']:>8.1f}"
+                f"{result['texts_per_s']:>9.0f}{result['peak_rss_mb']:>8.0f}{cos_ref:>12.4f}{cos_db:>11.4f}"
+            )
+            if cos_ref < options["min_cosine"] or (stored and cos_db < options["min_cosine"]):
+                failures.append(backend)
+
+        if failures:
+            raise CommandError(f"Below --min-cosine {options['min_cosine']}: {', '.join(failures)}")
+
+    def _stored_vectors(self, bursaries):
+        """{text index: unit vector} for bursaries with a stored vector from the configured model"""
+        rows = BursaryEmbedding.objects.filter(
+            bursary__in=bursaries, template=DEFAULT_TEMPLATE, model_name=get_model_name(),
+            vector_data__isnull=False,
+        ).values_list("bursary_id", "vector_data", "vector_scale", "vector_format")
+        position = {b.id: i for i, b in enumerate(bursaries)}
+        stored = {position[bursary_id]: decode_vector(data, scale, fmt) for bursary_id, data, scale, fmt in rows}
+        if not stored:
+            return {}
+        keys = list(stored)
+        vectors = normalize_rows(np.stack([stored[k] for k in keys]))
+        return dict(zip(keys, vectors))
@@ -0,0 +1,134 @@
+import random
+import re
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bursaryDataMiner.filters import BursaryMatcher
+from bursaryDataMiner.keyword_automaton import keyword_hits
+
+FILLER = ("the of and for students applicants south africa study year programme fund cover tuition "
+          "accommodation book allowance company candidates must apply with city university").split()
+
+
+def synthetic_corpus(matcher, count, words, keyword_rate, seed=7):
+    keywords = [keyword for field_data in matcher.field_mappings.values()
+                for keyword in field_data["primary_keywords"] + field_data["secondary_keywords"]]
+    rng = random.Random(seed)
+
+    def text(length):
+        return " ".join(rng.choice(keywords) if rng.random() < keyword_rate else rng.choice(FILLER)
+                        for _ in range(length))
+
+    return [(text(8).title(), text(words)) for _ in range(count)]
+
+
+def substring_field_score(combined_text, title_lower, field_data):
+    """The previous _calculate_field_score: one substring search per keyword, and again in the title"""
+    score = 0
+    primary_matches = 0
+    for keyword in field_data["primary_keywords"]:
+        if keyword.lower() in combined_text:
+            score += 20 if keyword.lower() in title_lower else 10
+            primary_matches += 1
+    secondary_matches = 0
+    for keyword in field_data["secondary_keywords"]:
+        if keyword.lower() in combined_text:
+            score += 8 if keyword.lower() in title_lower else 4
+            secondary_matches += 1
+    for pattern in field_data["course_patterns"]:
+        if re.search(pattern, combined_text, re.IGNORECASE):
+            score += 25
+    if primary_matches >= 2:
+        score += 15
+    if secondary_matches >= 3:
+        score += 10
+    return score
+
+
+class Command(BaseCommand):
+    help = ("Compare BursaryMatcher keyword and pattern scanning with per-keyword substring searches and "
+            "per-pattern re.search over a synthetic corpus, and check the scores are identical")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bursaries", type=int, default=20_000)
+        parser.add_argument("--words", type=int, default=300, help="Description length in words")
+        parser.add_argument("--keyword-rate", type=float, default=0.05,
+                            help="Share of description words drawn from the keyword lists")
+
+    def handle(self, *args, **options):
+        matcher = BursaryMatcher()
+        corpus = synthetic_corpus(matcher, options["bursaries"], options["words"], options["keyword_rate"])
+        texts = []
+        for title, description in corpus:
+            title_lower = title.lower()
+            texts.append((title_lower, f"{title_lower} {description.lower()}"))
+        industries = list(matcher.field_mappings)
+        self.stdout.write(f"{len(corpus)} bursaries, ~{sum(len(t) for _, t in texts) // len(texts)} characters each, "
+                          f"{len(industries)} fields")
+
+        # Scores first: every field for every bursary must come out the same both ways
+        for title_lower, combined in texts:
+            hits = keyword_hits(matcher.keyword_automaton, combined)
+            course_matches = matcher.compiled_course_patterns.matching(combined)
+            for industry in industries:
+                field_data = matcher.field_mappings[industry]
+                if (matcher._calculate_field_score(hits, len(title_lower), course_matches, field_data)
+                        != substring_field_score(combined, title_lower, field_data)):
+                    raise CommandError(f"Score mismatch for {industry!r} on {title_lower!r}")
+            excluded = any(re.search(pattern, combined) for pattern in matcher.exclusion_patterns)
+            if (matcher.compiled_exclusions.search(combined) is not None) != excluded:
+                raise CommandError(f"Exclusion mismatch on {title_lower!r}")
+        self.stdout.write(self.style.SUCCESS(f"Scores identical for {len(texts) * len(industries)} "
+                                             "bursary/field pairs"))
+
+        for _, combined in texts[:1000]:
+            keyword_hits(matcher.keyword_automaton, combined)  # warm-up
+        self.stdout.write(f"{'fields scored':<15}{'substring us':>14}{'automaton us':>14}{'speed-up':>10}")
+        for count in sorted({1, 2, len(industries)}):
+            fields = [matcher.field_mappings[industry] for industry in industries[:count]]
+
+            start = time.perf_counter()
+            for title_lower, combined in texts:
+                for field_data in fields:
+                    for keyword in field_data["primary_keywords"] + field_data["secondary_keywords"]:
+                        if keyword.lower() in combined:
+                            keyword.lower() in title_lower
+            substring_us = (time.perf_counter() - start) / len(texts) * 1e6
+
+            start = time.perf_counter()
+            for _, combined in texts:
+                keyword_hits(matcher.keyword_automaton, combined)
+            automaton_us = (time.perf_counter() - start) / len(texts) * 1e6
+
+            self.stdout.write(f"{count:<15}{substring_us:>14.1f}{automaton_us:>14.1f}"
+                              f"{substring_us / automaton_us:>9.1f}x")
+
+        # Course patterns: per-pattern re.search for each scored field, against one PatternSet pass for all
+        self.stdout.write(f"{'fields scored':<15}{'re.search us':>14}{'pattern set us':>16}{'speed-up':>10}")
+        for count in sorted({1, 2, len(industries)}):
+            patterns = [pattern for industry in industries[:count]
+                        for pattern in matcher.field_mappings[industry]["course_patterns"]]
+
+            start = time.perf_counter()
+            for _, combined in texts:
+                for pattern in patterns:
+                    re.search(pattern, combined, re.IGNORECASE)
+            search_us = (time.perf_counter() - start) / len(texts) * 1e6
+
+            start = time.perf_counter()
+            for _, combined in texts:
+                matcher.compiled_course_patterns.matching(combined)
+            set_us = (time.perf_counter() - start) / len(texts) * 1e6
+
+            self.stdout.write(f"{count:<15}{search_us:>14.1f}{set_us:>16.1f}{search_us / set_us:>9.1f}x")
+
+        start = time.perf_counter()
+        for _, combined in texts:
+            any(re.search(pattern, combined) for pattern in matcher.exclusion_patterns)
+        search_us = (time.perf_counter() - start) / len(texts) * 1e6
+        start = time.perf_counter()
+        for _, combined in texts:
+            matcher.compiled_exclusions.search(combined)
+        set_us = (time.perf_counter() - start) / len(texts) * 1e6
+        self.stdout.write(f"{'exclusions':<15}{search_us:>14.1f}{set_us:>16.1f}{search_us / set_us:>9.1f}x")
@@ -0,0 +1,74 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from bursaryDataMiner.models import Bursary, UserBursaryMatch
+from bursaryDataMiner.persistence import upsert_bursaries, upsert_matches
+
+
+def legacy_save(user, rows):
+    """The per-row get_or_create loop enhanced_scrape_bursaries used to run"""
+    for bursary_data in rows:
+        bursary_obj, _ = Bursary.objects.get_or_create(
+            url=bursary_data["url"],
+            defaults={
+                "title": bursary_data["title"],
+                "description": bursary_data["description"]
+            }
+        )
+        UserBursaryMatch.objects.get_or_create(
+            user=user,
+            bursary=bursary_obj,
+            defaults={
+                "relevance_score": bursary_data["relevance_score"],
+                "match_quality": "Good Match"
+            }
+        )
+
+
+def bulk_save(user, rows):
+    bursaries_by_url, _ = upsert_bursaries(rows)
+    upsert_matches(user, [
+        (bursaries_by_url[b["url"]], b["relevance_score"], "Good Match") for b in rows
+    ], update_existing=False)
+
+
+class Command(BaseCommand):
+    help = "Count DB round-trips for saving one site's bursaries: per-row get_or_create vs bulk upserts"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=40, help="Bursaries per site")
+
+    def handle(self, *args, **options):
+        rows = [
+            {
+                "url": f"https://benchmark.example.com/bursary-{i}",
+                "title": f"Benchmark bursary {i}",
+                "description": "Synthetic row written inside a rolled-back transaction.",
+                "relevance_score": 50,
+            }
+            for i in range(options["rows"])
+        ]
+
+        for label, save in (("get_or_create loop", legacy_save), ("bulk upsert", bulk_save)):
+            # First pass inserts, second pass finds everything already stored
+            with transaction.atomic():
+                user = get_user_model().objects.create_user(
+                    email="persistence-benchmark@example.com", password=None,
+                    first_name="Bench", last_name="Mark",
+                )
+                for phase in ("new rows", "existing rows"):
+                    with CaptureQueriesContext(connection) as queries:
+                        start = time.perf_counter()
+                        save(user, rows)
+                        elapsed = time.perf_counter() - start
+                    self.stdout.write(
+                        f"{label:>20} / {phase:<13}: {len(queries.captured_queries):4d} queries, "
+                        f"{elapsed * 1000:7.1f}ms"
+                    )
+                transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS("Done (all writes rolled back)."))
@@ -0,0 +1,152 @@
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from bursaryDataMiner.jobs import enqueue
+from bursaryDataMiner.models import BackgroundJob
+
+WORKER = [sys.executable, "manage.py", "run_jobs", "--kinds", "search", "--poll-interval", "0.2"]
+READY_LINE = "Job worker started."
+
+
+def _memory_mb(pid):
+    """(RSS, PSS) of one process; PSS splits shared pages between the processes sharing them"""
+    values = {}
+    for name in ("status", "smaps_rollup"):
+        try:
+            for line in Path(f"/proc/{pid}/{name}").read_text().splitlines():
+                key, _, rest = line.partition(":")
+                if key in ("VmRSS", "Pss"):
+                    values[key] = int(rest.split()[0]) / 1024
+        except OSError:
+            pass
+    return values.get("VmRSS", 0.0), values.get("Pss", 0.0)
+
+
+def _count_ready(stream, ready):
+    for line in stream:
+        if line.startswith(READY_LINE):
+            ready.append(line)
+
+
+def _children(pid):
+    children = []
+    for entry in Path("/proc").iterdir():
+        if entry.name.isdigit():
+            try:
+                stat = (entry / "stat").read_text()
+            except OSError:
+                continue
+            if int(stat.rsplit(")", 1)[1].split()[1]) == pid:
+                children.append(int(entry.name))
+    return children
+
+
+class Command(BaseCommand):
+    help = ("Run N job workers as separate run_jobs processes and as `run_jobs --processes N`, give each one "
+            "search job that encodes a profile, and compare total memory and those first jobs' run time")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=4)
+        parser.add_argument("--modes", nargs="+", choices=["plain", "preload"], default=["plain", "preload"])
+        parser.add_argument("--boot-timeout", type=float, default=300.0,
+                            help="Seconds to wait for every worker to start and finish its job")
+
+    def _start(self, mode, processes):
+        """Worker processes for a mode, and a counter of workers that reported ready"""
+        if mode == "preload":
+            commands = [WORKER + ["--processes", str(processes)]]
+        else:
+            commands = [WORKER] * processes
+        ready = []
+        popens = []
+        for command in commands:
+            process = subprocess.Popen(command, cwd=settings.BASE_DIR, stdout=subprocess.PIPE,
+                                       stderr=subprocess.DEVNULL, text=True)
+            popens.append(process)
+            threading.Thread(target=_count_ready, args=(process.stdout, ready), daemon=True).start()
+        return popens, ready
+
+    def _run_mode(self, mode, users, boot_timeout):
+        from bursaryDataMiner.profile_cache import invalidate_profile_vector
+
+        for user in users:
+            invalidate_profile_vector(user)  # so each first job encodes a profile
+        started = time.perf_counter()
+        deadline = started + boot_timeout
+        popens, ready = self._start(mode, len(users))
+        jobs = []
+        try:
+            while len(ready) < len(users):
+                if any(process.poll() is not None for process in popens):
+                    raise CommandError(f"A {mode} worker exited before it was ready")
+                if time.perf_counter() > deadline:
+                    raise CommandError(f"Only {len(ready)}/{len(users)} {mode} workers started in time")
+                time.sleep(0.1)
+            ready_s = time.perf_counter() - started
+
+            jobs = [enqueue("search", user=user, payload={"limit": 30}).pk for user in users]
+            pending = BackgroundJob.objects.filter(pk__in=jobs).exclude(
+                status__in=[BackgroundJob.STATUS_SUCCEEDED, BackgroundJob.STATUS_FAILED]
+            )
+            while pending.exists():
+                if time.perf_counter() > deadline:
+                    raise CommandError(f"{mode} workers did not finish their jobs in time")
+                time.sleep(0.2)
+            finished = list(BackgroundJob.objects.filter(pk__in=jobs))
+            if any(job.status == BackgroundJob.STATUS_FAILED for job in finished):
+                raise CommandError(f"A {mode} search job failed")
+
+            pids = [pid for process in popens for pid in [process.pid] + _children(process.pid)]
+            memory = [_memory_mb(pid) for pid in pids]
+            durations = [(job.finished_at - job.started_at).total_seconds() * 1000 for job in finished]
+            return {
+                "ready_s": ready_s,
+                "first_p50_ms": statistics.median(durations),
+                "first_max_ms": max(durations),
+                "rss_mb": sum(rss for rss, _ in memory),
+                "pss_mb": sum(pss for _, pss in memory),
+            }
+        finally:
+            for process in popens:
+                process.terminate()
+            for process in popens:
+                try:
+                    process.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+            BackgroundJob.objects.filter(pk__in=jobs).delete()
+
+    def handle(self, *args, **options):
+        processes = options["processes"]
+        if BackgroundJob.objects.filter(kind="search", status=BackgroundJob.STATUS_PENDING).exists():
+            raise CommandError("Pending search jobs would be picked up by the benchmark workers; run it on an "
+                               "idle queue")
+        users = list(get_user_model().objects.filter(qualifications__isnull=False).distinct()[:processes])
+        if len(users) < processes:
+            raise CommandError(f"Need {processes} users with qualifications, found {len(users)}")
+
+        self.stdout.write(f"{processes} job workers; first job = encode one profile + rank it against the corpus")
+        self.stdout.write(f"{'mode':<10}{'ready':>8}{'first p50':>11}{'first max':>11}{'RSS total':>11}"
+                          f"{'PSS total':>11}")
+        results = {}
+        for mode in options["modes"]:
+            result = results[mode] = self._run_mode(mode, users, options["boot_timeout"])
+            self.stdout.write(
+                f"{mode:<10}{result['ready_s']:>7.1f}s{result['first_p50_ms']:>9.0f}ms{result['first_max_ms']:>9.0f}ms"
+                f"{result['rss_mb']:>9.0f}MB{result['pss_mb']:>9.0f}MB"
+            )
+        self.stdout.write("RSS counts shared pages once per process; PSS is the memory actually used")
+        if len(results) == 2:
+            plain, preload = results["plain"], results["preload"]
+            self.stdout.write(self.style.SUCCESS(
+                f"Preload: PSS {plain['pss_mb']:.0f}MB -> {preload['pss_mb']:.0f}MB, "
+                f"first job p50 {plain['first_p50_ms']:.0f}ms -> {preload['first_p50_ms']:.0f}ms"
+            ))
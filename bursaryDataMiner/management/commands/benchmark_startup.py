@@ -0,0 +1,79 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Loaded on first use only; none of them may appear in a cold start
+HEAVY_MODULES = ("numpy", "torch", "sentence_transformers", "transformers", "onnxruntime", "tokenizers",
+                 "bs4", "scipy", "sklearn")
+
+ENTRY_POINTS = {
+    # What a gunicorn worker does before its first request: settings, apps, URL conf and views
+    "wsgi": [
+        "-c",
+        "import bursary_backend.wsgi; from django.urls import get_resolver; get_resolver().url_patterns",
+    ],
+    # Every management command pays at least this much (system checks load the URL conf too)
+    "manage.py check": ["manage.py", "check"],
+}
+
+
+class Command(BaseCommand):
+    help = ("Time cold starts of a web worker and of manage.py in fresh interpreters, and list heavy modules "
+            "they import. Exits non-zero over --max-seconds or when a heavy module is imported, for use in CI")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per entry point")
+        parser.add_argument("--max-seconds", type=float, default=1.0,
+                            help="Fail when an entry point's median start time exceeds this")
+
+    def _run(self, args, importtime=False):
+        command = [sys.executable] + (["-X", "importtime"] if importtime else []) + args
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get("DJANGO_SETTINGS_MODULE",
+                                                                     "bursary_backend.settings"))
+        start = time.perf_counter()
+        result = subprocess.run(command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        if result.returncode:
+            raise CommandError(f"{' '.join(args)} failed:\n{result.stderr[-2000:]}")
+        return elapsed, result.stderr
+
+    def _imports(self, args):
+        """Top-level packages imported, with their cumulative import time in ms"""
+        _, stderr = self._run(args, importtime=True)
+        packages = {}
+        for line in stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line.split("|")
+            name = name.strip()
+            if "." not in name:
+                packages[name] = max(packages.get(name, 0), int(cumulative) / 1000)
+        return packages
+
+    def handle(self, *args, **options):
+        failures = []
+        self.stdout.write(f"{'entry point':<18}{'median':>9}{'min':>9}{'max':>9}  heavy imports")
+        for label, entry in ENTRY_POINTS.items():
+            times = [self._run(entry)[0] for _ in range(options["runs"])]
+            packages = self._imports(entry)
+            heavy = {name: ms for name, ms in packages.items() if name in HEAVY_MODULES}
+            median = statistics.median(times)
+            self.stdout.write(
+                f"{label:<18}{median:>8.2f}s{min(times):>8.2f}s{max(times):>8.2f}s  "
+                + (", ".join(f"{name} ({ms:.0f}ms)" for name, ms in sorted(heavy.items())) or "none")
+            )
+            slowest = sorted(packages.items(), key=lambda item: -item[1])[:5]
+            self.stdout.write("    slowest imports: " + ", ".join(f"{name} {ms:.0f}ms" for name, ms in slowest))
+            if median > options["max_seconds"]:
+                failures.append(f"{label} took {median:.2f}s (budget {options['max_seconds']:.2f}s)")
+            if heavy:
+                failures.append(f"{label} imported {', '.join(sorted(heavy))}")
+
+        if failures:
+            raise CommandError("; ".join(failures))
+        self.stdout.write(self.style.SUCCESS(f"Cold starts within {options['max_seconds']:.2f}s, no heavy imports"))
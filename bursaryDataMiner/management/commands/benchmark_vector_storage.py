@@ -0,0 +1,62 @@
+import json
+import time
+import tracemalloc
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from bursaryDataMiner.embedding_store import EmbeddingMatrix, normalize_rows
+from bursaryDataMiner.vector_codec import FORMATS, decode_many, encode_vector
+
+
+class Command(BaseCommand):
+    help = "Compare JSON and binary embedding storage: bytes per row, decode time and peak memory"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100_000)
+        parser.add_argument("--dim", type=int, default=384)
+        parser.add_argument("--from-db", action="store_true",
+                            help="Also time a full EmbeddingMatrix load from the database")
+
+    def _measure(self, decode):
+        """Decode twice: once timed, once under tracemalloc (which slows allocation-heavy code)"""
+        start = time.perf_counter()
+        decode()
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        result = decode()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return result, elapsed, peak
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        vectors = normalize_rows(rng.standard_normal((options["rows"], options["dim"])).astype(np.float32))
+        self.stdout.write(f"{options['rows']} rows x {options['dim']} dims")
+        self.stdout.write(f"{'format':<9}{'bytes/row':>10}{'corpus MB':>11}{'decode s':>10}{'peak MB':>9}{'min cos':>9}")
+
+        texts = [json.dumps(v) for v in vectors.astype(float).tolist()]
+        decoded, seconds, peak = self._measure(
+            lambda: np.array([json.loads(t) for t in texts], dtype=np.float32)
+        )
+        size = sum(len(t) for t in texts)
+        self.stdout.write(f"{'json':<9}{size / len(texts):>10.0f}{size / 2**20:>11.1f}{seconds:>10.2f}"
+                          f"{peak / 2**20:>9.1f}{1.0:>9.4f}")
+        del texts, decoded
+
+        for fmt in FORMATS:
+            encoded = [encode_vector(v, fmt) for v in vectors]
+            datas, scales = [d for d, _ in encoded], [s for _, s in encoded]
+            decoded, seconds, peak = self._measure(lambda: decode_many(datas, scales, fmt))
+            size = sum(len(d) for d in datas) + (8 * len(datas) if fmt == "int8" else 0)
+            cos = (normalize_rows(decoded) * vectors).sum(axis=1).min()
+            self.stdout.write(f"{fmt:<9}{size / len(datas):>10.0f}{size / 2**20:>11.1f}{seconds:>10.2f}"
+                              f"{peak / 2**20:>9.1f}{cos:>9.4f}")
+
+        if options["from_db"]:
+            matrix = EmbeddingMatrix()
+            start = time.perf_counter()
+            rows = matrix.reload()
+            self.stdout.write(f"Database load: {rows} rows in {time.perf_counter() - start:.2f}s "
+                              f"({matrix.nbytes / 2**20:.1f}MB in memory)")
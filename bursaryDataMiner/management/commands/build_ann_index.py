@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bursaryDataMiner.ann_index import AnnRetriever, index_path
+from bursaryDataMiner.embedding_pipeline import DEFAULT_TEMPLATE, TEXT_TEMPLATES
+from bursaryDataMiner.embedding_store import get_embedding_matrix
+
+
+class Command(BaseCommand):
+    help = "Train and save the IVF index used for ANN retrieval in ai_ranker"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--template", choices=sorted(TEXT_TEMPLATES), default=DEFAULT_TEMPLATE)
+        parser.add_argument("--nlist", type=int, default=None,
+                            help="Number of inverted lists (default: 4 * sqrt(rows))")
+        parser.add_argument("--iterations", type=int, default=10, help="k-means iterations")
+
+    def handle(self, *args, **options):
+        path = index_path(options["template"])
+        if path is None:
+            raise CommandError("ANN_INDEX_DIR is empty, ANN retrieval is disabled")
+
+        matrix = get_embedding_matrix(options["template"])
+        if not len(matrix):
+            raise CommandError(f"No '{options['template']}' embeddings to index, run embed_bursaries first")
+
+        start = time.perf_counter()
+        retriever = AnnRetriever.build(matrix, nlist=options["nlist"], iterations=options["iterations"])
+        retriever.save(path)
+        sizes = [len(rows) for rows in retriever.index.lists]
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {len(matrix)} vectors into {retriever.index.nlist} lists "
+            f"(largest {max(sizes)}, {time.perf_counter() - start:.1f}s) -> {path}"
+        ))
@@ -1,21 +1,46 @@
-from django.core.management.base import BaseCommand 
-from bursaryDataMiner.models import Bursary, BursaryEmbedding 
-from bursaryDataMiner.ai_matcher import embed_text, build_bursary_corpus
+import argparse
+
+from django.core.management.base import BaseCommand
+
+from bursaryDataMiner.embedding_pipeline import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_TEMPLATE,
+    TEXT_TEMPLATES,
+    run_embedding_pipeline,
+)
+
 
 class Command(BaseCommand):
-    help = "Create/update AI embeddings for all bursaries"
+    help = "Create/update AI embeddings for new or changed bursaries in batched chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--template", choices=sorted(TEXT_TEMPLATES), default=DEFAULT_TEMPLATE,
+                            help="Bursary text template to embed")
+        parser.add_argument("--changed-only", action=argparse.BooleanOptionalAction, default=True,
+                            help="Only embed bursaries whose text or model changed "
+                                 "(default; --no-changed-only re-embeds everything)")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                            help="Bursaries loaded, encoded and written per chunk")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                            help="Texts per forward pass inside model.encode")
+        parser.add_argument("--workers", type=int, default=1,
+                            help="Worker processes, each with its own copy of the model")
 
-    def handle(self, *args, **kwargs): 
-        total, created = 0, 0
-        for b in Bursary.objects.all().iterator():
-            corpus = build_bursary_corpus(b)
-            vec = embed_text(corpus)
-            if not vec: 
-                continue 
-            obj, was_created = BursaryEmbedding.objects.update_or_create(
-                bursary = b, defaults={"vector": vec}
-            )
+    def handle(self, *args, **options):
+        def progress(done, total):
+            self.stdout.write(f"  {done}/{total} embedded")
 
-            total += 1
-            created += 1 if was_created else 0 
-        self.stdout.write(style.SUCCESS(f"Embedded {total} bursaries ({created} new)."))
\ No newline at end of file
+        result = run_embedding_pipeline(
+            template=options["template"],
+            changed_only=options["changed_only"],
+            chunk_size=options["chunk_size"],
+            batch_size=options["batch_size"],
+            workers=options["workers"],
+            progress=progress if options["verbosity"] > 1 else None,
+        )
+        rate = result["embedded"] / max(result["seconds"], 1e-9)
+        self.stdout.write(self.style.SUCCESS(
+            f"Embedded {result['embedded']} bursaries in {result['chunks']} chunks "
+            f"({result['seconds']:.1f}s, {rate:.0f}/s), {result['skipped']} unchanged."
+        ))
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bursaryDataMiner.embedding_pipeline import DEFAULT_TEMPLATE, TEXT_TEMPLATES
+from bursaryDataMiner.embedding_store import EmbeddingMatrix, snapshot_root
+
+
+class Command(BaseCommand):
+    help = "Publish the embedding matrix as a versioned .npy snapshot that workers memory-map"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--template", choices=sorted(TEXT_TEMPLATES), default=DEFAULT_TEMPLATE)
+        parser.add_argument("--keep", type=int, default=2, help="Snapshot versions to keep on disk")
+        parser.add_argument("--from-database", action="store_true",
+                            help="Read every vector from the database instead of the current "
+                                 "snapshot plus the rows changed since")
+
+    def handle(self, *args, **options):
+        if snapshot_root(options["template"]) is None:
+            raise CommandError("EMBEDDING_SNAPSHOT_DIR is empty, snapshots are disabled")
+
+        start = time.perf_counter()
+        matrix = EmbeddingMatrix(options["template"], use_snapshot=not options["from_database"])
+        matrix.reload()
+        if not len(matrix):
+            raise CommandError(f"No '{options['template']}' embeddings to export, run embed_bursaries first")
+
+        path = matrix.export_snapshot(keep=options["keep"])
+        size = sum(f.stat().st_size for f in path.iterdir())
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {len(matrix)} vectors ({size / 2**20:.1f}MB, "
+            f"{time.perf_counter() - start:.1f}s) -> {path}"
+        ))
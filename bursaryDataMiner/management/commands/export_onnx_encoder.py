@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from bursaryDataMiner.ai_matcher import get_model_name
+from bursaryDataMiner.encoders import export_onnx_encoder
+
+
+class Command(BaseCommand):
+    help = "Export the sentence-transformers encoder to ONNX (plus an int8 quantized copy) for EMBEDDING_BACKEND=onnx"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", default=None, help="Model to export (default: the configured model)")
+        parser.add_argument("--output", default=None, help="Directory to write (default: EMBEDDING_ONNX_DIR)")
+        parser.add_argument("--no-quantize", action="store_true", help="Skip the int8 dynamic-quantized copy")
+
+    def handle(self, *args, **options):
+        written = export_onnx_encoder(
+            options["model"] or get_model_name(),
+            options["output"] or settings.EMBEDDING_ONNX_DIR,
+            quantize=not options["no_quantize"],
+        )
+        for path in written:
+            self.stdout.write(f"  {path} ({path.stat().st_size / 2**20:.1f}MB)")
+        self.stdout.write(self.style.SUCCESS(
+            "Exported. Check it with `manage.py benchmark_encoders`, then set EMBEDDING_BACKEND=onnx."
+        ))
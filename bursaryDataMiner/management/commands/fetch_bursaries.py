@@ -1,15 +1,41 @@
+import time
+
 from django.core.management.base import BaseCommand
-from bursaryDataMiner.scraper import scrape_bursaries
-from bursaryDataMiner.matcher import match_and_save
+from django.utils.timezone import now
+from bursaryDataMiner.jobs import enqueue, post_crawl
+from bursaryDataMiner.scraper import crawl_all_bursaries
 
 class Command(BaseCommand):
-    help = '''scrape bursary data and matches it to user'''
+    help = '''Run the shared bursary crawl, embed what it found and reverse-match new bursaries. Schedule it
+    (cron, Heroku Scheduler) or pass --interval to keep it running; searches only match against stored bursaries.'''
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=int, default=0,
+                            help="Repeat the crawl every N seconds instead of running once")
+        parser.add_argument("--skip-embeddings", action="store_true",
+                            help="Only crawl; do not run embed_bursaries afterwards")
+        parser.add_argument("--enqueue", action="store_true",
+                            help="Queue a crawl job for the run_jobs worker and exit")
+
+    def handle(self, *args, **options):
+        if options["enqueue"]:
+            job = enqueue("crawl", payload={"skip_embeddings": options["skip_embeddings"]})
+            self.stdout.write(self.style.SUCCESS(f"Queued crawl job {job.pk}."))
+            return
+
+        while True:
+            self.stdout.write("Crawling bursary sites...")
+            started = now()
+            result = crawl_all_bursaries()
+            self.stdout.write(result["message"])
+
+            if result["status"] == "complete" and not options["skip_embeddings"]:
+                self.stdout.write("Embedding bursaries and matching new ones to stored profiles...")
+                post_crawl(result, started)
+                self.stdout.write(f"Reverse match: {result['reverse_match']}")
 
-    def handle(self, *args, **kwargs):
-        self.stdout.write("Scraping bursaries...")
-        bursaries = scrape_bursaries()
-        self.stdout.write(f"Found {len(bursaries)} bursaries.")
-        self.stdout.write("Matching bursaries to users...")
-        match_and_save(bursaries)
+            self.stdout.write(self.style.SUCCESS("Crawl complete."))
 
-        self.stdout.write(self.style.SUCCESS("Matching complete."))
\ No newline at end of file
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
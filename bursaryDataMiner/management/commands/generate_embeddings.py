@@ -1,21 +1,13 @@
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
-from bursaryDataMiner.models import Bursary, BursaryEmbedding
-from sentence_transformers import SentenceTransformer
 
 
 class Command(BaseCommand):
-    help = "Generate embeddings for all bursaries"
+    help = "Deprecated alias for embed_bursaries"
 
-    def handle(self, *args, **kwargs):
-        model = SentenceTransformer("all-MiniLM-L6-v2")
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=1)
 
-        bursaries = Bursary.objects.all()
-        self.stdout.write(self.style.NOTICE(f"Found {bursaries.count()} bursaries..."))
-
-        for bursary in bursaries:
-            vector = model.encode(bursary.description).tolist()
-            emb, _ = BursaryEmbedding.objects.get_or_create(bursary=bursary)
-            emb.vector = vector
-            emb.save()
-
-        self.stdout.write(self.style.SUCCESS("✅ All embeddings generated and saved!"))
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING("generate_embeddings is deprecated, use embed_bursaries"))
+        call_command("embed_bursaries", workers=options["workers"], stdout=self.stdout)
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from bursaryDataMiner.bulk_ranking import DEFAULT_BLOCK_ROWS, DEFAULT_USER_BATCH, rank_all_users
+
+
+class Command(BaseCommand):
+    help = "Refresh every user's bursary matches with blocked matrix scoring (e.g. nightly)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=30, help="Matches kept per user")
+        parser.add_argument("--user-batch", type=int, default=DEFAULT_USER_BATCH,
+                            help="Users whose profiles are scored together")
+        parser.add_argument("--block-rows", type=int, default=DEFAULT_BLOCK_ROWS,
+                            help="Bursary rows per matrix block; scores held at once are "
+                                 "block rows x user batch floats")
+
+    def handle(self, *args, **options):
+        def progress(done, total):
+            self.stdout.write(f"  {done}/{total} users")
+
+        result = rank_all_users(
+            limit=options["limit"],
+            user_batch=options["user_batch"],
+            block_rows=options["block_rows"],
+            progress=progress if options["verbosity"] > 1 else None,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Ranked {result['ranked']} of {result['users']} users, {result['matches']} matches written "
+            f"({result['seconds']:.1f}s, {result['users_per_second']:.1f} users/s)."
+        ))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from bursaryDataMiner.profile_cache import refresh_stale_profile_vectors
+
+
+class Command(BaseCommand):
+    help = '''Re-encode every stored profile vector whose fingerprint no longer matches the user's qualifications.
+    Crawls only refresh invalidated vectors; schedule this (cron, Heroku Scheduler) to catch edits made elsewhere.'''
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=64, help="Profiles per encoder call")
+        parser.add_argument("--only-invalidated", action="store_true",
+                            help="Skip the fingerprint comparison; only refresh invalidated vectors")
+
+    def handle(self, *args, **options):
+        refreshed, dropped = refresh_stale_profile_vectors(options["batch_size"],
+                                                           full=not options["only_invalidated"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed {refreshed} profile vectors, dropped {dropped} empty profiles."
+        ))
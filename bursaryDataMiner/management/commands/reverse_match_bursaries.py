@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from bursaryDataMiner.models import Bursary
+from bursaryDataMiner.reverse_matching import reverse_match_bursaries
+
+
+class Command(BaseCommand):
+    help = "Match recently found bursaries against every stored user profile vector"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=float, default=24,
+                            help="Bursaries found within this many hours")
+        parser.add_argument("--ids", type=int, nargs="*", default=None,
+                            help="Match these bursary ids instead")
+
+    def handle(self, *args, **options):
+        if options["ids"]:
+            bursaries = Bursary.objects.filter(id__in=options["ids"])
+        else:
+            bursaries = Bursary.objects.filter(date_found__gte=timezone.now() - timedelta(hours=options["hours"]))
+
+        result = reverse_match_bursaries(bursaries)
+        self.stdout.write(self.style.SUCCESS(
+            f"Matched {result['bursaries']} bursaries against {result['users']} profiles: "
+            f"{result['matches']} matches ({result['seconds']:.2f}s)."
+        ))
@@ -0,0 +1,37 @@
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from bursaryDataMiner.ai_matcher import get_model_name
+from bursaryDataMiner.embedding_server import EmbeddingServer
+from bursaryDataMiner.encoders import create_encoder
+
+
+class Command(BaseCommand):
+    help = ("Serve the text encoder on a Unix socket, micro-batching requests from every process on this host. "
+            "Run it on the same machine as the web and job workers and point EMBEDDING_SERVER_SOCKET at it")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--socket", default=None, help="Socket path (default: EMBEDDING_SERVER_SOCKET)")
+        parser.add_argument("--max-batch", type=int, default=settings.EMBEDDING_SERVER_MAX_BATCH,
+                            help="Most texts per encoder call")
+        parser.add_argument("--max-wait-ms", type=float, default=settings.EMBEDDING_SERVER_MAX_WAIT_MS,
+                            help="Longest wait for more requests before encoding a partial batch")
+
+    def handle(self, *args, **options):
+        socket_path = options["socket"] or settings.EMBEDDING_SERVER_SOCKET
+        if not socket_path:
+            raise CommandError("Pass --socket or set EMBEDDING_SERVER_SOCKET")
+
+        model_name = get_model_name()
+        # The server always encodes in-process, whatever EMBEDDING_SERVER_SOCKET says
+        encoder = create_encoder(settings.EMBEDDING_BACKEND, model_name)
+        encoder.encode(["warm up"])
+        server = EmbeddingServer(encoder, model_name, socket_path,
+                                 max_batch=options["max_batch"], max_wait_ms=options["max_wait_ms"])
+        self.stdout.write(f"Serving {settings.EMBEDDING_BACKEND} encoder for {model_name} on {socket_path}")
+        asyncio.run(server.serve())
+        self.stdout.write(self.style.SUCCESS(
+            f"Stopped after {server.stats['requests']} requests in {server.stats['batches']} batches."
+        ))
@@ -0,0 +1,150 @@
+import logging
+import os
+import signal
+import sys
+import time
+import traceback
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from bursaryDataMiner.jobs import (
+    HEARTBEAT_SECONDS, claim_next_job, prune_finished_jobs, requeue_stale_jobs, run_job,
+)
+
+logger = logging.getLogger(__name__)
+
+PRUNE_INTERVAL = 3600  # seconds between deletions of old finished jobs
+
+
+class Command(BaseCommand):
+    help = ("Process queued background jobs (searches, crawls) from the BackgroundJob table. With --processes N, "
+            "the encoder and embedding matrices are loaded once and N forked workers share them")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true",
+                            help="Process jobs until the queue is empty, then exit")
+        parser.add_argument("--kinds", nargs="*", default=None,
+                            help="Only claim these job kinds (default: all)")
+        parser.add_argument("--poll-interval", type=float, default=2.0,
+                            help="Seconds to sleep when the queue is empty")
+        parser.add_argument("--stale-after", type=int, default=300,
+                            help="Requeue running jobs whose heartbeat is older than this many seconds")
+        parser.add_argument("--keep-finished-days", type=int, default=14,
+                            help="Delete finished jobs and their events after this many days (0 = keep forever)")
+        parser.add_argument("--processes", type=int, default=1,
+                            help="Forked worker processes sharing one preloaded encoder and set of matrices")
+        parser.add_argument("--threads-per-process", type=int, default=1,
+                            help="Encoder intra-op threads in each forked worker (0 = library default)")
+
+    def handle(self, *args, **options):
+        if options["stale_after"] <= 2 * HEARTBEAT_SECONDS:
+            raise CommandError(f"--stale-after must exceed twice the {HEARTBEAT_SECONDS}s job heartbeat")
+        if options["keep_finished_days"] < 0:
+            raise CommandError("--keep-finished-days cannot be negative")
+
+        if options["processes"] > 1:
+            self._supervise(options)
+        else:
+            self._handle_signals(self._stop)
+            self._work(options)
+
+    def _handle_signals(self, handler):
+        self._stopping = False
+        signal.signal(signal.SIGTERM, handler)
+        signal.signal(signal.SIGINT, handler)
+
+    def _work(self, options):
+        self.stdout.write("Job worker started.")
+        last_stale_check = 0.0
+        last_prune = float("-inf")  # first pass prunes straight away
+
+        while not self._stopping:
+            close_old_connections()
+
+            if time.monotonic() - last_stale_check > 60:
+                requeued, failed = requeue_stale_jobs(options["stale_after"])
+                if requeued or failed:
+                    self.stdout.write(f"Requeued {requeued} stale jobs, failed {failed}.")
+                last_stale_check = time.monotonic()
+
+            if options["keep_finished_days"] and time.monotonic() - last_prune > PRUNE_INTERVAL:
+                pruned, events = prune_finished_jobs(options["keep_finished_days"])
+                if pruned:
+                    self.stdout.write(f"Deleted {pruned} finished jobs and {events} events.")
+                last_prune = time.monotonic()
+
+            job = claim_next_job(options["kinds"])
+            if job is None:
+                if options["once"]:
+                    break
+                time.sleep(options["poll_interval"])
+                continue
+
+            started = time.monotonic()
+            run_job(job)
+            self.stdout.write(f"Job {job.pk} ({job.kind}) {job.status} in {time.monotonic() - started:.1f}s")
+
+        self.stdout.write(self.style.SUCCESS("Job worker stopped."))
+
+    def _stop(self, signum, frame):
+        # Finish the current job, then exit (Heroku sends SIGTERM on restarts)
+        self._stopping = True
+
+    def _supervise(self, options):
+        """Warm up once, fork the workers and replace any that crash until stopped"""
+        from bursaryDataMiner.prefork import warm_before_fork
+
+        self._children = set()
+        self._handle_signals(self._stop_children)
+
+        self.stdout.write(warm_before_fork())
+        while True:
+            while not self._stopping and len(self._children) < options["processes"]:
+                self._children.add(self._fork(options))
+            if not self._children:
+                break
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            self._children.discard(pid)
+            code = os.waitstatus_to_exitcode(status)
+            if code and not self._stopping:
+                self.stderr.write(f"Worker {pid} exited with {code}; starting a replacement.")
+            elif not self._stopping and options["once"]:
+                # Queue drained: wait for the rest instead of forking again
+                self._stopping = True
+
+        self.stdout.write(self.style.SUCCESS("Job workers stopped."))
+
+    def _fork(self, options):
+        from bursaryDataMiner.prefork import after_fork
+
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid:
+            return pid
+
+        code = 0
+        try:
+            self._children = set()
+            self._handle_signals(self._stop)
+            after_fork(options["threads_per_process"])
+            self._work(options)
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)
+
+    def _stop_children(self, signum, frame):
+        self._stopping = True
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
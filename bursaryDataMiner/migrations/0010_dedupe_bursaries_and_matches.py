@@ -0,0 +1,69 @@
+# Merges duplicate rows so 0011 can add unique constraints on Bursary.url
+# and (UserBursaryMatch.user, UserBursaryMatch.bursary).
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicate_bursaries(apps, schema_editor):
+    Bursary = apps.get_model('bursaryDataMiner', 'Bursary')
+    BursaryEmbedding = apps.get_model('bursaryDataMiner', 'BursaryEmbedding')
+    UserBursaryMatch = apps.get_model('bursaryDataMiner', 'UserBursaryMatch')
+
+    duplicated = (
+        Bursary.objects.values('url')
+        .annotate(n=Count('id'), keep_id=Min('id'))
+        .filter(n__gt=1)
+    )
+    for group in duplicated.iterator():
+        keeper = Bursary.objects.get(pk=group['keep_id'])
+        duplicates = Bursary.objects.filter(url=group['url']).exclude(pk=keeper.pk)
+
+        for duplicate in duplicates:
+            if not keeper.description and duplicate.description:
+                keeper.description = duplicate.description
+            if not keeper.application_url and duplicate.application_url:
+                keeper.application_url = duplicate.application_url
+
+            # Keep an embedding if only the duplicate has one
+            if not BursaryEmbedding.objects.filter(bursary=keeper).exists():
+                BursaryEmbedding.objects.filter(bursary=duplicate).update(bursary=keeper)
+
+            # Matches move to the keeper; per-user duplicates are merged below
+            UserBursaryMatch.objects.filter(bursary=duplicate).update(bursary=keeper)
+
+        keeper.save()
+        duplicates.delete()
+
+
+def merge_duplicate_matches(apps, schema_editor):
+    UserBursaryMatch = apps.get_model('bursaryDataMiner', 'UserBursaryMatch')
+
+    duplicated = (
+        UserBursaryMatch.objects.values('user_id', 'bursary_id')
+        .annotate(n=Count('id'))
+        .filter(n__gt=1)
+    )
+    for group in duplicated.iterator():
+        matches = list(
+            UserBursaryMatch.objects.filter(user_id=group['user_id'], bursary_id=group['bursary_id'])
+        )
+        # Keep the best score; ties keep the oldest row
+        matches.sort(key=lambda m: (-(m.relevance_score or 0), m.id))
+        UserBursaryMatch.objects.filter(pk__in=[m.pk for m in matches[1:]]).delete()
+
+
+def merge_duplicates(apps, schema_editor):
+    merge_duplicate_bursaries(apps, schema_editor)
+    merge_duplicate_matches(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bursaryDataMiner', '0009_jobevent'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-17 00:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bursaryDataMiner', '0010_dedupe_bursaries_and_matches'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bursary',
+            name='url',
+            field=models.URLField(unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='userbursarymatch',
+            index=models.Index(fields=['user', '-relevance_score'], name='match_user_score_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='userbursarymatch',
+            constraint=models.UniqueConstraint(fields=('user', 'bursary'), name='unique_user_bursary_match'),
+        ),
+    ]
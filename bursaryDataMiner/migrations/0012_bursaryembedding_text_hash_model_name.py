@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-17 00:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bursaryDataMiner', '0011_bursary_url_unique_match_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bursaryembedding',
+            name='model_name',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+        migrations.AddField(
+            model_name='bursaryembedding',
+            name='text_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-17 00:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bursaryDataMiner', '0012_bursaryembedding_text_hash_model_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bursaryembedding',
+            name='template',
+            field=models.CharField(default='corpus', max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='bursaryembedding',
+            name='bursary',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='embeddings', to='bursaryDataMiner.bursary'),
+        ),
+        migrations.AddConstraint(
+            model_name='bursaryembedding',
+            constraint=models.UniqueConstraint(fields=('bursary', 'template'), name='unique_bursary_embedding_template'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-17 00:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bursaryDataMiner', '0013_bursaryembedding_template'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bursaryembedding',
+            index=models.Index(fields=['template', 'updated_at'], name='embedding_template_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Replaces the JSON list in BursaryEmbedding.vector with an int8 blob plus a
+# per-row scale (see bursaryDataMiner/vector_codec.py), converting existing rows.
+
+import json
+
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+
+def encode_int8(values):
+    # numpy is imported here so loading the migration graph (every migrate run) stays light
+    import numpy as np
+
+    vector = np.asarray(values, dtype=np.float32)
+    peak = float(np.abs(vector).max()) if vector.size else 0.0
+    scale = peak / 127.0 if peak else 1.0
+    return np.round(vector / scale).astype(np.int8).tobytes(), scale
+
+
+def json_to_binary(apps, schema_editor):
+    BursaryEmbedding = apps.get_model('bursaryDataMiner', 'BursaryEmbedding')
+    batch = []
+    for embedding in BursaryEmbedding.objects.exclude(vector__isnull=True).only('id', 'vector').iterator(chunk_size=BATCH_SIZE):
+        values = embedding.vector
+        if isinstance(values, str):
+            values = json.loads(values)
+        if not values:
+            continue
+        embedding.vector_data, embedding.vector_scale = encode_int8(values)
+        embedding.vector_format = 'int8'
+        batch.append(embedding)
+        if len(batch) == BATCH_SIZE:
+            BursaryEmbedding.objects.bulk_update(batch, ['vector_data', 'vector_scale', 'vector_format'])
+            batch = []
+    BursaryEmbedding.objects.bulk_update(batch, ['vector_data', 'vector_scale', 'vector_format'])
+
+
+def binary_to_json(apps, schema_editor):
+    import numpy as np
+
+    BursaryEmbedding = apps.get_model('bursaryDataMiner', 'BursaryEmbedding')
+    dtypes = {'int8': np.int8, 'float16': np.float16}
+    batch = []
+    for embedding in BursaryEmbedding.objects.exclude(vector_data__isnull=True).iterator(chunk_size=BATCH_SIZE):
+        values = np.frombuffer(embedding.vector_data, dtype=dtypes[embedding.vector_format]).astype(np.float32)
+        if embedding.vector_format == 'int8':
+            values *= embedding.vector_scale
+        embedding.vector = values.astype(float).tolist()
+        batch.append(embedding)
+        if len(batch) == BATCH_SIZE:
+            BursaryEmbedding.objects.bulk_update(batch, ['vector'])
+            batch = []
+    BursaryEmbedding.objects.bulk_update(batch, ['vector'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bursaryDataMiner', '0014_bursaryembedding_template_updated_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bursaryembedding',
+            name='vector_data',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='bursaryembedding',
+            name='vector_format',
+            field=models.CharField(default='int8', max_length=8),
+        ),
+        migrations.AddField(
+            model_name='bursaryembedding',
+            name='vector_scale',
+            field=models.FloatField(default=1.0),
+        ),
+        migrations.RunPython(json_to_binary, binary_to_json),
+        migrations.RemoveField(
+            model_name='bursaryembedding',
+            name='vector',
+        ),
+    ]
@@ -3,7 +3,7 @@ from django.conf import settings
 
 class Bursary(models.Model):
     title = models.CharField(max_length=255)
-    url = models.URLField()
+    url = models.URLField(unique=True)
     description = models.TextField(blank=True, null=True)  
     date_found = models.DateTimeField(auto_now_add=True)
     application_url = models.URLField(blank=True, null=True)
@@ -18,11 +18,112 @@ class UserBursaryMatch(models.Model):
     match_quality = models.TextField(null=True, blank=True, max_length=50)
     relevance_score = models.FloatField(null=True, blank=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "bursary"], name="unique_user_bursary_match"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "-relevance_score"], name="match_user_score_idx"),
+        ]
+
     def __str__(self):
         return f"{self.user.first_name} - {self.bursary.title}"
 
 
-class BursaryEmbedding(models.Model):
-    bursary = models.OneToOneField(Bursary, on_delete=models.CASCADE, related_name="embedding")
-    vector = models.JSONField(null=True, blank=True)  # store list[float]
-    updated_at = models.DateTimeField(auto_now=True)
\ No newline at end of file
+class StoredVector(models.Model):
+    """Quantised embedding vector, see vector_codec; read and written through the `vector` property"""
+    vector_data = models.BinaryField(null=True, blank=True)
+    vector_scale = models.FloatField(default=1.0)
+    vector_format = models.CharField(max_length=8, default="int8")
+    model_name = models.CharField(max_length=200, blank=True, default="")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def vector(self):
+        """float32 numpy vector, or None"""
+        if self.vector_data is None:
+            return None
+        from bursaryDataMiner.vector_codec import decode_vector
+        return decode_vector(self.vector_data, self.vector_scale, self.vector_format)
+
+    @vector.setter
+    def vector(self, value):
+        if value is None or len(value) == 0:
+            self.vector_data = None
+            return
+        from bursaryDataMiner.vector_codec import encode_vector
+        self.vector_format = settings.EMBEDDING_VECTOR_FORMAT
+        self.vector_data, self.vector_scale = encode_vector(value, self.vector_format)
+
+
+class BursaryEmbedding(StoredVector):
+    bursary = models.ForeignKey(Bursary, on_delete=models.CASCADE, related_name="embeddings")
+    # Which text builder the vector was made from, see embedding_pipeline.TEXT_TEMPLATES
+    template = models.CharField(max_length=50, default="corpus")
+    text_hash = models.CharField(max_length=64, blank=True, default="")  # sha256 of the template text
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["bursary", "template"], name="unique_bursary_embedding_template"),
+        ]
+        indexes = [
+            models.Index(fields=["template", "updated_at"], name="embedding_template_updated_idx"),
+        ]
+
+
+class UserProfileEmbedding(StoredVector):
+    """Persisted profile vector, the fallback behind profile_cache's in-memory LRU"""
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="profile_embedding")
+    fingerprint = models.CharField(max_length=64)  # sha256 of qualifications, courses and model name
+
+    def __str__(self):
+        return f"{self.user} ({self.fingerprint[:8]})"
+
+class BackgroundJob(models.Model):
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_SUCCEEDED, "Succeeded"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    kind = models.CharField(max_length=50)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True, related_name='background_jobs')
+    payload = models.JSONField(default=dict, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+    attempts = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Touched periodically while a worker runs the job; stale-job recovery goes by this
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="job_status_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+
+class JobEvent(models.Model):
+    job = models.ForeignKey(BackgroundJob, on_delete=models.CASCADE, related_name='events')
+    kind = models.CharField(max_length=50)
+    data = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["id"]
+
+    def __str__(self):
+        return f"{self.job_id}: {self.kind}"
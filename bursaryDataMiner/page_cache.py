@@ -0,0 +1,165 @@
+# bursaryDataMiner/page_cache.py
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonical_url(url):
+    """Normalise a URL so trivially different spellings share one cache entry"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+def body_hash(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+class CacheEntry:
+    def __init__(self, etag, last_modified, body_hash, parsed):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.body_hash = body_hash
+        self.parsed = parsed
+
+    def conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class PageCache:
+    """
+    Persistent conditional-GET cache for scraped pages.
+
+    Entries are keyed by (kind, canonical URL), where kind names the parser
+    that produced the stored result ("links" or "content"), and hold the
+    ETag, Last-Modified, a SHA-256 of the body and the parsed result. A 304,
+    or a 200 whose body hash is unchanged, returns the stored result without
+    parsing. Least recently used entries are evicted once the stored size
+    goes over max_bytes.
+
+    Backed by SQLite so the cache survives between crawls and can be shared
+    by several processes on one machine.
+    """
+
+    def __init__(self, path, max_bytes=50 * 1024 * 1024):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " key TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body_hash TEXT,"
+            " parsed TEXT, size INTEGER, accessed REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed)")
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    @staticmethod
+    def _key(kind, url):
+        return f"{kind}:{canonical_url(url)}"
+
+    def lookup(self, kind, url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, body_hash, parsed FROM pages WHERE key = ?",
+                (self._key(kind, url),),
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, digest, parsed = row
+        return CacheEntry(etag, last_modified, digest, json.loads(parsed))
+
+    def hit(self, kind, url, response_headers=None):
+        """Record a revalidated entry, refreshing its validators if the server sent new ones"""
+        key = self._key(kind, url)
+        with self._lock:
+            self.hits += 1
+            if response_headers and (response_headers.get("ETag") or response_headers.get("Last-Modified")):
+                self._conn.execute(
+                    "UPDATE pages SET etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified),"
+                    " accessed = ? WHERE key = ?",
+                    (response_headers.get("ETag"), response_headers.get("Last-Modified"), time.time(), key),
+                )
+            else:
+                self._conn.execute("UPDATE pages SET accessed = ? WHERE key = ?", (time.time(), key))
+
+    def store(self, kind, url, response_headers, digest, parsed):
+        payload = json.dumps(parsed)
+        size = len(payload) + len(digest)
+        key = self._key(kind, url)
+        with self._lock:
+            self.misses += 1
+            previous = self._conn.execute("SELECT size FROM pages WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (key, etag, last_modified, body_hash, parsed, size, accessed)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, response_headers.get("ETag"), response_headers.get("Last-Modified"),
+                 digest, payload, size, time.time()),
+            )
+            self._size += size - (previous[0] if previous else 0)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache is back under 90% of max_bytes"""
+        target = int(self.max_bytes * 0.9)
+        rows = self._conn.execute("SELECT key, size FROM pages ORDER BY accessed").fetchall()
+        doomed = []
+        for key, size in rows:
+            if self._size <= target:
+                break
+            doomed.append((key,))
+            self._size -= size
+        self._conn.executemany("DELETE FROM pages WHERE key = ?", doomed)
+        self.evictions += len(doomed)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "size_bytes": self._size,
+        }
+
+
+_page_cache = None
+_page_cache_lock = threading.Lock()
+
+
+def get_page_cache():
+    """Process-wide cache from settings, or None when SCRAPER_CACHE_PATH is empty"""
+    global _page_cache
+    if not settings.SCRAPER_CACHE_PATH:
+        return None
+    with _page_cache_lock:
+        if _page_cache is None:
+            _page_cache = PageCache(settings.SCRAPER_CACHE_PATH, settings.SCRAPER_CACHE_MAX_BYTES)
+    return _page_cache
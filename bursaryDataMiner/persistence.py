@@ -0,0 +1,129 @@
+# bursaryDataMiner/persistence.py
+import logging
+
+from django.db import transaction
+
+from bursaryDataMiner.models import Bursary, UserBursaryMatch
+
+logger = logging.getLogger(__name__)
+
+TEXT_FIELDS = ("title", "description", "application_url")
+
+
+def upsert_bursaries(rows):
+    """
+    Insert or update scraped bursaries by URL with INSERT ... ON CONFLICT (url).
+
+    A stored bursary takes the new title, description and application_url,
+    except where the scraped value is empty: known text is never replaced
+    with nothing. Rows are grouped by which of those fields they carry, so
+    a batch is one statement per group (usually one).
+
+    rows: dicts with "url", "title" and optional "description" / "application_url".
+    Returns (bursaries_by_url, {"inserted": n, "updated": n}); the returned
+    bursaries carry their ids and the scraped values.
+    """
+    by_url = {}
+    for row in rows:
+        if row.get("url"):
+            by_url[row["url"]] = row
+    if not by_url:
+        return {}, {"inserted": 0, "updated": 0}
+
+    groups = {}
+    for url, row in by_url.items():
+        bursary = Bursary(url=url, title=(row.get("title") or "")[:255], description=row.get("description") or "",
+                          application_url=row.get("application_url") or None)
+        fields = tuple(field for field in TEXT_FIELDS if getattr(bursary, field))
+        groups.setdefault(fields, []).append(bursary)
+
+    with transaction.atomic():
+        # Only used for the inserted/updated split; the upsert itself is race-free
+        existing = set(Bursary.objects.filter(url__in=list(by_url)).values_list("url", flat=True))
+        for fields, objs in groups.items():
+            if fields:
+                Bursary.objects.bulk_create(objs, update_conflicts=True, unique_fields=["url"],
+                                            update_fields=list(fields))
+            else:
+                Bursary.objects.bulk_create(objs, ignore_conflicts=True)
+
+    objs = [bursary for objs in groups.values() for bursary in objs]
+    if any(b.pk is None for b in objs):
+        # Backends that can't return ids from upserts (and rows with nothing to update) need one more read
+        objs = list(Bursary.objects.filter(url__in=list(by_url)))
+
+    return {b.url: b for b in objs}, {"inserted": len(by_url) - len(existing), "updated": len(existing)}
+
+
+def upsert_matches(user, matches, update_existing=True):
+    """
+    Insert or update UserBursaryMatch rows for one user with INSERT ... ON CONFLICT (user, bursary).
+
+    matches: iterable of (bursary, relevance_score, match_quality).
+    With update_existing=False, existing matches are left alone (get_or_create semantics).
+    Returns {"inserted": n, "updated": n}.
+    """
+    by_bursary = {}
+    for bursary, score, quality in matches:
+        by_bursary[bursary.pk] = UserBursaryMatch(
+            user=user, bursary=bursary, relevance_score=score, match_quality=quality,
+        )
+    if not by_bursary:
+        return {"inserted": 0, "updated": 0}
+
+    with transaction.atomic():
+        existing = set(
+            UserBursaryMatch.objects.filter(user=user, bursary_id__in=list(by_bursary))
+            .values_list("bursary_id", flat=True)
+        )
+        if update_existing:
+            UserBursaryMatch.objects.bulk_create(
+                list(by_bursary.values()),
+                update_conflicts=True,
+                unique_fields=["user", "bursary"],
+                update_fields=["relevance_score", "match_quality"],
+            )
+        else:
+            UserBursaryMatch.objects.bulk_create(list(by_bursary.values()), ignore_conflicts=True)
+
+    return {
+        "inserted": len(by_bursary) - len(existing),
+        "updated": len(existing) if update_existing else 0,
+    }
+
+
+def bulk_upsert_matches(rows, batch_size=5_000, update_existing=True):
+    """
+    Insert or update UserBursaryMatch rows for many users at once,
+    batch_size rows per INSERT ... ON CONFLICT (user, bursary).
+
+    rows: iterable of (user_id, bursary_id, relevance_score, match_quality).
+    With update_existing=False, existing matches are left alone.
+    Returns the number of rows sent.
+    """
+    written = 0
+    batch = []
+
+    def flush():
+        with transaction.atomic():
+            if update_existing:
+                UserBursaryMatch.objects.bulk_create(
+                    batch,
+                    update_conflicts=True,
+                    unique_fields=["user", "bursary"],
+                    update_fields=["relevance_score", "match_quality"],
+                )
+            else:
+                UserBursaryMatch.objects.bulk_create(batch, ignore_conflicts=True)
+        return len(batch)
+
+    for user_id, bursary_id, score, quality in rows:
+        batch.append(UserBursaryMatch(
+            user_id=user_id, bursary_id=bursary_id, relevance_score=score, match_quality=quality,
+        ))
+        if len(batch) == batch_size:
+            written += flush()
+            batch = []
+    if batch:
+        written += flush()
+    return written
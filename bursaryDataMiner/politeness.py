@@ -0,0 +1,108 @@
+# bursaryDataMiner/politeness.py
+import asyncio
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HostScheduler:
+    """
+    Per-host politeness scheduler.
+
+    Tracks the next time each host may be hit. Callers reserve a slot before
+    a request and sleep only until that slot, so a request to one host never
+    waits on the delay of another. 429 and 5xx responses grow a per-host
+    backoff (honouring numeric Retry-After), successful responses shrink it
+    back towards the base delay.
+
+    Thread-safe: the sync crawler, the async crawler's executor threads and
+    the requests response hook all share one instance.
+    """
+
+    def __init__(self, delay=1.0, jitter=0.5, max_backoff=60.0, backoff_factor=2.0):
+        self.delay = max(0.0, delay)
+        self.jitter = max(0.0, jitter)
+        self.max_backoff = max(self.delay, max_backoff)
+        self.backoff_factor = max(1.0, backoff_factor)
+        self._lock = threading.Lock()
+        self._next_allowed = {}
+        self._backoff = {}
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            delay=settings.SCRAPER_HOST_DELAY,
+            jitter=settings.SCRAPER_HOST_JITTER,
+            max_backoff=settings.SCRAPER_MAX_BACKOFF,
+        )
+
+    @staticmethod
+    def host_for(url):
+        return urlparse(url).netloc.lower()
+
+    def _interval(self, host):
+        interval = max(self.delay, self._backoff.get(host, 0.0))
+        if self.jitter:
+            interval += random.uniform(0, self.jitter)
+        return interval
+
+    def reserve(self, url):
+        """Claim the next slot for this URL's host and return seconds to wait for it"""
+        host = self.host_for(url)
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_allowed.get(host, now))
+            self._next_allowed[host] = slot + self._interval(host)
+        return slot - now
+
+    def wait(self, url):
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self, url):
+        delay = self.reserve(url)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def record(self, url, status_code, retry_after=None):
+        """Adapt the host's backoff to the response status"""
+        host = self.host_for(url)
+        with self._lock:
+            current = self._backoff.get(host, 0.0)
+
+            if status_code in BACKOFF_STATUSES:
+                backoff = min(self.max_backoff, max(self.delay, current, 0.5) * self.backoff_factor)
+                try:
+                    backoff = min(self.max_backoff, max(backoff, float(retry_after)))
+                except (TypeError, ValueError):
+                    pass
+                self._backoff[host] = backoff
+                self._next_allowed[host] = max(self._next_allowed.get(host, 0.0),
+                                               time.monotonic() + backoff)
+                logger.info(f"Backing off {host} for {backoff:.1f}s after HTTP {status_code}")
+
+            elif current:
+                backoff = current / self.backoff_factor
+                if backoff <= self.delay:
+                    self._backoff.pop(host, None)
+                else:
+                    self._backoff[host] = backoff
+
+    def install(self, session):
+        """Feed every response of a requests session back into the scheduler"""
+        hooks = session.hooks.setdefault("response", [])
+        if self._response_hook not in hooks:
+            hooks.append(self._response_hook)
+        return self
+
+    def _response_hook(self, response, *args, **kwargs):
+        self.record(response.url, response.status_code, response.headers.get("Retry-After"))
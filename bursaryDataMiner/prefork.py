@@ -0,0 +1,61 @@
+# bursaryDataMiner/prefork.py
+"""
+Warm the text encoder and embedding matrices once in a parent process so
+forked job workers share them copy-on-write instead of each loading their
+own on first use (see `run_jobs --processes`).
+
+Fork safety:
+  - the parent encodes with one intra-op thread, so no torch/OpenMP or
+    ONNX Runtime pool threads exist at fork (they would not survive it);
+    each child then sets its own torch thread count, while ONNX sessions
+    keep the single thread they were created with
+  - TOKENIZERS_PARALLELISM is off before tokenizers is first used
+  - database connections opened while warming are closed before fork
+  - gc.freeze() moves everything loaded so far out of the collector's
+    reach, so collections in children do not write to (and un-share) it
+
+With EMBEDDING_SERVER_SOCKET set the encoder lives in the embedding
+server; only the matrices are warmed and each child connects itself.
+"""
+import gc
+import os
+import time
+
+
+def disable_tokenizers_parallelism():
+    """Must run before tokenizers is imported anywhere"""
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+
+def warm_before_fork():
+    """Load the encoder and every template's matrix in the parent; returns a one-line summary"""
+    from django.conf import settings
+    from django.db import connections
+
+    from bursaryDataMiner.ai_matcher import embed_texts
+    from bursaryDataMiner.embedding_pipeline import TEXT_TEMPLATES
+    from bursaryDataMiner.embedding_store import get_embedding_matrix
+    from bursaryDataMiner.encoders import set_num_threads
+
+    disable_tokenizers_parallelism()
+    start = time.perf_counter()
+    if not settings.EMBEDDING_SERVER_SOCKET:
+        set_num_threads(1)
+        embed_texts(["warm up"])
+    rows = sum(len(get_embedding_matrix(template).view()) for template in TEXT_TEMPLATES)
+    connections.close_all()
+
+    gc.collect()
+    gc.freeze()
+    return (f"Preloaded encoder and {rows} embedding rows in {time.perf_counter() - start:.1f}s "
+            f"({gc.get_freeze_count()} objects frozen)")
+
+
+def after_fork(threads):
+    """Runs in each child straight after fork"""
+    from bursaryDataMiner.ai_matcher import embed_texts
+    from bursaryDataMiner.encoders import set_num_threads
+
+    set_num_threads(threads)
+    # Starts this child's own thread pool (or server connection) before the first job needs it
+    embed_texts(["warm up"])
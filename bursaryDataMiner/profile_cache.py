@@ -0,0 +1,212 @@
+# bursaryDataMiner/profile_cache.py
+"""
+Profile vectors cached against a fingerprint of the user's qualifications.
+
+A profile only changes when the user's industries, course names or grades
+do, so encoding it on every search is wasted model time. Lookups go
+through a per-process LRU, then the UserProfileEmbedding table, and only
+then the model.
+
+Entries are keyed by user and checked against the current fingerprint,
+so a stale entry is never served, even by a worker that missed an
+invalidation. invalidate_profile_vector frees the LRU entry early and
+marks the stored row stale; the row keeps its vector until it is
+re-encoded, so the user stays reachable for reverse matching, which calls
+refresh_stale_profile_vectors before reading stored vectors in bulk.
+Changes that skip invalidation are caught by the periodic full sweep.
+"""
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+
+from bursaryDataMiner.models import UserProfileEmbedding
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileVectorLRU:
+    """Thread-safe {user_id: (fingerprint, vector)} with least-recently-used eviction"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, user_id, fingerprint):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] != fingerprint:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user_id, fingerprint, vector):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (fingerprint, vector)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_profile_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ProfileVectorLRU(settings.PROFILE_CACHE_SIZE)
+        return _cache
+
+
+def profile_fingerprint(user, model_name):
+    """
+    sha256 over the user's industries, course names and grades, plus the model name.
+
+    Reads user.qualifications.all() and qual.courses.all(), so a prefetch
+    on the users is used when present.
+    """
+    qualifications = [
+        [qual.industry or "", [[course.name, str(course.grade)]
+                               for course in sorted(qual.courses.all(), key=lambda c: c.pk)]]
+        for qual in sorted(user.qualifications.all(), key=lambda q: q.pk)
+    ]
+    payload = json.dumps([model_name, qualifications], separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get_profile_vectors(users, batch_size=64):
+    """
+    {user_id: unit-length float32 profile vector} for many users.
+
+    LRU hits cost nothing, stored vectors are read with one query, and
+    every remaining profile is encoded in one batched call and written back
+    with one upsert. Users whose profile has no text are left out.
+    """
+    # Imported here so the qualification views can invalidate without loading the model
+    from bursaryDataMiner.ai_matcher import embed_texts, get_model_name
+    from bursaryDataMiner.enhanced_ai_matcher import build_user_profile
+
+    cache = get_profile_cache()
+    model_name = get_model_name()
+    vectors = {}
+    pending = {}
+    for user in users:
+        fingerprint = profile_fingerprint(user, model_name)
+        vector = cache.get(user.pk, fingerprint)
+        if vector is not None:
+            vectors[user.pk] = vector
+        else:
+            pending[user.pk] = (user, fingerprint)
+    if not pending:
+        return vectors
+
+    found = {}
+    for stored in UserProfileEmbedding.objects.filter(user_id__in=list(pending), vector_data__isnull=False):
+        if stored.fingerprint == pending[stored.user_id][1]:
+            found[stored.user_id] = stored.vector
+
+    missing = [(user, fingerprint, build_user_profile(user).strip())
+               for user_id, (user, fingerprint) in pending.items() if user_id not in found]
+    missing = [item for item in missing if item[2]]
+    if missing:
+        encoded = embed_texts([text for _, _, text in missing], batch_size=batch_size)
+        UserProfileEmbedding.objects.bulk_create(
+            [UserProfileEmbedding(user_id=user.pk, fingerprint=fingerprint, vector=vector, model_name=model_name)
+             for (user, fingerprint, _), vector in zip(missing, encoded)],
+            update_conflicts=True,
+            unique_fields=["user"],
+            update_fields=["fingerprint", "vector_data", "vector_scale", "vector_format",
+                           "model_name", "updated_at"],
+        )
+        found.update((user.pk, vector) for (user, _, _), vector in zip(missing, encoded))
+
+    for user_id, vector in found.items():
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        vector.setflags(write=False)
+        cache.put(user_id, pending[user_id][1], vector)
+        vectors[user_id] = vector
+    return vectors
+
+
+def get_profile_vector(user):
+    """
+    Unit-length float32 profile vector for a user, encoding the profile
+    text only when no cached vector matches the current fingerprint.
+    Returns an empty array if the profile has no text.
+    """
+    vector = get_profile_vectors([user]).get(user.pk)
+    return vector if vector is not None else np.empty(0, dtype=np.float32)
+
+
+def invalidate_profile_vector(user):
+    """
+    Forget a user's cached profile vector and mark the stored one stale,
+    e.g. after their qualifications change. The stored vector is kept, and
+    replaced when the profile is next encoded.
+    """
+    get_profile_cache().discard(user.pk)
+    UserProfileEmbedding.objects.filter(user_id=user.pk).update(fingerprint="")
+
+
+def refresh_stale_profile_vectors(batch_size=64, full=False):
+    """
+    Re-encode stored profile vectors marked stale, i.e. invalidated (blank
+    fingerprint) or made with another model, and drop those whose profile
+    has no text left. Only those rows are read, so this is cheap enough to
+    run before every reverse match.
+
+    full=True compares every stored fingerprint with the user's current
+    qualifications instead, catching changes made without
+    invalidate_profile_vector (admin, shell, bulk updates); run it
+    periodically with `manage.py refresh_profile_vectors`.
+    Returns (refreshed, dropped).
+    """
+    from bursaryDataMiner.ai_matcher import get_model_name
+
+    model_name = get_model_name()
+    rows = UserProfileEmbedding.objects.all()
+    if not full:
+        rows = rows.filter(Q(fingerprint="") | ~Q(model_name=model_name))
+    stored = dict(rows.values_list("user_id", "fingerprint"))
+    if not stored:
+        return 0, 0
+
+    users = get_user_model().objects.filter(profile_embedding__in=rows).prefetch_related(
+        "qualifications__courses"
+    )
+    stale = [user for user in users.iterator(chunk_size=2_000)
+             if profile_fingerprint(user, model_name) != stored.get(user.pk)]
+    if not stale:
+        return 0, 0
+
+    cache = get_profile_cache()
+    for user in stale:
+        cache.discard(user.pk)
+    vectors = get_profile_vectors(stale, batch_size=batch_size)
+    dropped = [user.pk for user in stale if user.pk not in vectors]
+    if dropped:
+        UserProfileEmbedding.objects.filter(user_id__in=dropped).delete()
+    logger.info(f"Refreshed {len(vectors)} stale profile vectors, dropped {len(dropped)} empty profiles")
+    return len(vectors), len(dropped)
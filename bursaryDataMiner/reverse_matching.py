@@ -0,0 +1,97 @@
+# bursaryDataMiner/reverse_matching.py
+"""
+Push newly scraped bursaries to users who already have a profile vector.
+
+Instead of re-ranking every user against the whole corpus, only the new
+bursary vectors are scored against the stored profile vectors
+(UserProfileEmbedding), so the work per crawl is new bursaries x users
+rather than users x corpus. Pairs at or above QUALITY_SIM_THRESHOLD become
+UserBursaryMatch rows, scored like ai_ranker does; existing matches are
+left alone. Stored vectors invalidated since they were encoded, or made
+with another model, are refreshed first; the periodic
+refresh_profile_vectors sweep catches profile changes made elsewhere.
+"""
+import logging
+import time
+
+import numpy as np
+
+from bursaryDataMiner.ai_matcher import get_model_name
+from bursaryDataMiner.ai_ranker import QUALITY_SIM_THRESHOLD, hard_filters, match_score
+from bursaryDataMiner.embedding_pipeline import BURSARY_TEXT_FIELDS, DEFAULT_TEMPLATE, get_vectors
+from bursaryDataMiner.embedding_store import normalize_rows
+from bursaryDataMiner.models import UserProfileEmbedding
+from bursaryDataMiner.persistence import bulk_upsert_matches
+from bursaryDataMiner.profile_cache import refresh_stale_profile_vectors
+from bursaryDataMiner.vector_codec import decode_many
+from qualificationsAndCourses.models import Qualifications
+
+logger = logging.getLogger(__name__)
+
+USER_BLOCK_SIZE = 8_192
+
+
+def load_profile_matrix():
+    """(user ids, unit-length profile vectors) for every stored profile of the current model"""
+    rows = UserProfileEmbedding.objects.filter(
+        model_name=get_model_name(), vector_data__isnull=False,
+    ).order_by("user_id").values_list("user_id", "vector_data", "vector_scale", "vector_format")
+    by_format = {}
+    for user_id, data, scale, fmt in rows.iterator(chunk_size=5_000):
+        by_format.setdefault(fmt, ([], [], []))
+        ids, datas, scales = by_format[fmt]
+        ids.append(user_id)
+        datas.append(data)
+        scales.append(scale)
+    if not by_format:
+        return np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32)
+    user_ids = np.concatenate([np.array(ids, dtype=np.int64) for ids, _, _ in by_format.values()])
+    vectors = np.concatenate([decode_many(datas, scales, fmt) for fmt, (_, datas, scales) in by_format.items()])
+    return user_ids, normalize_rows(vectors)
+
+
+def _industries(user_ids):
+    industries = {}
+    for user_id, industry in Qualifications.objects.filter(applicant_id__in=user_ids).values_list(
+        "applicant_id", "industry",
+    ):
+        industries.setdefault(user_id, set()).add((industry or "").lower())
+    return industries
+
+
+def reverse_match_bursaries(bursaries, user_block=USER_BLOCK_SIZE):
+    """
+    Score the given bursaries (a queryset) against every stored profile
+    vector and insert the matches.
+
+    Returns {"bursaries", "users", "matches", "seconds"}.
+    """
+    start = time.perf_counter()
+    bursaries = [b for b in bursaries.only(*BURSARY_TEXT_FIELDS) if hard_filters(b, None)]
+    vectors = get_vectors(bursaries, DEFAULT_TEMPLATE)
+    bursaries = [b for b in bursaries if b.id in vectors]
+    if bursaries:
+        refresh_stale_profile_vectors()
+    user_ids, profiles = load_profile_matrix()
+    if not bursaries or not len(user_ids):
+        return {"bursaries": len(bursaries), "users": len(user_ids), "matches": 0, "seconds": 0.0}
+
+    bursary_t = normalize_rows(np.stack([vectors[b.id] for b in bursaries])).T.copy()
+    pairs = []
+    for first in range(0, len(user_ids), user_block):
+        sims = profiles[first:first + user_block] @ bursary_t
+        users, cols = np.nonzero(sims >= QUALITY_SIM_THRESHOLD)
+        pairs.extend(zip((users + first).tolist(), cols.tolist(), sims[users, cols].tolist()))
+
+    industries = _industries(np.unique(user_ids[[user for user, _, _ in pairs]]).tolist()) if pairs else {}
+    rows = []
+    for user, col, sim in pairs:
+        user_id, bursary = int(user_ids[user]), bursaries[col]
+        rows.append((user_id, bursary.id, *match_score(sim, bursary.title, industries.get(user_id, ()))))
+    matches = bulk_upsert_matches(rows, update_existing=False)
+
+    seconds = time.perf_counter() - start
+    logger.info(f"Reverse-matched {len(bursaries)} bursaries against {len(user_ids)} profiles: "
+                f"{matches} matches ({seconds:.2f}s)")
+    return {"bursaries": len(bursaries), "users": len(user_ids), "matches": matches,
+            "seconds": round(seconds, 2)}
@@ -1,13 +1,17 @@
 import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
-import time
-import random
 import re
-import numpy as np
+import threading
+from django.conf import settings
 from django.utils.timezone import now
 from django.db import transaction
+from bursaryDataMiner.keyword_automaton import PatternSet
 from bursaryDataMiner.models import Bursary, UserBursaryMatch
+from bursaryDataMiner.page_cache import body_hash, get_page_cache
+from bursaryDataMiner.persistence import upsert_bursaries, upsert_matches
+from bursaryDataMiner.politeness import HostScheduler
+from bursaryDataMiner.seen_urls import get_seen_urls
 import logging
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
@@ -23,7 +27,7 @@ EXCELLENT_SIM_THRESHOLD = 0.28
 # REQUESTS SESSION WITH RETRY LOGIC
 # ============================================================================
 
-def get_resilient_session():
+def get_resilient_session(pool_connections=10):
     """Create requests session with automatic retries and proper SSL handling"""
     import urllib3
     
@@ -32,15 +36,19 @@ def get_resilient_session():
     
     session = requests.Session()
     
-    # Retry strategy: retry on connection errors, timeouts, 500/502/503/504
+    # Retry strategy: retry on connection errors and timeouts only. 429 and 5xx
+    # responses are returned as-is so HostScheduler sees them and backs the host off
+    # (urllib3 would otherwise retry them with its own sleeps, out of the scheduler's sight)
     retry_strategy = Retry(
         total=3,
         backoff_factor=1,
-        status_forcelist=[429, 500, 502, 503, 504],
+        status_forcelist=None,
+        respect_retry_after_header=False,
         allowed_methods=["GET"]
     )
     
-    adapter = HTTPAdapter(max_retries=retry_strategy)
+    # One pooled connection set per host the crawler talks to concurrently
+    adapter = HTTPAdapter(max_retries=retry_strategy, pool_connections=pool_connections)
     session.mount("http://", adapter)
     session.mount("https://", adapter)
     
@@ -114,7 +122,12 @@ INDUSTRY_SPECIFIC_SITES = {
 # ============================================================================
 
 class ImprovedBursaryMatcher:
-    """Simplified matcher focused on recall over precision"""
+    """
+    Simplified matcher focused on recall over precision
+    
+    Holds no per-page state, so one instance (get_bursary_page_matcher) is
+    shared by every crawl and crawler thread
+    """
 
     def __init__(self):
         self.field_mappings = {
@@ -157,6 +170,7 @@ class ImprovedBursaryMatcher:
             r"how\s+to\s+apply", r"application\s+tips", r"interview",
             r"motivational\s+letter", r"cv\s+writing"
         ]
+        self.compiled_exclusions = PatternSet(self.exclusion_patterns, re.IGNORECASE)
 
     def is_likely_bursary_page(self, title, description):
         """Check if this looks like a bursary opportunity"""
@@ -166,9 +180,8 @@ class ImprovedBursaryMatcher:
         combined = f"{title} {description}".lower()
         
         # Hard exclusions
-        for pattern in self.exclusion_patterns:
-            if re.search(pattern, combined, re.IGNORECASE):
-                return False
+        if self.compiled_exclusions.search(combined):
+            return False
         
         # Must have at least one generic indicator
         has_generic = any(term in combined for term in self.generic_indicators)
@@ -215,97 +228,157 @@ class ImprovedBursaryMatcher:
         return min(score, 100)
 
 
+_page_matcher = None
+_page_matcher_lock = threading.Lock()
+
+
+def get_bursary_page_matcher():
+    """Process-wide ImprovedBursaryMatcher, built on first use"""
+    global _page_matcher
+    with _page_matcher_lock:
+        if _page_matcher is None:
+            _page_matcher = ImprovedBursaryMatcher()
+    return _page_matcher
+
+
 # ============================================================================
 # SCRAPER
 # ============================================================================
 
-def extract_all_links(site_url, session):
-    """Extract all links from a page"""
+REQUEST_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+}
+
+
+def fetch_parsed(url, session, kind, parse, timeout, scheduler=None, cache=None):
+    """
+    GET a page and return parse(html, url).
+    
+    With a cache, the stored validators are sent as If-None-Match /
+    If-Modified-Since. A 304, or a 200 whose body hash matches the stored
+    one, returns the cached parse result without parsing again.
+    """
+    if scheduler is not None:
+        scheduler.wait(url)
+    
+    headers = dict(REQUEST_HEADERS)
+    entry = cache.lookup(kind, url) if cache is not None else None
+    if entry is not None:
+        headers.update(entry.conditional_headers())
+    
+    response = session.get(url, headers=headers, timeout=timeout)
+    
+    if response.status_code == 304 and entry is not None:
+        cache.hit(kind, url, response.headers)
+        return entry.parsed
+    
+    response.raise_for_status()
+    
+    if cache is None:
+        return parse(response.text, url)
+    
+    digest = body_hash(response.content)
+    if entry is not None and entry.body_hash == digest:
+        cache.hit(kind, url, response.headers)
+        return entry.parsed
+    
+    parsed = parse(response.text, url)
+    cache.store(kind, url, response.headers, digest, parsed)
+    return parsed
+
+
+def parse_links(html, site_url):
+    """Extract unique (url, anchor text) pairs from a page"""
     links = []
-    try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-        }
-        response = session.get(site_url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, "html.parser")
+    soup = BeautifulSoup(html, "html.parser")
+    
+    for a_tag in soup.find_all("a", href=True):
+        href = a_tag.get("href", "").strip()
+        text = a_tag.get_text(strip=True)
         
-        for a_tag in soup.find_all("a", href=True):
-            href = a_tag.get("href", "").strip()
-            text = a_tag.get_text(strip=True)
+        if href and text and len(text) > 3:
+            full_url = urljoin(site_url, href)
             
-            if href and text and len(text) > 3:
-                full_url = urljoin(site_url, href)
-                
-                # Skip non-HTML URLs
-                if any(skip in full_url.lower() for skip in [
-                    'logout', 'login', 'register', '#', 'javascript',
-                    '.pdf', '.doc', '.docx', '.zip', '.jpg', '.png', '.gif',
-                    'mailto:', 'tel:', 'ftp:'
-                ]):
-                    continue
-                
-                links.append((full_url, text))
-        
-        # Remove duplicates
-        seen = set()
-        unique_links = []
-        for url, text in links:
-            if url not in seen:
-                seen.add(url)
-                unique_links.append((url, text))
-        
+            # Skip non-HTML URLs
+            if any(skip in full_url.lower() for skip in [
+                'logout', 'login', 'register', '#', 'javascript',
+                '.pdf', '.doc', '.docx', '.zip', '.jpg', '.png', '.gif',
+                'mailto:', 'tel:', 'ftp:'
+            ]):
+                continue
+            
+            links.append((full_url, text))
+    
+    # Remove duplicates
+    seen = set()
+    unique_links = []
+    for url, text in links:
+        if url not in seen:
+            seen.add(url)
+            unique_links.append((url, text))
+    
+    return unique_links
+
+
+def parse_page_content(html, url):
+    """Extract the main text of a page"""
+    soup = BeautifulSoup(html, "html.parser")
+    
+    # Remove script/style tags
+    for tag in soup(["script", "style"]):
+        tag.decompose()
+    
+    # Extract text
+    content_selectors = [".content", ".main-content", ".post-content", ".entry-content",
+                        "article", ".article", "main"]
+    
+    content = ""
+    for selector in content_selectors:
+        element = soup.select_one(selector)
+        if element:
+            content = element.get_text(" ", strip=True)
+            break
+    
+    if not content:
+        content = soup.get_text(" ", strip=True)
+    
+    return content[:800]
+
+
+def extract_all_links(site_url, session, scheduler=None, cache=None):
+    """Extract all links from a page"""
+    try:
+        links = fetch_parsed(site_url, session, "links", parse_links, 10, scheduler, cache)
+        # Cached results come back from JSON as lists
+        unique_links = [(url, text) for url, text in links]
         logger.info(f"Extracted {len(unique_links)} unique links from {site_url}")
         return unique_links
     
     except Exception as e:
         logger.error(f"Error extracting links from {site_url}: {e}")
-        return links
+        return []
 
 
-def fetch_page_content(url, session):
+def fetch_page_content(url, session, scheduler=None, cache=None):
     """Fetch and extract content from a page"""
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-        }
-        response = session.get(url, headers=headers, timeout=8)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, "html.parser")
-        
-        # Remove script/style tags
-        for tag in soup(["script", "style"]):
-            tag.decompose()
-        
-        # Extract text
-        content_selectors = [".content", ".main-content", ".post-content", ".entry-content",
-                            "article", ".article", "main"]
-        
-        content = ""
-        for selector in content_selectors:
-            element = soup.select_one(selector)
-            if element:
-                content = element.get_text(" ", strip=True)
-                break
-        
-        if not content:
-            content = soup.get_text(" ", strip=True)
-        
-        return content[:800]
+        return fetch_parsed(url, session, "content", parse_page_content, 8, scheduler, cache)
     
     except Exception as e:
         logger.error(f"Error fetching {url}: {e}")
         return ""
 
 
-def scrape_site_improved(site_url, user_industries, user_courses, existing_urls, matcher, session):
+def scrape_site_improved(site_url, user_industries, user_courses, existing_urls, matcher, session,
+                         scheduler=None, cache=None):
     """Scrape a single site"""
     scraped_bursaries = []
     
+    if scheduler is None:
+        scheduler = HostScheduler.from_settings().install(session)
+    
     try:
-        links = extract_all_links(site_url, session)
+        links = extract_all_links(site_url, session, scheduler, cache)
         
         if not links:
             logger.info(f"No links found on {site_url}")
@@ -317,7 +390,7 @@ def scrape_site_improved(site_url, user_industries, user_courses, existing_urls,
             if url in existing_urls:
                 continue
             
-            description = fetch_page_content(url, session)
+            description = fetch_page_content(url, session, scheduler, cache)
             
             if not description:
                 continue
@@ -336,9 +409,6 @@ def scrape_site_improved(site_url, user_industries, user_courses, existing_urls,
                 }
                 scraped_bursaries.append(bursary_data)
                 logger.info(f"Found: [{score}] {title[:50]}")
-            
-            # Small delay between requests
-            time.sleep(random.uniform(0.5, 1.5))
         
         return scraped_bursaries
     
@@ -347,10 +417,91 @@ def scrape_site_improved(site_url, user_industries, user_courses, existing_urls,
         return scraped_bursaries
 
 
-def enhanced_scrape_bursaries(user):
-    """Main scraping function"""
-    session = get_resilient_session()
+def build_site_list(user_industries=None):
+    """Seed sites to crawl; with no industries given, every industry-specific list is included"""
+    sites = []
+    if user_industries is None:
+        for industry_sites in INDUSTRY_SPECIFIC_SITES.values():
+            sites.extend(industry_sites)
+    else:
+        for industry in user_industries:
+            if industry in INDUSTRY_SPECIFIC_SITES:
+                sites.extend(INDUSTRY_SPECIFIC_SITES[industry])
+    
+    sites.extend(BASE_BURSARY_SITES)
+    sites.extend(UNIVERSITY_BURSARY_SITES)
+    sites.extend(COMPANY_BURSARY_SITES)
+    sites.extend(GOVERNMENT_BURSARY_SITES)
+    
+    return list(dict.fromkeys(sites))
+
+
+def run_crawl(sites, user_industries, user_courses, existing_urls, matcher, on_event=None):
+    """Crawl sites concurrently with politeness scheduling and the page cache"""
+    from bursaryDataMiner.crawler import AsyncCrawler
+    
+    session = get_resilient_session(pool_connections=settings.SCRAPER_MAX_CONCURRENCY)
+    scheduler = HostScheduler.from_settings().install(session)
+    cache = get_page_cache()
+    
+    try:
+        logger.info(f"Scraping {len(sites)} sites")
+        crawler = AsyncCrawler(
+            session, matcher, scheduler=scheduler, cache=cache, on_event=on_event,
+            max_concurrency=settings.SCRAPER_MAX_CONCURRENCY,
+            per_host_limit=settings.SCRAPER_PER_HOST_LIMIT,
+        )
+        site_results = crawler.run(sites, user_industries, user_courses, existing_urls)
+        if cache is not None:
+            logger.info(f"Page cache: {cache.stats()}")
+        return site_results
+    
+    finally:
+        session.close()
+
+
+def crawl_all_bursaries(on_event=None):
+    """
+    Shared, user-independent crawl that fills the Bursary table.
+    
+    Every seed site is crawled without user keywords, so any page that looks
+    like a bursary is stored. Searches then only match against stored rows.
+    Run on a schedule through `manage.py fetch_bursaries`.
+    """
+    try:
+        seen_urls = get_seen_urls()
+        matcher = get_bursary_page_matcher()
+        site_results = run_crawl(build_site_list(), [], [], seen_urls, matcher, on_event)
+        
+        found, created, updated = 0, 0, 0
+        for site, site_bursaries in site_results:
+            logger.info(f"{site}: {len(site_bursaries)} found")
+            found += len(site_bursaries)
+            _, counts = upsert_bursaries(site_bursaries)
+            created += counts["inserted"]
+            updated += counts["updated"]
+        
+        seen_urls.catch_up()
+        seen_urls.save()
+        
+        logger.info(f"Shared crawl complete: {found} found, {created} new, {updated} updated")
+        return {
+            "scraped": found,
+            "created": created,
+            "updated": updated,
+            "status": "complete",
+            "message": f"{found} bursaries found ({created} new)"
+        }
     
+    except Exception as e:
+        logger.error(f"Critical error in shared crawl: {e}")
+        import traceback
+        logger.error(traceback.format_exc())
+        return {"scraped": 0, "created": 0, "status": "error", "message": str(e)}
+
+
+def enhanced_scrape_bursaries(user, on_event=None):
+    """Main scraping function"""
     try:
         logger.info(f"Starting scraping for {getattr(user, 'email', 'Unknown')}")
         
@@ -367,54 +518,30 @@ def enhanced_scrape_bursaries(user):
         logger.info(f"Industries: {user_industries}")
         logger.info(f"Courses: {user_courses}")
         
-        existing_urls = set(Bursary.objects.values_list("url", flat=True))
-        matcher = ImprovedBursaryMatcher()
-        
-        # Build sites list
-        sites = []
-        for industry in user_industries:
-            if industry in INDUSTRY_SPECIFIC_SITES:
-                sites.extend(INDUSTRY_SPECIFIC_SITES[industry])
-        
-        sites.extend(BASE_BURSARY_SITES)
-        sites.extend(UNIVERSITY_BURSARY_SITES)
-        sites.extend(COMPANY_BURSARY_SITES)
-        sites.extend(GOVERNMENT_BURSARY_SITES)
+        seen_urls = get_seen_urls()
+        matcher = get_bursary_page_matcher()
         
-        unique_sites = list(dict.fromkeys(sites))
-        logger.info(f"Scraping {len(unique_sites)} sites")
+        unique_sites = build_site_list(user_industries)
+        site_results = run_crawl(unique_sites, user_industries, user_courses, seen_urls, matcher,
+                                 on_event)
         
         all_bursaries = []
         
-        for i, site in enumerate(unique_sites):
-            logger.info(f"\n[{i+1}/{len(unique_sites)}] {site}")
-            
-            site_bursaries = scrape_site_improved(site, user_industries, user_courses, 
-                                                   existing_urls, matcher, session)
+        for i, (site, site_bursaries) in enumerate(site_results):
+            logger.info(f"\n[{i+1}/{len(unique_sites)}] {site}: {len(site_bursaries)} found")
             
             if site_bursaries:
                 all_bursaries.extend(site_bursaries)
                 
                 # Save to DB
-                for bursary_data in site_bursaries:
-                    bursary_obj, _ = Bursary.objects.get_or_create(
-                        url=bursary_data["url"],
-                        defaults={
-                            "title": bursary_data["title"],
-                            "description": bursary_data["description"]
-                        }
-                    )
-                    
-                    UserBursaryMatch.objects.get_or_create(
-                        user=user,
-                        bursary=bursary_obj,
-                        defaults={
-                            "relevance_score": bursary_data["relevance_score"],
-                            "match_quality": "Good Match"
-                        }
-                    )
-            
-            time.sleep(random.uniform(1, 2))
+                bursaries_by_url, _ = upsert_bursaries(site_bursaries)
+                upsert_matches(user, [
+                    (bursaries_by_url[b["url"]], b["relevance_score"], "Good Match")
+                    for b in site_bursaries
+                ], update_existing=False)
+        
+        seen_urls.catch_up()
+        seen_urls.save()
         
         all_bursaries.sort(key=lambda x: x["relevance_score"], reverse=True)
         
@@ -435,7 +562,4 @@ def enhanced_scrape_bursaries(user):
         logger.error(f"Critical error: {e}")
         import traceback
         logger.error(traceback.format_exc())
-        return {"matches": [], "scraped": 0, "status": "error", "message": str(e)}
-    
-    finally:
-        session.close()
\ No newline at end of file
+        return {"matches": [], "scraped": 0, "status": "error", "message": str(e)}
\ No newline at end of file
@@ -0,0 +1,72 @@
+# bursaryDataMiner/search.py
+import logging
+
+from bursaryDataMiner.models import UserBursaryMatch, Bursary
+
+logger = logging.getLogger(__name__)
+
+
+def run_bursary_search(user, limit=30, on_event=None):
+    """
+    Match a user against the stored bursaries.
+
+    Returns the payload the search endpoint has always returned. Runs inside
+    the job worker (see bursaryDataMiner.jobs), never inside a web request.
+    on_event(kind, data), if given, receives "search_started" and one
+    "match" event per scored result.
+    """
+    logger.info(f"Starting bursary search for user: {user.email}")
+
+    # Crawling happens in the shared `fetch_bursaries` job; a search only
+    # matches against bursaries that are already stored.
+    scraped_count = 0
+
+    # --- AI MATCHING WITH STORED BURSARIES ---
+    total_bursaries = Bursary.objects.count()
+    logger.info(f"Total bursaries in database: {total_bursaries}")
+    if on_event is not None:
+        on_event("search_started", {"total_bursaries": total_bursaries})
+
+    if total_bursaries == 0:
+        return {
+            "status": "warning",
+            "message": "No bursaries in database. Please populate database first.",
+            "scraped": scraped_count,
+            "matched": 0,
+            "data": []
+        }
+
+    # Try AI matching with existing data
+    ai_results = []
+    try:
+        from bursaryDataMiner.ai_ranker import ai_match_user_to_bursaries
+        ai_results = ai_match_user_to_bursaries(user, limit=limit, on_event=on_event)
+        logger.info(f"AI matching returned {len(ai_results)} results")
+    except Exception as ai_error:
+        logger.error(f"AI matching failed: {str(ai_error)}")
+        # Fallback: Use simple matching from existing UserBursaryMatch records
+        try:
+            existing_matches = UserBursaryMatch.objects.filter(
+                user=user
+            ).select_related('bursary')[:limit]
+            ai_results = []
+            for match in existing_matches:
+                ai_results.append({
+                    'title': match.bursary.title or 'Untitled',
+                    'url': match.bursary.url or '',
+                    'description': (match.bursary.description or '')[:300],
+                    'relevance_score': getattr(match, 'relevance_score', 50),
+                    'match_quality': getattr(match, 'match_quality', 'Good Match'),
+                })
+            logger.info(f"Fallback: Using {len(ai_results)} existing matches")
+        except Exception as fallback_error:
+            logger.error(f"Fallback matching also failed: {str(fallback_error)}")
+            ai_results = []
+
+    return {
+        "status": "success" if ai_results else "partial",
+        "scraped": scraped_count,
+        "matched": len(ai_results),
+        "data": ai_results,
+        "message": f"{len(ai_results)} matches found among {total_bursaries} stored bursaries."
+    }
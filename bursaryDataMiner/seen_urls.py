@@ -0,0 +1,211 @@
+# bursaryDataMiner/seen_urls.py
+import hashlib
+import logging
+import math
+import os
+import struct
+import threading
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from bursaryDataMiner.models import Bursary
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct("<8sQQQQQ")  # magic, capacity, bit count, hash count, items added, last bursary id
+_MAGIC = b"BURSBLM1"
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings, using double hashing of one BLAKE2b digest"""
+
+    def __init__(self, capacity, error_rate=0.001, bit_count=None, hash_count=None, bits=None, count=0):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.bit_count = bit_count or max(8, int(math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hash_count = hash_count or max(1, int(round(self.bit_count / self.capacity * math.log(2))))
+        self.bits = bits if bits is not None else bytearray((self.bit_count + 7) // 8)
+        self.count = count
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        m = self.bit_count
+        return [(h1 + i * h2) % m for i in range(self.hash_count)]
+
+    def _positions_many(self, items):
+        """Same positions as _positions, as an (n, hash_count) array"""
+        digests = b"".join(hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest() for item in items)
+        halves = np.frombuffer(digests, dtype="<u8").reshape(-1, 2)
+        m = np.uint64(self.bit_count)
+        # Reduce first so the products below stay well inside 64 bits
+        h1 = halves[:, 0] % m
+        h2 = (halves[:, 1] | np.uint64(1)) % m
+        steps = np.arange(self.hash_count, dtype=np.uint64)
+        return (h1[:, None] + steps[None, :] * h2[:, None]) % m
+
+    def update(self, items):
+        items = list(items)
+        if not items:
+            return
+        positions = self._positions_many(items).ravel()
+        bits = np.frombuffer(self.bits, dtype=np.uint8)
+        np.bitwise_or.at(bits, (positions >> np.uint64(3)).astype(np.intp),
+                         np.left_shift(1, positions & np.uint64(7)).astype(np.uint8))
+        self.count += len(items)
+
+    def contains_many(self, items):
+        """Boolean array: True where the item may have been added"""
+        items = list(items)
+        if not items:
+            return np.zeros(0, dtype=bool)
+        positions = self._positions_many(items)
+        bits = np.frombuffer(self.bits, dtype=np.uint8)
+        set_bits = (bits[(positions >> np.uint64(3)).astype(np.intp)] >> (positions & np.uint64(7))) & 1
+        return set_bits.all(axis=1)
+
+    def add(self, item):
+        bits = self.bits
+        for pos in self._positions(item):
+            bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        bits = self.bits
+        for pos in self._positions(item):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def nbytes(self):
+        return len(self.bits)
+
+
+class SeenUrlIndex:
+    """
+    Compact "have we stored this URL?" check for the crawler.
+
+    A Bloom filter answers "definitely new" for most links without touching
+    the database; the few "maybe seen" answers are confirmed against the
+    unique Bursary.url index in one query per batch, so results are exact.
+
+    The filter is persisted to disk together with the highest Bursary id it
+    has seen. Loading it catches up on rows added since (by any process)
+    instead of reading the whole URL column, and it is rebuilt with twice
+    the capacity once it fills up.
+    """
+
+    def __init__(self, path=None, capacity=1_000_000, error_rate=0.001):
+        self.path = Path(path) if path else None
+        self.error_rate = error_rate
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.last_bursary_id = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, capacity=1_000_000, error_rate=0.001):
+        index = cls(path, capacity, error_rate)
+        if index.path and index.path.exists():
+            try:
+                data = index.path.read_bytes()
+                magic, stored_capacity, bit_count, hash_count, count, last_id = _HEADER.unpack_from(data)
+                if magic != _MAGIC:
+                    raise ValueError("not a seen-URL index file")
+                index.bloom = BloomFilter(
+                    stored_capacity, error_rate, bit_count=bit_count, hash_count=hash_count,
+                    bits=bytearray(data[_HEADER.size:]), count=count,
+                )
+                index.last_bursary_id = last_id
+            except (ValueError, struct.error) as e:
+                logger.warning(f"Rebuilding seen-URL index, could not read {index.path}: {e}")
+                index = cls(path, capacity, error_rate)
+        index.catch_up()
+        return index
+
+    def catch_up(self, chunk_size=10_000):
+        """Add URLs of bursaries stored since the last catch-up"""
+        with self._lock:
+            rows = Bursary.objects.filter(id__gt=self.last_bursary_id).order_by("id").values_list("id", "url")
+            added = self._add_rows(rows, chunk_size)
+
+            if len(self.bloom) > self.bloom.capacity:
+                self._rebuild(self.bloom.capacity * 2, chunk_size)
+        if added:
+            logger.info(f"Seen-URL index caught up on {added} bursaries")
+        return added
+
+    def _rebuild(self, capacity, chunk_size):
+        logger.info(f"Rebuilding seen-URL index with capacity {capacity}")
+        self.bloom = BloomFilter(capacity, self.error_rate)
+        self.last_bursary_id = 0
+        self._add_rows(Bursary.objects.order_by("id").values_list("id", "url"), chunk_size)
+
+    def _add_rows(self, rows, chunk_size):
+        added = 0
+        batch = []
+        for bursary_id, url in rows.iterator(chunk_size=chunk_size):
+            batch.append(url)
+            self.last_bursary_id = bursary_id
+            if len(batch) >= chunk_size:
+                self.bloom.update(batch)
+                added += len(batch)
+                batch = []
+        self.bloom.update(batch)
+        return added + len(batch)
+
+    def might_contain(self, url):
+        return url in self.bloom
+
+    def add(self, url):
+        with self._lock:
+            self.bloom.add(url)
+
+    def filter_unseen(self, urls):
+        """Return the URLs that are not stored yet, preserving order; one query at most"""
+        urls = list(urls)
+        maybe_seen = [url for url, hit in zip(urls, self.bloom.contains_many(urls)) if hit]
+        if not maybe_seen:
+            return urls
+        seen = set(Bursary.objects.filter(url__in=maybe_seen).values_list("url", flat=True))
+        return [url for url in urls if url not in seen]
+
+    def __contains__(self, url):
+        return url in self.bloom and Bursary.objects.filter(url=url).exists()
+
+    def save(self):
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with self._lock:
+            header = _HEADER.pack(_MAGIC, self.bloom.capacity, self.bloom.bit_count, self.bloom.hash_count,
+                                  self.bloom.count, self.last_bursary_id)
+            with open(tmp_path, "wb") as f:
+                f.write(header)
+                f.write(self.bloom.bits)
+        os.replace(tmp_path, self.path)
+
+
+_seen_urls = None
+_seen_urls_lock = threading.Lock()
+
+
+def get_seen_urls():
+    """Process-wide index, loaded on first use and caught up on every call"""
+    global _seen_urls
+    with _seen_urls_lock:
+        if _seen_urls is None:
+            _seen_urls = SeenUrlIndex.load(
+                settings.SCRAPER_SEEN_URLS_PATH or None,
+                capacity=settings.SCRAPER_SEEN_URLS_CAPACITY,
+            )
+            return _seen_urls
+    _seen_urls.catch_up()
+    return _seen_urls
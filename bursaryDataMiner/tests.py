@@ -1,3 +1,499 @@
-from django.test import TestCase
+import importlib.util
+import signal
+import tempfile
+import threading
+import time
+import unittest
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils.timezone import now
+
+from bursaryDataMiner import embedding_store, jobs, profile_cache
+from bursaryDataMiner.ai_matcher import get_model_name
+from bursaryDataMiner.ai_ranker import QUALITY_SIM_THRESHOLD
+from bursaryDataMiner.embedding_pipeline import DEFAULT_TEMPLATE, bursary_text, text_hash
+from bursaryDataMiner.models import (
+    BackgroundJob, Bursary, BursaryEmbedding, JobEvent, UserBursaryMatch, UserProfileEmbedding,
+)
+from bursaryDataMiner.persistence import upsert_bursaries
+from bursaryDataMiner.politeness import HostScheduler
+from bursaryDataMiner.reverse_matching import reverse_match_bursaries
+from qualificationsAndCourses.models import Courses, Qualifications
+
+
+def make_user(email="student@example.com", **fields):
+    return get_user_model().objects.create_user(email=email, password="x", first_name="Test", last_name="User",
+                                                **fields)
+
+
+class _TooManyRequests(BaseHTTPRequestHandler):
+    hits = 0
+
+    def do_GET(self):
+        type(self).hits += 1
+        self.send_response(429)
+        self.send_header("Retry-After", "5")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class HostSchedulerBackoffTests(SimpleTestCase):
+    def setUp(self):
+        _TooManyRequests.hits = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _TooManyRequests)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_429_from_resilient_session_pushes_next_allowed_forward(self):
+        from bursaryDataMiner.scraper import get_resilient_session
+
+        session = get_resilient_session()
+        scheduler = HostScheduler(delay=0.1, jitter=0).install(session)
+        host = HostScheduler.host_for(self.url)
+
+        self.assertEqual(scheduler.reserve(self.url), 0)
+        before = scheduler._next_allowed[host]
+        response = session.get(self.url, timeout=5)
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(_TooManyRequests.hits, 1)  # not retried behind the scheduler's back
+        self.assertEqual(scheduler._backoff[host], 5.0)  # Retry-After honoured
+        self.assertGreaterEqual(scheduler._next_allowed[host], before + 4.9)
+        self.assertGreater(scheduler.reserve(self.url), 4.0)
+
+    def test_success_shrinks_backoff(self):
+        scheduler = HostScheduler(delay=1.0, jitter=0)
+        host = HostScheduler.host_for(self.url)
+        scheduler.record(self.url, 503)
+        backoff = scheduler._backoff[host]
+        self.assertGreater(backoff, 1.0)
+        self.assertGreater(scheduler._next_allowed[host], time.monotonic() + 1.0)
+        scheduler.record(self.url, 200)
+        self.assertLess(scheduler._backoff.get(host, 0.0), backoff)
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.handlers = dict(jobs.JOB_HANDLERS)
+        self.addCleanup(lambda: (jobs.JOB_HANDLERS.clear(), jobs.JOB_HANDLERS.update(self.handlers)))
+        jobs.job_handler("test_ok")(lambda job: {"echo": job.payload.get("value")})
+
+        @jobs.job_handler("test_fail")
+        def fail(job):
+            raise RuntimeError("handler blew up")
+
+    def test_claimed_job_is_not_handed_out_twice(self):
+        first = jobs.enqueue("test_ok")
+        second = jobs.enqueue("test_ok")
+
+        claimed = jobs.claim_next_job()
+        self.assertEqual(claimed.pk, first.pk)
+        self.assertEqual(claimed.status, BackgroundJob.STATUS_RUNNING)
+        self.assertEqual(claimed.attempts, 1)
+        self.assertIsNotNone(claimed.heartbeat_at)
+
+        self.assertEqual(jobs.claim_next_job().pk, second.pk)
+        self.assertIsNone(jobs.claim_next_job())
+
+    def test_claim_respects_kinds(self):
+        jobs.enqueue("test_fail")
+        self.assertIsNone(jobs.claim_next_job(["test_ok"]))
+        self.assertEqual(jobs.claim_next_job(["test_fail"]).kind, "test_fail")
+
+    def test_successful_job_records_result_and_finished_event(self):
+        jobs.enqueue("test_ok", payload={"value": 7})
+        job = jobs.run_job(jobs.claim_next_job())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, BackgroundJob.STATUS_SUCCEEDED)
+        self.assertEqual(job.result, {"echo": 7})
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(list(JobEvent.objects.filter(job=job).values_list("kind", "data")),
+                         [("job_finished", {"status": BackgroundJob.STATUS_SUCCEEDED})])
+
+    def test_handler_exception_fails_job_with_traceback(self):
+        jobs.enqueue("test_fail")
+        with self.assertLogs("bursaryDataMiner.jobs", "ERROR"):
+            job = jobs.run_job(jobs.claim_next_job())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, BackgroundJob.STATUS_FAILED)
+        self.assertIn("Traceback", job.error)
+        self.assertIn("RuntimeError: handler blew up", job.error)
+        self.assertEqual(jobs.job_to_dict(job)["error"], "RuntimeError: handler blew up")
+        self.assertTrue(JobEvent.objects.filter(job=job, kind="job_finished").exists())
+
+    def test_stale_heartbeat_requeues_then_fails_after_max_attempts(self):
+        long_ago = now() - timedelta(hours=2)
+        # Started long ago but still beating: left alone
+        alive = BackgroundJob.objects.create(kind="test_ok", status=BackgroundJob.STATUS_RUNNING, attempts=1,
+                                             started_at=long_ago, heartbeat_at=now())
+        stale = BackgroundJob.objects.create(kind="test_ok", status=BackgroundJob.STATUS_RUNNING, attempts=1,
+                                             started_at=long_ago, heartbeat_at=now() - timedelta(minutes=10))
+        exhausted = BackgroundJob.objects.create(kind="test_ok", status=BackgroundJob.STATUS_RUNNING, attempts=3,
+                                                 started_at=long_ago, heartbeat_at=now() - timedelta(minutes=10))
+
+        self.assertEqual(jobs.requeue_stale_jobs(300, max_attempts=3), (1, 1))
+
+        statuses = dict(BackgroundJob.objects.values_list("pk", "status"))
+        self.assertEqual(statuses[alive.pk], BackgroundJob.STATUS_RUNNING)
+        self.assertEqual(statuses[stale.pk], BackgroundJob.STATUS_PENDING)
+        self.assertEqual(statuses[exhausted.pk], BackgroundJob.STATUS_FAILED)
+
+        # The requeued job goes round again until it runs out of attempts
+        for attempt in (2, 3):
+            job = jobs.claim_next_job()
+            self.assertEqual((job.pk, job.attempts), (stale.pk, attempt))
+            BackgroundJob.objects.filter(pk=job.pk).update(heartbeat_at=now() - timedelta(minutes=10))
+            jobs.requeue_stale_jobs(300, max_attempts=3)
+        self.assertEqual(BackgroundJob.objects.get(pk=stale.pk).status, BackgroundJob.STATUS_FAILED)
+
+    def test_enqueue_dedupe_returns_unfinished_job(self):
+        user = make_user()
+        pending = jobs.enqueue("test_ok", user=user, dedupe=True)
+        self.assertEqual(jobs.enqueue("test_ok", user=user, dedupe=True).pk, pending.pk)
+        self.assertNotEqual(jobs.enqueue("test_ok", user=make_user("other@example.com"), dedupe=True).pk,
+                            pending.pk)
+
+        jobs.run_job(jobs.claim_next_job())
+        self.assertNotEqual(jobs.enqueue("test_ok", user=user, dedupe=True).pk, pending.pk)
+
+    def test_run_jobs_once_drains_the_queue(self):
+        for value in range(3):
+            jobs.enqueue("test_ok", payload={"value": value})
+        jobs.enqueue("test_fail")
+
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            self.addCleanup(signal.signal, signum, signal.getsignal(signum))
+        call_command("run_jobs", "--once", "--kinds", "test_ok", stdout=StringIO())
+
+        self.assertEqual(
+            sorted(BackgroundJob.objects.filter(kind="test_ok").values_list("status", flat=True)),
+            [BackgroundJob.STATUS_SUCCEEDED] * 3,
+        )
+        self.assertEqual(BackgroundJob.objects.get(kind="test_fail").status, BackgroundJob.STATUS_PENDING)
+
+    def test_run_jobs_rejects_stale_cutoff_inside_heartbeat(self):
+        with self.assertRaises(CommandError):
+            call_command("run_jobs", "--once", "--stale-after", str(jobs.HEARTBEAT_SECONDS), stdout=StringIO())
+
+    def test_prune_deletes_old_finished_jobs_and_their_events(self):
+        old, recent = now() - timedelta(days=30), now() - timedelta(days=1)
+        succeeded = BackgroundJob.objects.create(kind="test_ok", status=BackgroundJob.STATUS_SUCCEEDED,
+                                                 finished_at=old)
+        failed = BackgroundJob.objects.create(kind="test_fail", status=BackgroundJob.STATUS_FAILED, finished_at=old)
+        kept = [
+            BackgroundJob.objects.create(kind="test_ok", status=BackgroundJob.STATUS_SUCCEEDED, finished_at=recent),
+            BackgroundJob.objects.create(kind="test_ok", status=BackgroundJob.STATUS_PENDING),
+            BackgroundJob.objects.create(kind="test_ok", status=BackgroundJob.STATUS_RUNNING, started_at=old),
+        ]
+        for job in [succeeded, failed] + kept:
+            jobs.emit_event(job, "progress")
+            jobs.emit_event(job, "job_finished")
+
+        self.assertEqual(jobs.prune_finished_jobs(14), (2, 4))
+        self.assertEqual(sorted(BackgroundJob.objects.values_list("pk", flat=True)), [job.pk for job in kept])
+        self.assertEqual(set(JobEvent.objects.values_list("job_id", flat=True)), {job.pk for job in kept})
+
+        # run_jobs prunes as it starts, unless told to keep everything
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            self.addCleanup(signal.signal, signum, signal.getsignal(signum))
+        BackgroundJob.objects.create(kind="test_ok", status=BackgroundJob.STATUS_SUCCEEDED, finished_at=old)
+        call_command("run_jobs", "--once", "--kinds", "none", "--keep-finished-days", "0", stdout=StringIO())
+        self.assertEqual(BackgroundJob.objects.count(), 4)
+        call_command("run_jobs", "--once", "--kinds", "none", stdout=StringIO())
+        self.assertEqual(BackgroundJob.objects.count(), 3)
+
+    def test_unknown_kind_is_rejected(self):
+        with self.assertRaises(ValueError):
+            jobs.enqueue("no_such_kind")
+
+
+class UpsertBursariesTests(TestCase):
+    def test_updates_changed_text_but_never_blanks_it(self):
+        Bursary.objects.create(url="https://example.com/a", title="Old A", description="Old text A",
+                               application_url="https://example.com/apply-a")
+        Bursary.objects.create(url="https://example.com/b", title="Old B", description="Old text B")
+
+        by_url, counts = upsert_bursaries([
+            {"url": "https://example.com/a", "title": "New A", "description": "New text A"},
+            {"url": "https://example.com/b", "title": "New B", "description": ""},
+            {"url": "https://example.com/c", "title": "C", "description": "Text C"},
+        ])
+
+        self.assertEqual(counts, {"inserted": 1, "updated": 2})
+        self.assertEqual(set(by_url), {"https://example.com/a", "https://example.com/b", "https://example.com/c"})
+        stored = {b.url: b for b in Bursary.objects.all()}
+        self.assertEqual({url: b.pk for url, b in by_url.items()}, {url: b.pk for url, b in stored.items()})
+        a, b = stored["https://example.com/a"], stored["https://example.com/b"]
+        self.assertEqual((a.title, a.description, a.application_url),
+                         ("New A", "New text A", "https://example.com/apply-a"))
+        self.assertEqual((b.title, b.description), ("New B", "Old text B"))
+
+
+class DedupeMigrationTests(TransactionTestCase):
+    """0010 merges duplicate bursaries and matches so that 0011's unique constraints can be added"""
+    before = [("bursaryDataMiner", "0009_jobevent")]
+    after = [("bursaryDataMiner", "0011_bursary_url_unique_match_constraints")]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def setUp(self):
+        self.addCleanup(self.migrate, MigrationExecutor(connection).loader.graph.leaf_nodes())
+        apps = self.migrate(self.before)
+        Bursary = apps.get_model("bursaryDataMiner", "Bursary")
+        BursaryEmbedding = apps.get_model("bursaryDataMiner", "BursaryEmbedding")
+        UserBursaryMatch = apps.get_model("bursaryDataMiner", "UserBursaryMatch")
+        user = make_user()
+        self.user_id = user.pk
+
+        # The first-created row (the keeper) is bare; only the duplicate has text and an embedding
+        keeper = Bursary.objects.create(title="Engineering bursary", url="https://example.com/eng")
+        duplicate = Bursary.objects.create(title="Engineering bursary", url="https://example.com/eng",
+                                           description="Full cost of study", application_url="https://example.com/apply")
+        BursaryEmbedding.objects.create(bursary=duplicate, vector=[0.1, 0.2])
+        other = Bursary.objects.create(title="Nursing bursary", url="https://example.com/nursing")
+        self.keeper_id, self.other_id = keeper.pk, other.pk
+
+        # One user matched to both copies, plus a repeated match on an undisputed bursary
+        UserBursaryMatch.objects.create(user_id=user.pk, bursary=keeper, relevance_score=0.4)
+        UserBursaryMatch.objects.create(user_id=user.pk, bursary=duplicate, relevance_score=0.9)
+        UserBursaryMatch.objects.create(user_id=user.pk, bursary=other, relevance_score=0.7)
+        UserBursaryMatch.objects.create(user_id=user.pk, bursary=other, relevance_score=0.2)
+
+        self.apps = self.migrate(self.after)
+
+    def test_one_bursary_per_url_keeps_the_duplicates_text_and_embedding(self):
+        Bursary = self.apps.get_model("bursaryDataMiner", "Bursary")
+        BursaryEmbedding = self.apps.get_model("bursaryDataMiner", "BursaryEmbedding")
+
+        self.assertEqual(sorted(Bursary.objects.values_list("url", flat=True)),
+                         ["https://example.com/eng", "https://example.com/nursing"])
+        keeper = Bursary.objects.get(url="https://example.com/eng")
+        self.assertEqual(keeper.pk, self.keeper_id)
+        self.assertEqual((keeper.description, keeper.application_url),
+                         ("Full cost of study", "https://example.com/apply"))
+        self.assertEqual(list(BursaryEmbedding.objects.filter(bursary=keeper).values_list("vector", flat=True)),
+                         [[0.1, 0.2]])
+
+    def test_one_match_per_user_and_bursary_keeps_the_best_score(self):
+        UserBursaryMatch = self.apps.get_model("bursaryDataMiner", "UserBursaryMatch")
+
+        self.assertEqual(
+            sorted(UserBursaryMatch.objects.filter(user_id=self.user_id).values_list("bursary_id", "relevance_score")),
+            sorted([(self.keeper_id, 0.9), (self.other_id, 0.7)]),
+        )
+
+
+@unittest.skipUnless(importlib.util.find_spec("onnxruntime") and importlib.util.find_spec("onnx"),
+                     "needs onnxruntime and onnx")
+class OnnxEncoderAgreementTests(SimpleTestCase):
+    texts = [
+        "Engineering bursary covering tuition, accommodation and books",
+        "Funding for nursing students at public universities",
+        "Accounting",
+        "Applicants must be South African citizens with a household income under R350 000 a year. "
+        "The bursary covers full cost of study for a BSc in Computer Science, Information Systems or Data Science.",
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        from bursaryDataMiner.ai_matcher import get_model_name
+        from bursaryDataMiner.encoders import SentenceTransformerEncoder, export_onnx_encoder
+
+        model_dir = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(model_dir.cleanup)
+        cls.model_dir = model_dir.name
+        export_onnx_encoder(get_model_name(), cls.model_dir)
+        cls.reference = SentenceTransformerEncoder(get_model_name()).encode(cls.texts, batch_size=2)
+
+    def assert_agrees(self, quantized):
+        from bursaryDataMiner.encoders import OnnxEncoder
+
+        vectors = OnnxEncoder(self.model_dir, quantized=quantized).encode(self.texts, batch_size=2)
+        self.assertEqual(vectors.shape, self.reference.shape)
+        cosines = (vectors * self.reference).sum(axis=1)
+        self.assertGreaterEqual(float(cosines.min()), 0.99, cosines)
+
+    def test_onnx_matches_sentence_transformers(self):
+        self.assert_agrees(quantized=False)
+
+    def test_int8_onnx_matches_sentence_transformers(self):
+        self.assert_agrees(quantized=True)
+
+
+class EmbeddingMatrixRefreshTests(TestCase):
+    dim = 16
+
+    def setUp(self):
+        self.rng = np.random.default_rng(7)
+        for i in range(40):
+            self.store(Bursary.objects.create(title=f"Bursary {i}", url=f"https://example.com/{i}"))
+        # Every refresh below also runs the reconcile scan
+        patcher = mock.patch.object(embedding_store, "RECONCILE_INTERVAL", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def store(self, bursary):
+        embedding, _ = BursaryEmbedding.objects.get_or_create(bursary=bursary, model_name=get_model_name())
+        embedding.vector = self.rng.standard_normal(self.dim).astype(np.float32)
+        embedding.save()
+        return embedding
+
+    def brute_force(self, query, k):
+        ids, vectors = [], []
+        for embedding in BursaryEmbedding.objects.filter(model_name=get_model_name()):
+            ids.append(embedding.bursary_id)
+            vectors.append(embedding.vector)
+        vectors = embedding_store.normalize_rows(np.stack(vectors))
+        scores = vectors @ (query / np.linalg.norm(query))
+        order = np.argsort(-scores)[:k]
+        return np.array(ids)[order], scores[order]
+
+    def assert_matches_brute_force(self, matrix):
+        self.assertEqual(sorted(matrix.ids.tolist()),
+                         sorted(BursaryEmbedding.objects.values_list("bursary_id", flat=True)))
+        for _ in range(5):
+            query = self.rng.standard_normal(self.dim).astype(np.float32)
+            for k in (1, 5, 100):
+                ids, scores = matrix.search(query, k)
+                expected_ids, expected_scores = self.brute_force(query, k)
+                self.assertEqual(ids.tolist(), expected_ids.tolist())
+                np.testing.assert_allclose(scores, expected_scores, rtol=1e-5, atol=1e-6)
+
+    def change_rows(self):
+        """Update one vector, add a bursary, delete another; returns the updated row"""
+        changed = self.store(Bursary.objects.order_by("id")[3])
+        self.store(Bursary.objects.create(title="New bursary", url="https://example.com/new"))
+        Bursary.objects.order_by("id")[10].delete()
+        return changed
+
+    def test_refresh_picks_up_updated_added_and_deleted_rows(self):
+        matrix = embedding_store.EmbeddingMatrix(use_snapshot=False)
+        matrix.reload()
+        self.assert_matches_brute_force(matrix)
+
+        changed = self.change_rows()
+        matrix.refresh()
+        self.assert_matches_brute_force(matrix)
+
+        # Written late: updated_at is already behind the newest loaded row, but inside the overlap
+        changed.vector = self.rng.standard_normal(self.dim).astype(np.float32)
+        changed.save()
+        BursaryEmbedding.objects.filter(pk=changed.pk).update(
+            updated_at=matrix._loaded_until - embedding_store.REFRESH_OVERLAP / 2
+        )
+        matrix.refresh()
+        self.assert_matches_brute_force(matrix)
+
+    def test_snapshot_reload_catches_up_with_the_database(self):
+        with tempfile.TemporaryDirectory() as snapshot_dir, override_settings(EMBEDDING_SNAPSHOT_DIR=snapshot_dir):
+            exported = embedding_store.EmbeddingMatrix()
+            exported.reload()
+            exported.export_snapshot()
+
+            self.change_rows()
+            matrix = embedding_store.EmbeddingMatrix()
+            matrix.reload()
+            self.assertIsNotNone(matrix.snapshot_version)
+            self.assert_matches_brute_force(matrix)
+
+
+def fake_embed_texts(texts, batch_size=64):
+    """Every profile encodes to the same axis-aligned unit vector"""
+    vectors = np.zeros((len(texts), 4), dtype=np.float32)
+    vectors[:, 0] = 1.0
+    return vectors
+
+
+class ReverseMatchTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(profile_cache, "_cache", profile_cache.ProfileVectorLRU(16))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch("bursaryDataMiner.ai_matcher.embed_texts", side_effect=fake_embed_texts)
+        self.embed_texts = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = make_user()
+        qualification = Qualifications.objects.create(applicant=self.user, industry="Engineering", name="BSc")
+        Courses.objects.create(qualification=qualification, name="Mathematics", grade="75.00")
+        profile_cache.get_profile_vector(self.user)  # the cached, stored profile
+        self.assertEqual(self.embed_texts.call_count, 1)
+
+    def bursary(self, name, vector):
+        bursary = Bursary.objects.create(title=f"{name} bursary", url=f"https://example.com/{name}",
+                                         description=f"Funding for {name} students")
+        embedding = BursaryEmbedding(bursary=bursary, template=DEFAULT_TEMPLATE, model_name=get_model_name(),
+                                     text_hash=text_hash(bursary_text(bursary, DEFAULT_TEMPLATE)))
+        embedding.vector = np.asarray(vector, dtype=np.float32)
+        embedding.save()
+        return bursary
+
+    def test_new_bursary_above_threshold_is_matched_and_existing_match_untouched(self):
+        close = self.bursary("science", [1.0, 0.2, 0.0, 0.0])
+        far = self.bursary("nursing", [0.0, 1.0, 0.0, 0.0])
+        matched = self.bursary("mining", [1.0, 0.1, 0.0, 0.0])
+        existing = UserBursaryMatch.objects.create(user=self.user, bursary=matched, relevance_score=12,
+                                                   match_quality="Good Match")
+        self.assertGreater(1 / np.hypot(1.0, 0.2), QUALITY_SIM_THRESHOLD)
+
+        result = reverse_match_bursaries(Bursary.objects.all())
+
+        self.assertEqual((result["bursaries"], result["users"]), (3, 1))
+        self.assertEqual(self.embed_texts.call_count, 1)  # the stored profile was still current
+        matches = {m.bursary_id: m for m in UserBursaryMatch.objects.filter(user=self.user)}
+        self.assertEqual(set(matches), {close.pk, matched.pk})
+        self.assertAlmostEqual(matches[close.pk].relevance_score, 100 / np.hypot(1.0, 0.2), delta=1)
+        self.assertEqual(matches[close.pk].match_quality, "Excellent Match")
+        self.assertEqual((matches[matched.pk].pk, matches[matched.pk].relevance_score,
+                          matches[matched.pk].match_quality), (existing.pk, 12, "Good Match"))
+        self.assertNotIn(far.pk, matches)
+
+    def test_crawl_refresh_only_reads_invalidated_or_other_model_rows(self):
+        other = make_user("other@example.com")
+        Qualifications.objects.create(applicant=other, industry="Health", name="BNurs")
+        profile_cache.get_profile_vector(other)
+        self.assertEqual(self.embed_texts.call_count, 2)
+
+        # Changed without invalidation: left for the periodic sweep
+        Qualifications.objects.filter(applicant=self.user).update(industry="Mining")
+        self.assertEqual(profile_cache.refresh_stale_profile_vectors(), (0, 0))
+
+        profile_cache.invalidate_profile_vector(other)
+        UserProfileEmbedding.objects.filter(user=self.user).update(model_name="older-model")
+        self.assertEqual(profile_cache.refresh_stale_profile_vectors(), (2, 0))
+        self.assertEqual(self.embed_texts.call_count, 3)
+        self.assertEqual(profile_cache.refresh_stale_profile_vectors(), (0, 0))
+
+    def test_refresh_profile_vectors_command_catches_uninvalidated_changes(self):
+        Qualifications.objects.filter(applicant=self.user).update(industry="Mining")
+        out = StringIO()
+        call_command("refresh_profile_vectors", stdout=out)
+
+        self.assertIn("Refreshed 1 profile vectors", out.getvalue())
+        user = get_user_model().objects.get(pk=self.user.pk)
+        self.assertEqual(UserProfileEmbedding.objects.get(user=user).fingerprint,
+                         profile_cache.profile_fingerprint(user, get_model_name()))
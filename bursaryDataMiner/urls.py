@@ -1,8 +1,10 @@
 from django.urls import path
-from .views import search_bursaries, get_user_matches, get_all_bursaries
+from .views import search_bursaries, get_job_status, stream_job_events, get_user_matches, get_all_bursaries
 
 urlpatterns = [
     path('bursary/search/', search_bursaries, name='search-bursaries'),
+    path('bursary/jobs/<int:job_id>/', get_job_status, name='bursary-job-status'),
+    path('bursary/jobs/<int:job_id>/events/', stream_job_events, name='bursary-job-events'),
     path('bursary/matches/', get_user_matches, name='bursaries-match'),
     path('bursaries/', get_all_bursaries, name='bursaries-list'),
 ]
@@ -1,12 +1,10 @@
 # bursaryDataMiner/utils.py
 
-from sentence_transformers import SentenceTransformer
-
-# load embedding model once
-model = SentenceTransformer('all-MiniLM-L6-v2')
-
 def generate_embedding(text: str):
     """Generate vector embeddings for bursary descriptions"""
     if not text:
         return None
-    return model.encode(text).tolist()
+    # Shares the process-wide encoder (or the embedding server) instead of loading a model at import
+    from bursaryDataMiner.ai_matcher import embed_text
+
+    return embed_text(text)
@@ -0,0 +1,51 @@
+# bursaryDataMiner/vector_codec.py
+"""
+Compact binary encoding for embedding vectors stored in BursaryEmbedding.
+
+"int8": each component is round(x / scale) with scale = max|x| / 127, one
+byte per component plus the per-row scale. "float16": two bytes per
+component, scale unused. Decoding is np.frombuffer over the stored bytes,
+so no per-float Python objects are created.
+"""
+import numpy as np
+
+FORMAT_INT8 = "int8"
+FORMAT_FLOAT16 = "float16"
+FORMATS = (FORMAT_INT8, FORMAT_FLOAT16)
+
+_DTYPES = {FORMAT_INT8: np.int8, FORMAT_FLOAT16: np.float16}
+
+
+def encode_vector(vector, fmt=FORMAT_INT8):
+    """Return (bytes, scale) for one vector"""
+    vector = np.asarray(vector, dtype=np.float32)
+    if fmt == FORMAT_FLOAT16:
+        return vector.astype("<f2").tobytes(), 1.0
+    if fmt != FORMAT_INT8:
+        raise ValueError(f"Unknown vector format {fmt!r}")
+    peak = float(np.abs(vector).max()) if vector.size else 0.0
+    scale = peak / 127.0 if peak else 1.0
+    return np.round(vector / scale).astype(np.int8).tobytes(), scale
+
+
+def decode_vector(data, scale=1.0, fmt=FORMAT_INT8):
+    """float32 vector from stored bytes"""
+    values = np.frombuffer(data, dtype=_DTYPES[fmt])
+    if fmt == FORMAT_INT8:
+        return values.astype(np.float32) * np.float32(scale)
+    return values.astype(np.float32)
+
+
+def decode_many(datas, scales, fmt=FORMAT_INT8):
+    """
+    (n, dim) float32 matrix from rows of one format and dimension.
+
+    The rows are joined once and decoded with a single np.frombuffer.
+    """
+    if not datas:
+        return np.empty((0, 0), dtype=np.float32)
+    values = np.frombuffer(b"".join(datas), dtype=_DTYPES[fmt]).reshape(len(datas), -1)
+    matrix = values.astype(np.float32)
+    if fmt == FORMAT_INT8:
+        matrix *= np.asarray(scales, dtype=np.float32)[:, None]
+    return matrix
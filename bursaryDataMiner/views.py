@@ -1,76 +1,51 @@
-from django.http import JsonResponse
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.permissions import IsAuthenticated
-from bursaryDataMiner.models import UserBursaryMatch, Bursary
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from django.urls import reverse
+from bursaryDataMiner.models import UserBursaryMatch, Bursary, BackgroundJob, JobEvent
+from bursaryDataMiner.jobs import enqueue, job_to_dict
 import logging
 
-# Import your enhanced scraper
-from bursaryDataMiner.scraper import enhanced_scrape_bursaries  # Adjust path if needed
-
 logger = logging.getLogger(__name__)
 
+SSE_POLL_INTERVAL = 0.5
+SSE_KEEPALIVE_SECONDS = 15
+SSE_MAX_SECONDS = 30 * 60
+SEARCH_MAX_LIMIT = 100
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def search_bursaries(request):
+    """Queue a search for the worker and return its job id straight away"""
     if request.method == 'POST':
         try:
-            logger.info(f"Starting bursary search for user: {request.user.email}")
-
-            # --- SCRAPE NEW BURSARIES FIRST ---
-            scrape_result = enhanced_scrape_bursaries(request.user)
-            scraped_count = scrape_result.get("total_found", 0)
-            scraped_bursaries = scrape_result.get("bursaries", [])
-
-            logger.info(f"Scraped {scraped_count} new bursaries for user: {request.user.email}")
-
-            # --- AI MATCHING WITH UPDATED DATABASE ---
-            total_bursaries = Bursary.objects.count()
-            logger.info(f"Total bursaries in database after scraping: {total_bursaries}")
-
-            if total_bursaries == 0:
-                return JsonResponse({
-                    "status": "warning",
-                    "message": "No bursaries in database. Please populate database first.",
-                    "scraped": scraped_count,
-                    "matched": 0,
-                    "data": []
-                })
-
-            # Try AI matching with existing data
-            ai_results = []
-            try:
-                from bursaryDataMiner.ai_ranker import ai_match_user_to_bursaries
-                ai_results = ai_match_user_to_bursaries(request.user, limit=30)
-                logger.info(f"AI matching returned {len(ai_results)} results")
-            except Exception as ai_error:
-                logger.error(f"AI matching failed: {str(ai_error)}")
-                # Fallback: Use simple matching from existing UserBursaryMatch records
-                try:
-                    existing_matches = UserBursaryMatch.objects.filter(
-                        user=request.user
-                    ).select_related('bursary')[:30]
-                    ai_results = []
-                    for match in existing_matches:
-                        ai_results.append({
-                            'title': match.bursary.title or 'Untitled',
-                            'url': match.bursary.url or '',
-                            'description': (match.bursary.description or '')[:300],
-                            'relevance_score': getattr(match, 'relevance_score', 50),
-                            'match_quality': getattr(match, 'match_quality', 'Good Match'),
-                        })
-                    logger.info(f"Fallback: Using {len(ai_results)} existing matches")
-                except Exception as fallback_error:
-                    logger.error(f"Fallback matching also failed: {str(fallback_error)}")
-                    ai_results = []
+            limit = int(request.data.get('limit', 30))
+        except (TypeError, ValueError):
+            return JsonResponse({'status': 'error', 'message': 'limit must be a whole number'}, status=400)
+        limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+
+        try:
+            job = enqueue('search', user=request.user, payload={'limit': limit}, dedupe=True)
+            logger.info(f"Queued search job {job.pk} for user: {request.user.email}")
 
             return JsonResponse({
-                "status": "success" if ai_results else "partial",
-                "scraped": scraped_count,
-                "matched": len(ai_results),
-                "data": ai_results,
-                "message": f"{len(ai_results)} matches found. {scraped_count} bursaries scraped."
-            })
+                "status": "queued",
+                "job_id": job.pk,
+                "job_status": job.status,
+                "status_url": reverse('bursary-job-status', args=[job.pk]),
+                "events_url": reverse('bursary-job-events', args=[job.pk]),
+                "message": "Search queued. Poll status_url or stream events_url for results."
+            }, status=202)
 
         except Exception as e:
             logger.error(f"Critical error in search_bursaries: {str(e)}")
@@ -85,6 +60,114 @@ def search_bursaries(request):
     return JsonResponse({'error': 'POST request required'}, status=400)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_job_status(request, job_id):
+    """Status of a background job; includes the search payload once it has succeeded"""
+    job = _get_user_job(job_id, request.user)
+    if job is None:
+        return JsonResponse({'status': 'error', 'message': 'Job not found'}, status=404)
+
+    return JsonResponse(job_to_dict(job))
+
+
+def _authenticate_stream_request(request):
+    """
+    JWT auth for the SSE endpoint, which is a plain Django view.
+    Browsers' EventSource can't send headers, so ?token= is accepted too.
+    """
+    auth = JWTAuthentication()
+    header = auth.get_header(request)
+    raw_token = auth.get_raw_token(header) if header else request.GET.get('token')
+    if not raw_token:
+        return None
+    try:
+        return auth.get_user(auth.get_validated_token(raw_token))
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+
+
+def _get_user_job(job_id, user):
+    """The user's own job; staff can also see jobs without an owner, such as crawls"""
+    jobs = BackgroundJob.objects.filter(pk=job_id)
+    if not user.is_staff:
+        jobs = jobs.filter(user=user)
+    return jobs.first()
+
+
+def _fetch_job_events(job_id, after_id):
+    # Job first: a job read as finished has all of its events committed (run_job writes
+    # job_finished in the same transaction), so the events read next cannot miss any
+    job = BackgroundJob.objects.get(pk=job_id)
+    events = list(JobEvent.objects.filter(job_id=job_id, id__gt=after_id).order_by('id')[:200])
+    return events, job
+
+
+def _sse(event, data, event_id=None):
+    message = f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    if event_id is not None:
+        message = f"id: {event_id}\n" + message
+    return message
+
+
+async def _job_event_stream(job_id, last_event_id):
+    fetch = sync_to_async(_fetch_job_events)
+    started = last_sent = time.monotonic()
+
+    while time.monotonic() - started < SSE_MAX_SECONDS:
+        events, job = await fetch(job_id, last_event_id)
+
+        for event in events:
+            last_event_id = event.id
+            yield _sse(event.kind, event.data, event.id)
+            last_sent = time.monotonic()
+
+        if not events and job.status in (BackgroundJob.STATUS_SUCCEEDED, BackgroundJob.STATUS_FAILED):
+            yield _sse('done', job_to_dict(job))
+            return
+
+        if time.monotonic() - last_sent > SSE_KEEPALIVE_SECONDS:
+            yield ": keepalive\n\n"
+            last_sent = time.monotonic()
+
+        if not events:
+            await asyncio.sleep(SSE_POLL_INTERVAL)
+
+
+@require_GET
+async def stream_job_events(request, job_id):
+    """
+    Server-Sent Events stream of a job's progress (site_started,
+    site_finished, search_started, match, job_finished), closed with a
+    "done" event carrying the job status and result. Reconnecting clients
+    resume from Last-Event-ID.
+
+    Users stream their own jobs. Crawl jobs have no owner, so their
+    site_started/site_finished events are only streamable by staff.
+
+    The Procfile serves the app through ASGI (bursary_backend.asgi), where
+    an open stream is a coroutine. Under a WSGI server each open stream
+    holds a sync worker for up to SSE_MAX_SECONDS.
+    """
+    user = await sync_to_async(_authenticate_stream_request)(request)
+    if user is None:
+        return JsonResponse({'status': 'error', 'message': 'Authentication required'}, status=401)
+
+    job = await sync_to_async(_get_user_job)(job_id, user)
+    if job is None:
+        return JsonResponse({'status': 'error', 'message': 'Job not found'}, status=404)
+
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID') or request.GET.get('last_event_id') or 0)
+    except ValueError:
+        last_event_id = 0
+
+    response = StreamingHttpResponse(_job_event_stream(job.pk, last_event_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_user_matches(request):
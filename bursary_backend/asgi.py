@@ -3,6 +3,10 @@ ASGI config for bursary_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve through this module (e.g. ``uvicorn bursary_backend.asgi:application``)
+to stream search progress from ``api/bursary/jobs/<id>/events/`` without
+holding a worker per open stream.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
@@ -13,19 +13,13 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # ===========================
 SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key')
 DEBUG = os.getenv('DEBUG', 'True') == 'True'
-ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', 'localhost').split(',')
+ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
 
 # ===========================
 # CORS
 # ===========================
 CORS_ALLOWED_ORIGINS = os.getenv('CORS_ALLOWED_ORIGINS', 'http://localhost:5173').split(',')
 CORS_ALLOW_CREDENTIALS = True
-import os
-
-ALLOWED_HOSTS = os.getenv(
-    "ALLOWED_HOSTS",
-    "localhost,127.0.0.1"
-).split(",")
 
 # ===========================
 # Installed apps
@@ -83,12 +77,6 @@ WSGI_APPLICATION = 'bursary_backend.wsgi.application'
 # ===========================
 # Database
 # ===========================
-import psycopg2
-from dotenv import load_dotenv
-import os
-
-# Load environment variables from .env
-load_dotenv()
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -149,3 +137,48 @@ REST_FRAMEWORK = {
 }
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# ===========================
+# Scraper
+# ===========================
+SCRAPER_MAX_CONCURRENCY = int(os.getenv('SCRAPER_MAX_CONCURRENCY', '16'))
+SCRAPER_PER_HOST_LIMIT = int(os.getenv('SCRAPER_PER_HOST_LIMIT', '2'))
+# Seconds between requests to the same host, plus up to SCRAPER_HOST_JITTER
+SCRAPER_HOST_DELAY = float(os.getenv('SCRAPER_HOST_DELAY', '1.0'))
+SCRAPER_HOST_JITTER = float(os.getenv('SCRAPER_HOST_JITTER', '0.5'))
+# Upper bound for the per-host backoff after 429/5xx responses
+SCRAPER_MAX_BACKOFF = float(os.getenv('SCRAPER_MAX_BACKOFF', '60'))
+# On-disk conditional-GET cache for scraped pages; empty path disables it
+SCRAPER_CACHE_PATH = os.getenv('SCRAPER_CACHE_PATH', str(BASE_DIR / '.cache' / 'scraper_pages.sqlite3'))
+SCRAPER_CACHE_MAX_BYTES = int(os.getenv('SCRAPER_CACHE_MAX_BYTES', str(50 * 1024 * 1024)))
+# Persisted Bloom filter of stored bursary URLs, checked before fetching links
+SCRAPER_SEEN_URLS_PATH = os.getenv('SCRAPER_SEEN_URLS_PATH', str(BASE_DIR / '.cache' / 'seen_urls.bloom'))
+SCRAPER_SEEN_URLS_CAPACITY = int(os.getenv('SCRAPER_SEEN_URLS_CAPACITY', '1000000'))
+
+# ===========================
+# Matching
+# ===========================
+# Text encoder: "sentence-transformers" (PyTorch) or "onnx" (ONNX Runtime, see encoders.py)
+EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'sentence-transformers')
+# Unix socket of `manage.py run_embedding_server` on this host; when set, every process
+# encodes through it instead of loading its own model. Empty encodes in-process
+EMBEDDING_SERVER_SOCKET = os.getenv('EMBEDDING_SERVER_SOCKET', '')
+# Server-side micro-batching: most texts per encoder call, and longest wait to fill one
+EMBEDDING_SERVER_MAX_BATCH = int(os.getenv('EMBEDDING_SERVER_MAX_BATCH', '64'))
+EMBEDDING_SERVER_MAX_WAIT_MS = float(os.getenv('EMBEDDING_SERVER_MAX_WAIT_MS', '5'))
+# Written by `manage.py export_onnx_encoder`; the int8 quantized copy is used unless disabled
+EMBEDDING_ONNX_DIR = os.getenv('EMBEDDING_ONNX_DIR', str(BASE_DIR / '.cache' / 'onnx'))
+EMBEDDING_ONNX_QUANTIZED = os.getenv('EMBEDDING_ONNX_QUANTIZED', 'True') == 'True'
+# How BursaryEmbedding vectors are stored: "int8" (1 byte/dim + scale) or "float16"
+EMBEDDING_VECTOR_FORMAT = os.getenv('EMBEDDING_VECTOR_FORMAT', 'int8')
+# IVF index files written by `manage.py build_ann_index`; empty disables ANN retrieval
+ANN_INDEX_DIR = os.getenv('ANN_INDEX_DIR', str(BASE_DIR / '.cache' / 'ann'))
+# Inverted lists scanned per query; higher is slower but closer to exact
+ANN_NPROBE = int(os.getenv('ANN_NPROBE', '8'))
+# Below this many embeddings the exact scan is fast enough and is always used
+ANN_MIN_ROWS = int(os.getenv('ANN_MIN_ROWS', '50000'))
+# Versioned .npy snapshots written by `manage.py export_embedding_snapshot` and
+# memory-mapped by every worker; empty disables them (matrices load from the database)
+EMBEDDING_SNAPSHOT_DIR = os.getenv('EMBEDDING_SNAPSHOT_DIR', str(BASE_DIR / '.cache' / 'embeddings'))
+# Profile vectors kept in memory per worker (least recently used are evicted first)
+PROFILE_CACHE_SIZE = int(os.getenv('PROFILE_CACHE_SIZE', '2048'))
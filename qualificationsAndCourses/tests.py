@@ -1,3 +1,88 @@
+from unittest import mock
+
+import numpy as np
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from bursaryDataMiner import profile_cache
+from bursaryDataMiner.ai_matcher import get_model_name
+from bursaryDataMiner.models import UserProfileEmbedding
+from .models import Courses, Qualifications
+
+
+def fake_embed_texts(texts, batch_size=64):
+    return np.ones((len(texts), 4), dtype=np.float32)
+
+
+class ProfileVectorInvalidationTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="student@example.com", password="x", first_name="Test", last_name="User"
+        )
+        self.qualification = Qualifications.objects.create(applicant=self.user, industry="Engineering",
+                                                           name="BSc Engineering")
+        Courses.objects.create(qualification=self.qualification, name="Mathematics", grade="75.00")
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        cache = profile_cache.ProfileVectorLRU(16)
+        patcher = mock.patch.object(profile_cache, "_cache", cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch("bursaryDataMiner.ai_matcher.embed_texts", side_effect=fake_embed_texts)
+        self.embed_texts = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def stored_fingerprint(self):
+        return UserProfileEmbedding.objects.get(user=self.user).fingerprint
+
+    def current_fingerprint(self):
+        user = get_user_model().objects.get(pk=self.user.pk)
+        return profile_cache.profile_fingerprint(user, get_model_name())
+
+    def test_unchanged_qualifications_are_not_re_encoded(self):
+        self.assertEqual(len(profile_cache.get_profile_vector(self.user)), 4)
+        self.assertEqual(self.embed_texts.call_count, 1)
+        self.assertEqual(self.stored_fingerprint(), self.current_fingerprint())
+
+        profile_cache.get_profile_vector(self.user)  # from the LRU
+        profile_cache._cache.discard(self.user.pk)
+        profile_cache.get_profile_vector(self.user)  # from the stored row
+        self.assertEqual(self.embed_texts.call_count, 1)
+
+    def test_adding_a_course_blanks_the_fingerprint_and_re_encodes(self):
+        profile_cache.get_profile_vector(self.user)
+
+        response = self.client.post("/api/courses/", {"qualification": self.qualification.pk,
+                                                      "name": "Physics", "grade": "68.50"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.stored_fingerprint(), "")
+
+        profile_cache.get_profile_vector(get_user_model().objects.get(pk=self.user.pk))
+        self.assertEqual(self.embed_texts.call_count, 2)
+        self.assertEqual(self.stored_fingerprint(), self.current_fingerprint())
+
+    def test_adding_a_course_to_someone_elses_qualification_is_rejected(self):
+        other = get_user_model().objects.create_user(email="other@example.com", password="x",
+                                                     first_name="Other", last_name="User")
+        self.client.force_authenticate(other)
+
+        response = self.client.post("/api/courses/", {"qualification": self.qualification.pk,
+                                                      "name": "Physics", "grade": "68.50"}, format="json")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.qualification.courses.count(), 1)
+
+    def test_patching_a_qualification_blanks_the_fingerprint_and_re_encodes(self):
+        profile_cache.get_profile_vector(self.user)
+        fingerprint = self.stored_fingerprint()
+
+        response = self.client.patch(f"/api/qualifications/{self.qualification.pk}/update/",
+                                     {"industry": "Health Sciences"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stored_fingerprint(), "")
 
-# Create your tests here.
+        profile_cache.get_profile_vector(get_user_model().objects.get(pk=self.user.pk))
+        self.assertEqual(self.embed_texts.call_count, 2)
+        self.assertNotIn(self.stored_fingerprint(), ("", fingerprint))
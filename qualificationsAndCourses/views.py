@@ -11,15 +11,27 @@ def create_qualification(request):
     serializer = QualificationSerializer(data=request.data, context={'request': request})
     if serializer.is_valid():
         serializer.save()
+        from bursaryDataMiner.profile_cache import invalidate_profile_vector  # keeps numpy out of URL loading
+        invalidate_profile_vector(request.user)
         return Response({'success': True, 'message': "Qualification with courses saved successfully."}, status=201)
     return Response({'error': serializer.errors}, status=400)
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def create_courses(request):
+    try:
+        qualification = Qualifications.objects.get(id=request.data.get('qualification'), applicant=request.user)
+    except (Qualifications.DoesNotExist, ValueError):
+        return Response(
+            {'error': 'Qualification not found or not owned by user.'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
     serializer = CourseSerializer(data=request.data)
     if serializer.is_valid():
-        serializer.save()
+        serializer.save(qualification=qualification)
+        from bursaryDataMiner.profile_cache import invalidate_profile_vector
+        invalidate_profile_vector(request.user)
         return Response({'success': True, 'message': "Course saved successfully"}, status=status.HTTP_201_CREATED)
     return Response({'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -51,6 +63,8 @@ def update_qualification(request, pk):
 
     if serializer.is_valid():
         serializer.save()
+        from bursaryDataMiner.profile_cache import invalidate_profile_vector
+        invalidate_profile_vector(request.user)
         return Response({'success': True, 'message': 'Qualification updated successfully.'}, status=status.HTTP_200_OK)
 
     return Response({'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)